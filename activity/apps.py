@@ -0,0 +1,15 @@
+import atexit
+
+from django.apps import AppConfig
+
+
+class ActivityConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'activity'
+
+    def ready(self):
+        from activity import signals  # noqa: F401
+        from activity.buffer import activity_buffer
+
+        # Events still buffered when the process exits.
+        atexit.register(activity_buffer.flush)
@@ -0,0 +1,160 @@
+"""
+Buffered writes of the activity log.
+
+Logging a row per change would double the writes of every mutation, so
+``record()`` only appends the event to a buffer of the process, once the
+transaction of the change committed. The buffer is written with one
+``bulk_create()`` per database when it holds
+``settings.ACTIVITY_FLUSH_SIZE`` events, when its oldest event waited
+``settings.ACTIVITY_FLUSH_INTERVAL`` seconds (checked on every event and at
+the end of every request), and when the process exits.
+
+Durable events, such as membership changes, are also written at the end of
+the request that recorded them. Other events may be lost if the process is
+killed before its buffer was written.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, router, transaction
+
+from activity.models import ActivityEvent
+from core.context import get_request_context
+
+logger = logging.getLogger(__name__)
+
+
+def database_key(alias):
+    return alias, connections[alias].settings_dict['NAME']
+
+
+class ActivityBuffer:
+    def __init__(self):
+        self.events = []
+        self.durable = False
+        self.oldest = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.events)
+
+    def add(self, alias, event, durable=False):
+        with self.lock:
+            if not self.events:
+                self.oldest = time.monotonic()
+
+            self.events.append((database_key(alias), event))
+            self.durable = self.durable or durable
+
+        if len(self.events) >= settings.ACTIVITY_FLUSH_SIZE or self.is_due():
+            self.flush()
+
+    def is_due(self):
+        return (
+            self.oldest is not None
+            and time.monotonic() - self.oldest >= settings.ACTIVITY_FLUSH_INTERVAL
+        )
+
+    def has_durable(self):
+        return self.durable
+
+    def take(self):
+        with self.lock:
+            events, self.events = self.events, []
+            self.durable = False
+            self.oldest = None
+
+        return events
+
+    def flush(self):
+        """
+        Write every buffered event. Returns how many were written.
+        """
+        events = self.take()
+        by_database = {}
+
+        for key, event in events:
+            by_database.setdefault(key, []).append(event)
+
+        written = 0
+
+        for (alias, name), batch in by_database.items():
+            # Recorded against a database that was since swapped out, like
+            # the test databases by the time the process exits.
+            if database_key(alias) != (alias, name):
+                continue
+
+            try:
+                ActivityEvent.objects.using(alias).bulk_create(batch)
+            except Exception:
+                logger.exception('Could not write %d activity events to %s.',
+                                 len(batch), alias)
+                self.restore((alias, name), batch)
+            else:
+                written += len(batch)
+
+        return written
+
+    def restore(self, key, batch):
+        """
+        Put back events that couldn't be written, within the buffer limit.
+        """
+        with self.lock:
+            room = max(settings.ACTIVITY_BUFFER_MAX_SIZE - len(self.events), 0)
+            kept = batch[max(len(batch) - room, 0):]
+
+            if len(kept) < len(batch):
+                logger.error('Dropped %d activity events.', len(batch) - len(kept))
+
+            self.events[:0] = [(key, event) for event in kept]
+
+            if self.events and self.oldest is None:
+                self.oldest = time.monotonic()
+
+    def clear(self):
+        self.take()
+
+
+activity_buffer = ActivityBuffer()
+
+
+def record(verb, target, organization_id, project_id=None, data=None, durable=False):
+    """
+    Log ``verb`` on the ``target`` instance, by the user of the current
+    request. The event is buffered once the current transaction commits,
+    and dropped if it rolls back.
+    """
+    context = get_request_context()
+    alias = router.db_for_write(ActivityEvent)
+    event = ActivityEvent(
+        organization_id=organization_id,
+        project_id=project_id,
+        actor_id=context.user_id if context is not None else None,
+        verb=verb,
+        target_type=target._meta.model_name,
+        target_id=target.pk,
+        data=data or {},
+    )
+
+    transaction.on_commit(
+        lambda: activity_buffer.add(alias, event, durable), using=alias)
+
+
+class ActivityFlushMiddleware:
+    """
+    Writes the buffered activity at the end of requests that recorded
+    durable events, or once the buffer is due.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            if activity_buffer.has_durable() or activity_buffer.is_due():
+                activity_buffer.flush()
@@ -0,0 +1,54 @@
+from django.db import models
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from organizations.models import Organization
+from projects.models import Projects
+
+
+class ActivityEvent(models.Model):
+    """
+    Entry of the append-only activity log. Entries outlive what they are
+    about, so their foreign keys have no constraint and deleting a row
+    leaves its history in place.
+    """
+    TASK_CREATED = 'task.created'
+    TASK_UPDATED = 'task.updated'
+    TASK_MOVED = 'task.moved'
+    TASK_ASSIGNED = 'task.assigned'
+    TASK_DELETED = 'task.deleted'
+    COLUMN_CREATED = 'column.created'
+    COLUMN_UPDATED = 'column.updated'
+    COLUMN_DELETED = 'column.deleted'
+    MEMBER_ADDED = 'member.added'
+    MEMBER_UPDATED = 'member.updated'
+    MEMBER_REMOVED = 'member.removed'
+
+    organization = models.ForeignKey(
+        Organization, on_delete=models.DO_NOTHING, related_name='+',
+        db_constraint=False)
+    # Null for events of the organization itself.
+    project = models.ForeignKey(
+        Projects, on_delete=models.DO_NOTHING, related_name='+',
+        db_constraint=False, null=True)
+    # Null for changes made outside of requests.
+    actor = models.ForeignKey(
+        get_user_model(), on_delete=models.DO_NOTHING, related_name='+',
+        db_constraint=False, null=True)
+    verb = models.CharField(max_length=50)
+    target_type = models.CharField(max_length=50)
+    target_id = models.BigIntegerField()
+    data = models.JSONField(default=dict)
+    # When the change happened, not when the event was written.
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['project', '-created_at', '-id'], name='activity_project_feed'),
+            models.Index(
+                fields=['actor', '-created_at', '-id'], name='activity_actor_feed'),
+        ]
+
+    def __str__(self):
+        return f"{self.verb} {self.target_type} #{self.target_id}"
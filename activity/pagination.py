@@ -0,0 +1,78 @@
+"""
+Keyset pagination of the activity feeds.
+
+Pages are read newest first along the ``(created_at, id)`` indexes of the
+feeds, starting after the last event of the previous page, so every page
+costs one index range scan however deep it is. The events of a user live
+on every shard: each page then reads the next events of each shard and
+keeps the newest.
+"""
+
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+ORDERING = ('-created_at', '-id')
+
+
+def encode_cursor(event):
+    position = f'{event.created_at.isoformat()}|{event.id}'
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise NotFound('Invalid cursor.') from None
+
+
+class FeedPagination:
+    page_size = 50
+    max_page_size = 200
+
+    def paginate(self, querysets, request):
+        """
+        Next page of the events of ``querysets``, merged newest first.
+        """
+        self.request = request
+        self.limit = self.get_limit(request)
+        cursor = request.query_params.get('cursor')
+
+        if cursor:
+            created_at, pk = decode_cursor(cursor)
+            after = Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            querysets = [queryset.filter(after) for queryset in querysets]
+
+        events = sorted(
+            (event for queryset in querysets
+             for event in queryset.order_by(*ORDERING)[:self.limit + 1]),
+            key=lambda event: (event.created_at, event.id),
+            reverse=True,
+        )
+        self.has_next = len(events) > self.limit
+        self.page = events[:self.limit]
+        return self.page
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.page_size))
+        except ValueError:
+            return self.page_size
+
+        return max(1, min(limit, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, 'cursor', encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
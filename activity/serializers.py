@@ -0,0 +1,19 @@
+"""
+Serializers for the activity app.
+"""
+
+from rest_framework import serializers
+
+from activity.models import ActivityEvent
+
+
+class ActivityEventSerializer(serializers.ModelSerializer):
+    """Serializer for the events of the activity feeds"""
+
+    class Meta:
+        model = ActivityEvent
+        fields = (
+            'id', 'organization', 'project', 'actor', 'verb', 'target_type',
+            'target_id', 'data', 'created_at',
+        )
+        read_only_fields = fields
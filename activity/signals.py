@@ -0,0 +1,103 @@
+"""
+Signal handlers logging the changes of tasks, columns and memberships.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from activity.buffer import record
+from activity.models import ActivityEvent
+from organizations.models import Membership
+from projects.models import ProjectMembership
+from tasks.models import Columns, Tasks
+
+
+@receiver(pre_save, sender=Tasks)
+def remember_task_state(sender, instance, raw, **kwargs):
+    # The counter state (project, column, assignee) is loaded by the tasks
+    # app and replaced once the counters are updated.
+    if not raw:
+        instance._activity_state = getattr(instance, '_counter_state', None)
+
+
+@receiver(post_save, sender=Tasks)
+def log_task_save(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+
+    def log(verb, **data):
+        record(verb, instance, instance.project.organization_id,
+               instance.project_id, data)
+
+    before = getattr(instance, '_activity_state', None)
+
+    if created or before is None:
+        log(ActivityEvent.TASK_CREATED, title=instance.title, column=instance.column_id)
+        return
+
+    _, column_id, assignee_id = before
+
+    if column_id != instance.column_id:
+        log(ActivityEvent.TASK_MOVED, from_column=column_id, to_column=instance.column_id)
+
+    if assignee_id != instance.assignee_id:
+        log(ActivityEvent.TASK_ASSIGNED, from_assignee=assignee_id,
+            to_assignee=instance.assignee_id)
+
+    if (column_id, assignee_id) == (instance.column_id, instance.assignee_id):
+        log(ActivityEvent.TASK_UPDATED, title=instance.title)
+
+
+@receiver(post_delete, sender=Tasks)
+def log_task_delete(sender, instance, origin=None, **kwargs):
+    # Tasks deleted along with their column or project are covered by the
+    # event of the column or project.
+    if not isinstance(origin, Tasks):
+        return
+
+    record(ActivityEvent.TASK_DELETED, instance, instance.project.organization_id,
+           instance.project_id, {'title': instance.title})
+
+
+@receiver(post_save, sender=Columns)
+def log_column_save(sender, instance, created, raw, update_fields=None, **kwargs):
+    if raw:
+        return
+
+    if created:
+        verb = ActivityEvent.COLUMN_CREATED
+    elif update_fields and 'deleted_at' in update_fields:
+        verb = ActivityEvent.COLUMN_DELETED
+    else:
+        verb = ActivityEvent.COLUMN_UPDATED
+
+    record(verb, instance, instance.project.organization_id, instance.project_id,
+           {'name': instance.name, 'position': instance.position})
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_save, sender=ProjectMembership)
+def log_membership_save(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+
+    verb = ActivityEvent.MEMBER_ADDED if created else ActivityEvent.MEMBER_UPDATED
+    log_membership(verb, instance)
+
+
+@receiver(post_delete, sender=Membership)
+@receiver(post_delete, sender=ProjectMembership)
+def log_membership_delete(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, (Membership, ProjectMembership)):
+        log_membership(ActivityEvent.MEMBER_REMOVED, instance)
+
+
+def log_membership(verb, membership):
+    if isinstance(membership, ProjectMembership):
+        project = membership.project
+        ids = (project.organization_id, project.id)
+    else:
+        ids = (membership.organization_id, None)
+
+    record(verb, membership, *ids,
+           {'user': membership.user_id, 'role': membership.role}, durable=True)
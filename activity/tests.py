@@ -0,0 +1,200 @@
+"""
+Tests for the activity app.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from activity.buffer import activity_buffer, record
+from activity.models import ActivityEvent
+
+from organizations.models import Membership
+from organizations.tests import create_organization, create_membership
+
+from projects.models import ProjectMembership
+from projects.tests import create_projects, create_project_membership
+
+from tasks.tests.test_columns import create_column
+from tasks.tests.test_tasks import create_task
+
+from users.tests import create_user
+
+
+def project_feed_url(project_id):
+    return reverse('activity:project', kwargs={'pk': project_id})
+
+
+def user_feed_url(user_id):
+    return reverse('activity:user', kwargs={'pk': user_id})
+
+
+class ActivityBufferTests(TestCase):
+    def setUp(self):
+        activity_buffer.clear()
+        self.addCleanup(activity_buffer.clear)
+
+        self.user = create_user(email='test@example.com', password='testpass123')
+        self.organization = create_organization(name='Acme', domain='acme.com')
+        self.project = create_projects(
+            name='Project', description='Description', organization=self.organization)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.column = create_column(project=self.project, name='To Do', position=1)
+            self.done = create_column(project=self.project, name='Done', position=2)
+
+    def test_changes_are_buffered_until_flushed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            task = create_task(
+                title='Task', description='Description', due_date=timezone.now(),
+                column=self.column, project=self.project, assignee=self.user)
+
+        self.assertFalse(ActivityEvent.objects.exists())
+        self.assertEqual(len(activity_buffer), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task.column = self.done
+            task.save()
+
+        self.assertEqual(activity_buffer.flush(), 4)
+        self.assertEqual(
+            list(ActivityEvent.objects.order_by('id').values_list('verb', flat=True)),
+            [ActivityEvent.COLUMN_CREATED, ActivityEvent.COLUMN_CREATED,
+             ActivityEvent.TASK_CREATED, ActivityEvent.TASK_MOVED])
+
+        moved = ActivityEvent.objects.get(verb=ActivityEvent.TASK_MOVED)
+
+        self.assertEqual(moved.data, {'from_column': self.column.id, 'to_column': self.done.id})
+        self.assertEqual(moved.target_id, task.id)
+        self.assertEqual(moved.organization_id, self.organization.id)
+        self.assertIsNone(moved.actor_id)
+
+    def test_rolled_back_changes_are_not_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                create_column(project=self.project, name='Review', position=3)
+                raise RuntimeError
+
+        self.assertEqual(len(activity_buffer), 2)
+
+    @override_settings(ACTIVITY_FLUSH_SIZE=3)
+    def test_buffer_is_flushed_when_full(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_column(project=self.project, name='Review', position=3)
+
+        self.assertEqual(ActivityEvent.objects.count(), 3)
+        self.assertEqual(len(activity_buffer), 0)
+
+    @override_settings(ACTIVITY_FLUSH_INTERVAL=0)
+    def test_buffer_is_flushed_when_due(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record(ActivityEvent.COLUMN_UPDATED, self.column, self.organization.id,
+                   self.project.id)
+
+        self.assertEqual(ActivityEvent.objects.count(), 3)
+
+    def test_deleted_rows_keep_their_history(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.column.delete()
+
+        activity_buffer.flush()
+        column_id = self.column.id
+        self.column.hard_delete()
+
+        self.assertEqual(ActivityEvent.objects.filter(target_id=column_id).count(), 2)
+
+
+class ActivityRequestTests(TransactionTestCase):
+    def setUp(self):
+        activity_buffer.clear()
+        self.addCleanup(activity_buffer.clear)
+
+        self.owner = create_user(email='owner@example.com', password='testpass123')
+        self.user = create_user(email='user@example.com', password='testpass123')
+        self.organization = create_organization(name='Acme', domain='acme.com')
+        create_membership(
+            organization=self.organization, user=self.owner, role=Membership.ROLE_OWNER)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_durable_events_are_written_at_request_end(self):
+        res = self.client.post(
+            reverse('organizations:add_member', kwargs={'pk': self.organization.id}),
+            {'user': self.user.id})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        event = ActivityEvent.objects.get(verb=ActivityEvent.MEMBER_ADDED, data__user=self.user.id)
+
+        self.assertEqual(event.actor_id, self.owner.id)
+        self.assertEqual(event.organization_id, self.organization.id)
+        self.assertIsNone(event.project_id)
+        self.assertEqual(len(activity_buffer), 0)
+
+
+class ActivityFeedTests(TestCase):
+    def setUp(self):
+        activity_buffer.clear()
+        self.addCleanup(activity_buffer.clear)
+
+        self.user = create_user(email='test@example.com', password='testpass123')
+        self.other = create_user(email='other@example.com', password='testpass123')
+        self.organization = create_organization(name='Acme', domain='acme.com')
+        self.project = create_projects(
+            name='Project', description='Description', organization=self.organization)
+        create_project_membership(
+            project=self.project, user=self.user, role=ProjectMembership.PROJECT_MEMBER)
+
+        now = timezone.now()
+        ActivityEvent.objects.bulk_create([
+            ActivityEvent(
+                organization=self.organization, project=self.project, actor=self.user,
+                verb=ActivityEvent.TASK_UPDATED, target_type='tasks', target_id=number,
+                created_at=now - timedelta(minutes=number // 2))
+            for number in range(5)
+        ])
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def read_feed(self, url):
+        target_ids = []
+
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            target_ids.extend(event['target_id'] for event in res.data['results'])
+            url = res.data['next']
+
+        return target_ids
+
+    def test_project_feed_pages_newest_first(self):
+        target_ids = self.read_feed(project_feed_url(self.project.id) + '?limit=2')
+
+        self.assertEqual(target_ids, [1, 0, 3, 2, 4])
+
+    def test_project_feed_requires_membership(self):
+        self.client.force_authenticate(self.other)
+
+        res = self.client.get(project_feed_url(self.project.id))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_user_feed(self):
+        self.assertEqual(len(self.read_feed(user_feed_url(self.user.id))), 5)
+
+        res = self.client.get(user_feed_url(self.other.id))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_cursor(self):
+        res = self.client.get(project_feed_url(self.project.id), {'cursor': 'nope'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
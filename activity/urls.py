@@ -0,0 +1,14 @@
+"""
+URLs for the activity app.
+"""
+
+from django.urls import path
+
+from .views import *
+
+app_name = 'activity'
+
+urlpatterns = [
+    path('projects/<int:pk>/', ProjectActivityView.as_view(), name='project'),
+    path('users/<int:pk>/', UserActivityView.as_view(), name='user'),
+]
@@ -0,0 +1,65 @@
+"""
+This file contains the views for the activity feeds.
+"""
+
+from django.conf import settings
+
+from rest_framework import generics, status
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+
+from core.profiling import serializer_data
+from projects.mixins import ProjectPermissionMixin
+from projects.models import Projects
+
+from activity.models import ActivityEvent
+from activity.pagination import FeedPagination
+from activity.serializers import ActivityEventSerializer
+
+
+class FeedMixin:
+    def feed_response(self, querysets):
+        paginator = FeedPagination()
+        page = paginator.paginate(querysets, self.request)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer_data(serializer))
+
+
+class ProjectActivityView(generics.GenericAPIView, ProjectPermissionMixin, FeedMixin):
+    """
+    Activity of a project, newest first.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = ActivityEventSerializer
+    shard_model = Projects
+
+    def get(self, request, *args, **kwargs):
+        permission_error = self.check_permissions_member(kwargs['pk'], request.user)
+
+        if permission_error:
+            return permission_error
+
+        return self.feed_response([ActivityEvent.objects.filter(project=kwargs['pk'])])
+
+
+class UserActivityView(generics.GenericAPIView, FeedMixin):
+    """
+    Activity of a user across every organization, newest first. Users only
+    see their own activity, staff sees everyone's.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = ActivityEventSerializer
+
+    def get(self, request, *args, **kwargs):
+        if request.user.pk != kwargs['pk'] and not request.user.is_staff:
+            return Response(
+                {"message": "You don't have a permission to do this action"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        return self.feed_response([
+            ActivityEvent.objects.using(alias).filter(actor=kwargs['pk'])
+            for alias in settings.SHARD_DATABASES
+        ])
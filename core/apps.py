@@ -1,6 +1,18 @@
+import atexit
+
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from core import checks  # noqa: F401
+        from core.querycache import install_write_tracking
+        from core.slowqueries import install_slow_query_log, slow_query_buffer
+
+        connection_created.connect(install_write_tracking)
+        connection_created.connect(install_slow_query_log)
+        atexit.register(slow_query_buffer.flush)
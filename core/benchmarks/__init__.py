@@ -0,0 +1,181 @@
+"""
+Microbenchmarks of the hot paths of the API.
+
+A benchmark is a function registered with ``@benchmark(name)``. It receives
+the ``Dataset`` to run against and returns the operation to time, a
+function without arguments, so that its own setup isn't timed::
+
+    @benchmark('render.task_list')
+    def render_task_list(dataset):
+        data = TaskListSerializer(dataset.tasks, many=True).data
+        return lambda: JSONRenderer().render(data)
+
+``run()`` times every call of the operation for the percentiles, then
+counts the queries and the memory allocated by a few more calls, which
+would skew the timings. Results are plain dicts, written as JSON by
+``manage.py bench`` and compared between runs by ``compare()``.
+"""
+
+import math
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+from django.db import connections
+from django.db.models import Count
+
+from organizations.sharding import select_global_related
+from projects.models import ProjectMembership
+from tasks.models import Tasks
+
+_benchmarks = {}
+
+
+class Dataset:
+    """
+    Seeded rows the benchmarks run against: a project, one of its members
+    and up to ``rows`` of its tasks.
+    """
+
+    def __init__(self, project_id=None, rows=1000):
+        if project_id is None:
+            # The biggest project, seed_scale skews their sizes.
+            project_id = (
+                Tasks.objects.values_list('project_id')
+                .annotate(size=Count('id')).order_by('-size')
+                .values_list('project_id', flat=True).first()
+            )
+
+        if project_id is None:
+            raise LookupError('No tasks to benchmark against.')
+
+        membership = ProjectMembership.objects.select_related('project').filter(
+            project_id=project_id).order_by('id').first()
+
+        if membership is None:
+            raise LookupError(f'Project {project_id} has no members.')
+
+        self.project = membership.project
+        self.user = select_global_related(
+            ProjectMembership.objects.filter(pk=membership.pk), 'user').get().user
+        self.tasks = list(select_global_related(
+            Tasks.objects.filter(project_id=project_id), 'assignee').order_by('id')[:rows])
+
+
+def benchmark(name):
+    def register(func):
+        _benchmarks[name] = func
+        return func
+
+    return register
+
+
+def get_benchmarks():
+    # Registered on import.
+    from core.benchmarks import hot_paths  # noqa: F401
+
+    return dict(_benchmarks)
+
+
+def percentile(sorted_values, percent):
+    """
+    Nearest-rank percentile of already sorted values.
+    """
+    rank = max(math.ceil(percent / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+def measure(operation, iterations, warmup=10, profiled=10):
+    """
+    Time ``iterations`` calls of ``operation`` after ``warmup`` calls, then
+    count the queries and allocations of ``profiled`` more calls.
+    """
+    for _ in range(warmup):
+        operation()
+
+    timings = []
+    started = time.perf_counter()
+
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - call_started)
+
+    elapsed = time.perf_counter() - started
+    timings.sort()
+
+    counter = QueryCounter()
+    peaks = []
+    tracemalloc.start()
+
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(counter))
+
+            for _ in range(profiled):
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                operation()
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 50) * 1000, 4),
+        'p95_ms': round(percentile(timings, 95) * 1000, 4),
+        'mean_ms': round(elapsed / iterations * 1000, 4),
+        'ops_per_sec': round(iterations / elapsed, 1),
+        'queries_per_op': round(counter.queries / max(profiled, 1), 2),
+        'alloc_peak_kb': round(max(peaks, default=0) / 1024, 1),
+    }
+
+
+def run(dataset, names=None, iterations=200, warmup=10):
+    """
+    Run the benchmarks (those whose name contains one of ``names``, when
+    given) against ``dataset``. Returns the results by benchmark name.
+    """
+    results = {}
+
+    for name, func in sorted(get_benchmarks().items()):
+        if names and not any(part in name for part in names):
+            continue
+
+        results[name] = measure(func(dataset), iterations, warmup)
+
+    return results
+
+
+def compare(baseline, results, threshold=0.1):
+    """
+    Compare ``results`` to the ``baseline`` results of the same benchmarks.
+    Returns ``(name, field, before, after)`` for every p50 slower by more
+    than ``threshold`` and every query count that grew.
+    """
+    regressions = []
+
+    for name, result in results.items():
+        before = baseline.get(name)
+
+        if before is None:
+            continue
+
+        if result['p50_ms'] > before['p50_ms'] * (1 + threshold):
+            regressions.append((name, 'p50_ms', before['p50_ms'], result['p50_ms']))
+
+        if result['queries_per_op'] > before['queries_per_op']:
+            regressions.append(
+                (name, 'queries_per_op', before['queries_per_op'], result['queries_per_op']))
+
+    return regressions
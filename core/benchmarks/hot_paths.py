@@ -0,0 +1,66 @@
+"""
+Benchmarks of the paths every task list request goes through.
+"""
+
+from django.test import RequestFactory
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.benchmarks import benchmark
+from organizations.sharding import select_global_related
+from projects.mixins import ProjectPermissionMixin
+from tasks.models import Tasks
+from tasks.serializer import TaskListSerializer
+
+
+@benchmark('serializer.task_list')
+def serialize_task_list(dataset):
+    # Served from the fragment cache after the warmup, like most lists.
+    return lambda: TaskListSerializer(dataset.tasks, many=True).data
+
+
+@benchmark('serializer.task_list.uncached')
+def serialize_task_list_uncached(dataset):
+    serializer = serializers.ListSerializer(child=TaskListSerializer())
+    return lambda: serializer.to_representation(dataset.tasks)
+
+
+@benchmark('permissions.check_member')
+def check_member(dataset):
+    view = ProjectPermissionMixin()
+    return lambda: view.check_permissions_member(dataset.project.id, dataset.user)
+
+
+@benchmark('query.task_list')
+def list_tasks(dataset):
+    queryset = select_global_related(
+        Tasks.objects.filter(project_id=dataset.project.id, column__deleted_at__isnull=True),
+        'assignee')
+    return lambda: list(queryset.all()[:len(dataset.tasks)])
+
+
+@benchmark('query.task_list.column')
+def list_column_tasks(dataset):
+    column_id = dataset.tasks[0].column_id
+    queryset = select_global_related(
+        Tasks.objects.filter(project_id=dataset.project.id, column_id=column_id,
+                             column__deleted_at__isnull=True),
+        'assignee')
+    return lambda: list(queryset.all()[:len(dataset.tasks)])
+
+
+@benchmark('render.task_list')
+def render_task_list(dataset):
+    data = TaskListSerializer(dataset.tasks, many=True).data
+    renderer = JSONRenderer()
+    return lambda: renderer.render(data)
+
+
+@benchmark('auth.jwt')
+def authenticate_jwt(dataset):
+    token = AccessToken.for_user(dataset.user)
+    request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+    authentication = JWTAuthentication()
+    return lambda: authentication.authenticate(request)
@@ -0,0 +1,119 @@
+"""
+Query budgets of the views.
+
+A view declares the most queries each of its methods may run, whatever the
+number of rows it returns::
+
+    class TaskListCreateView(generics.ListCreateAPIView):
+        query_budget = {'GET': 4, 'POST': 9}
+
+``QueryBudgetMiddleware`` counts the queries of every request to such a
+view, on every database. The middleware before it in ``MIDDLEWARE``, like
+the tenant lookup and the activity flush, aren't counted. A request over
+budget is logged with the stacks of the first queries past the budget,
+which usually point at the loop running one query per row.
+
+When ``settings.QUERY_BUDGET_RAISE`` is set, as it is by
+``QueryBudgetTestRunner``, it raises ``QueryBudgetExceeded`` instead, so
+that a new per-row query fails the tests exercising the view.
+"""
+
+import logging
+import traceback
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def get_query_budget(request):
+    """
+    Budget of the view handling ``request``, or None if it has none.
+    """
+    match = request.resolver_match
+    view_class = getattr(getattr(match, 'func', None), 'view_class', None)
+    budget = getattr(view_class, 'query_budget', None)
+
+    return budget.get(request.method) if budget else None
+
+
+def project_stack():
+    """
+    Frames of the current stack below this middleware that belong to the
+    project.
+    """
+    base_dir = str(settings.BASE_DIR)
+    stack = traceback.extract_stack()[:-2]
+    start = max(
+        (index for index, frame in enumerate(stack) if frame.filename == __file__),
+        default=-1,
+    )
+
+    return [
+        frame for frame in stack[start + 1:]
+        if frame.filename.startswith(base_dir) and 'site-packages' not in frame.filename
+    ]
+
+
+class QueryCounter:
+    def __init__(self, budget):
+        self.budget = budget
+        self.queries = 0
+        # (sql, stack) of the first queries past the budget.
+        self.samples = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+
+        if self.budget is not None and self.queries > self.budget \
+                and len(self.samples) < settings.QUERY_BUDGET_STACK_SAMPLES:
+            self.samples.append((sql, project_stack()))
+
+        return execute(sql, params, many, context)
+
+    def report(self, view_name, method):
+        lines = [
+            f'{method} {view_name} ran {self.queries} queries, '
+            f'over its budget of {self.budget}.'
+        ]
+
+        for number, (sql, stack) in enumerate(self.samples, self.budget + 1):
+            lines.append(f'Query {number}: {sql}')
+            lines.extend(line.rstrip() for line in traceback.format_list(stack))
+
+        return '\n'.join(lines)
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # The view is only known once the URL is resolved, in
+        # ``process_view()``, which sets the budget of the counter.
+        counter = request.query_counter = QueryCounter(budget=None)
+
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(counter))
+
+            response = self.get_response(request)
+
+        if counter.budget is not None and counter.queries > counter.budget:
+            message = counter.report(request.resolver_match.view_name, request.method)
+
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(message)
+
+            logger.warning(message)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_counter.budget = get_query_budget(request)
@@ -0,0 +1,206 @@
+"""
+Helpers for the versioned response cache.
+
+Every project has a version counter in the cache. Cached responses are keyed
+by that version, so a write anywhere in the project invalidates all of its
+entries by bumping a single counter instead of looking up and deleting keys.
+
+The counters must be shared by every process serving the project, or a
+write in one process leaves the others serving stale entries: with
+``SERVER_PROCESSES`` above 1, a process-local ``RESPONSE_CACHE_ALIAS`` fails
+the system checks.
+
+Misses go through ``single_flight`` so that concurrent requests for the
+same key compute the value once.
+"""
+
+import hashlib
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from core import metrics
+
+cache_requests = metrics.counter(
+    'cache_requests_total', 'Cache lookups by cache name and result.',
+    ['cache', 'result'])
+coalesced_waiters = metrics.counter(
+    'cache_coalesced_waiters_total',
+    'Callers that waited for, or were served stale instead of, a computation '
+    'already running for the same key.', ['cache'])
+
+# Polling interval while another process holds the lock for a key.
+LOCK_POLL_INTERVAL = 0.05
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def project_version_key(project_id):
+    return f'project:{project_id}:version'
+
+
+def get_project_version(project_id):
+    cache = get_cache()
+    key = project_version_key(project_id)
+    version = cache.get(key)
+
+    if version is None:
+        # Start from the clock rather than from zero, so a counter that was
+        # evicted never comes back at a version that still has entries.
+        version = time.time_ns()
+
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+
+    return version
+
+
+def bump_project_version(project_id):
+    cache = get_cache()
+    key = project_version_key(project_id)
+
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def invalidate_project(project_id):
+    """
+    Invalidate every cached response of a project.
+
+    The version is bumped right away and again once the surrounding
+    transaction commits, so a response computed by another request while
+    the write was still uncommitted doesn't survive the commit.
+    """
+    if project_id is None:
+        return
+
+    bump_project_version(project_id)
+    transaction.on_commit(lambda: bump_project_version(project_id))
+
+
+def invalidate_projects(project_ids):
+    for project_id in set(project_ids):
+        invalidate_project(project_id)
+
+
+def normalize_query_params(query_params):
+    """
+    Canonical string for a QueryDict, independent of parameter order.
+    """
+    return '&'.join(
+        f'{name}={value}'
+        for name in sorted(query_params)
+        for value in sorted(query_params.getlist(name))
+    )
+
+
+def response_cache_key(namespace, project_id, query_params):
+    params = hashlib.md5(
+        normalize_query_params(query_params).encode(), usedforsecurity=False
+    ).hexdigest()
+    version = get_project_version(project_id)
+
+    return f'response:{namespace}:{project_id}:{version}:{params}'
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.has_value = False
+        self.value = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def single_flight(key, compute, timeout, *, name='default', lock_timeout=10,
+                  stale_timeout=0, cacheable=None, cache=None):
+    """
+    Return the value cached under ``key``, computing it with ``compute`` on a
+    miss. Only one caller per key computes at a time: other threads of this
+    process wait for its result and other processes wait on a lock in the
+    cache, for at most ``lock_timeout`` seconds before computing themselves.
+
+    With ``stale_timeout``, entries are kept that many seconds after they
+    expire, and callers that find another computation running are served
+    the stale value instead of waiting for it.
+
+    ``cacheable`` decides whether a computed value is stored; by default
+    every value is.
+    """
+    cache = cache or get_cache()
+    entry = cache.get(key)
+    now = time.time()
+
+    if entry is not None and entry[0] > now:
+        cache_requests.inc(cache=name, result='hit')
+        return entry[1]
+
+    stale = entry is not None and stale_timeout > 0
+    cache_requests.inc(cache=name, result='stale' if stale else 'miss')
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        coalesced_waiters.inc(cache=name)
+
+        if stale:
+            return entry[1]
+
+        if flight.done.wait(lock_timeout) and flight.has_value:
+            return flight.value
+
+        return compute()
+
+    try:
+        lock_key = f'{key}:lock'
+        token = uuid.uuid4().hex
+        locked = cache.add(lock_key, token, lock_timeout)
+
+        if not locked:
+            coalesced_waiters.inc(cache=name)
+
+            if stale:
+                return entry[1]
+
+            deadline = time.time() + lock_timeout
+
+            while time.time() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                entry = cache.get(key)
+
+                if entry is not None and entry[0] > time.time():
+                    flight.value, flight.has_value = entry[1], True
+                    return entry[1]
+
+        try:
+            value = compute()
+        finally:
+            if locked and cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+        if cacheable is None or cacheable(value):
+            cache.set(key, (time.time() + timeout, value),
+                      timeout + stale_timeout)
+
+        flight.value, flight.has_value = value, True
+        return value
+    finally:
+        with _flights_lock:
+            del _flights[key]
+
+        flight.done.set()
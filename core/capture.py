@@ -0,0 +1,141 @@
+"""
+Capture of the API traffic, for ``manage.py replay_traffic``.
+
+When ``settings.TRAFFIC_CAPTURE_PATH`` is set, ``TrafficCaptureMiddleware``
+appends a JSON line per request (a ``TRAFFIC_CAPTURE_SAMPLE_RATE`` share of
+them) to that file::
+
+    {"ts": 1760000000.123, "method": "PATCH", "route": "tasks:task_detail",
+     "path": "/api/tasks/12/", "params": {}, "body": {"column": 3},
+     "user": 7, "status": 200, "ms": 18.4, "size": 212}
+
+The file is opened in append mode and every line is written with a single
+``write()``, so the processes of a server can share it.
+
+Nothing identifying is kept: the values of secrets (passwords, tokens) are
+dropped and strings are replaced by as many ``x``, except for timestamps,
+in the body and in the query string alike. Numbers, mostly ids, and the
+structure of the body stay, which is what the replay needs to hit the same
+rows with requests of the same size.
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from core.context import get_request_context
+
+# Keys whose values are never captured, matched as substrings.
+SECRET_KEYS = ('password', 'token', 'secret', 'access', 'refresh', 'authorization')
+
+REDACTED = '[redacted]'
+
+DATETIME_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?(Z|[+-]\d{2}:?\d{2})?$')
+
+
+def is_secret(key):
+    key = str(key).lower()
+    return any(secret in key for secret in SECRET_KEYS)
+
+
+def shape(value):
+    """
+    ``value`` with its secrets dropped and its strings blanked.
+    """
+    if isinstance(value, dict):
+        return {key: REDACTED if is_secret(key) else shape(item) for key, item in value.items()}
+
+    if isinstance(value, list):
+        return [shape(item) for item in value]
+
+    if isinstance(value, str) and not DATETIME_PATTERN.match(value):
+        return 'x' * len(value)
+
+    return value
+
+
+def shape_params(query):
+    """
+    Query string ``query`` shaped like a body: its values are strings, so
+    the numeric ones, mostly ids, are kept as they are.
+    """
+    return {
+        key: REDACTED if is_secret(key) else [
+            value if value.isdigit() else shape(value) for value in query.getlist(key)
+        ]
+        for key in query
+    }
+
+
+def request_body(request):
+    if request.content_type != 'application/json' or not request.body:
+        return None
+
+    try:
+        return shape(json.loads(request.body))
+    except ValueError:
+        return None
+
+
+_files = {}
+_files_lock = threading.Lock()
+
+
+def append_line(path, record):
+    with _files_lock:
+        fd = _files.get(path)
+
+        if fd is None:
+            fd = _files[path] = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+
+    os.write(fd, (json.dumps(record, separators=(',', ':')) + '\n').encode())
+
+
+def read_capture(path):
+    """
+    The captured requests of ``path``, oldest first.
+    """
+    with open(path) as file:
+        records = [json.loads(line) for line in file if line.strip()]
+
+    return sorted(records, key=lambda record: record['ts'])
+
+
+class TrafficCaptureMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        path = settings.TRAFFIC_CAPTURE_PATH
+
+        if not path or random.random() >= settings.TRAFFIC_CAPTURE_SAMPLE_RATE:
+            return self.get_response(request)
+
+        # Read before the view, which may consume the stream.
+        body = request_body(request)
+        ts = time.time()
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        context = get_request_context()
+
+        append_line(path, {
+            'ts': round(ts, 3),
+            'method': request.method,
+            'route': match.view_name if match is not None else None,
+            'path': request.path,
+            'params': shape_params(request.GET),
+            'body': body,
+            'user': context.user_id if context is not None else None,
+            'status': response.status_code,
+            'ms': round(elapsed * 1000, 2),
+            'size': len(response.content) if not response.streaming else None,
+        })
+        return response
@@ -0,0 +1,47 @@
+"""
+System checks of the settings of the core app.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+
+
+def shared_cache_settings():
+    """
+    ``(setting, alias)`` of the caches every process must see the same
+    values in: they hold versions and flags that invalidate per-process
+    state when another process writes.
+    """
+    aliases = [
+        ('RESPONSE_CACHE_ALIAS', settings.RESPONSE_CACHE_ALIAS),
+        ('QUERY_CACHE_ALIAS', settings.QUERY_CACHE_ALIAS),
+    ]
+
+    if settings.DATABASE_REPLICAS:
+        aliases.append(('READ_YOUR_WRITES_CACHE_ALIAS', settings.READ_YOUR_WRITES_CACHE_ALIAS))
+
+    return aliases
+
+
+def is_process_local(alias):
+    return isinstance(caches[alias], LocMemCache)
+
+
+@register(Tags.caches)
+def check_shared_caches(app_configs, **kwargs):
+    if settings.SERVER_PROCESSES <= 1:
+        return []
+
+    return [
+        Error(
+            f'{setting} is the process-local cache {alias!r}, but '
+            f'SERVER_PROCESSES is {settings.SERVER_PROCESSES}.',
+            hint='Point it to a cache shared by the processes, such as Redis or '
+                 'Memcached, or set SERVER_PROCESSES to 1.',
+            id='core.E001',
+        )
+        for setting, alias in shared_cache_settings()
+        if is_process_local(alias)
+    ]
@@ -0,0 +1,64 @@
+"""
+Per-request context, available anywhere in the code handling a request.
+"""
+
+import threading
+from contextvars import ContextVar
+
+from django.utils.functional import SimpleLazyObject, empty
+
+_current_context = ContextVar('request_context', default=None)
+
+# Contexts of the requests being handled, by id of their thread, for the
+# sampling profiler (see core.sampler).
+active_requests = {}
+
+
+class RequestContext:
+    def __init__(self, request):
+        self.request = request
+        # Send every read of this request to the primary database, set once
+        # the request wrote or its user is pinned to the primary.
+        self.use_primary = False
+        # Depth of nested ``primary_reads()`` blocks.
+        self.primary_reads = 0
+
+    @property
+    def user_id(self):
+        """
+        Id of the authenticated user, or None before authentication.
+
+        Never triggers authentication itself: the session user of
+        ``AuthenticationMiddleware`` is lazy and DRF only replaces it once
+        the view authenticated the request.
+        """
+        user = self.request.__dict__.get('user')
+
+        if isinstance(user, SimpleLazyObject):
+            user = None if user._wrapped is empty else user._wrapped
+
+        if user is None or not user.is_authenticated:
+            return None
+
+        return user.pk
+
+
+def get_request_context():
+    return _current_context.get()
+
+
+class RequestContextMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        context = RequestContext(request)
+        token = _current_context.set(context)
+        thread_id = threading.get_ident()
+        active_requests[thread_id] = context
+
+        try:
+            return self.get_response(request)
+        finally:
+            active_requests.pop(thread_id, None)
+            _current_context.reset(token)
@@ -0,0 +1,130 @@
+"""
+SQLite backend tuned for concurrent readers and writers.
+
+Extends Django's sqlite3 backend with:
+
+- PRAGMAs applied to every new connection (WAL journaling, relaxed fsync,
+  memory-mapped I/O, a larger page cache and a busy timeout), configurable
+  with the ``pragmas`` option.
+- ``BEGIN IMMEDIATE`` for transactions opened by ``atomic()``, so a
+  transaction takes the write lock up front instead of failing with
+  "database is locked" when it upgrades from a read lock halfway through.
+- Retries with jittered exponential backoff when SQLite reports the
+  database as busy outside of a transaction, where retrying the statement
+  is safe.
+
+Options, all optional::
+
+    'OPTIONS': {
+        'pragmas': {'cache_size': -131072},  # merged into DEFAULT_PRAGMAS
+        'transaction_mode': 'IMMEDIATE',     # DEFERRED, IMMEDIATE or EXCLUSIVE
+        'busy_retries': 5,
+        'busy_backoff': 0.01,                # seconds, doubled every retry
+    }
+"""
+
+import random
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative values are in KiB: 64 MiB of page cache per connection.
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+}
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+# Maximum sleep between two retries, in seconds.
+MAX_BACKOFF = 1.0
+
+
+def apply_pragmas(connection, pragmas):
+    for name, value in pragmas.items():
+        connection.execute(f'PRAGMA {name} = {value}')
+
+
+def is_busy_error(error):
+    message = str(error).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def backoff_delay(attempt, base_delay):
+    """
+    Full-jitter exponential backoff: a random delay up to
+    ``base_delay * 2 ** attempt``.
+    """
+    return random.uniform(0, min(MAX_BACKOFF, base_delay * 2 ** attempt))
+
+
+class BusyRetryCursorWrapper(base.SQLiteCursorWrapper):
+    busy_retries = 0
+    busy_backoff = 0
+
+    def _retry(self, method, *args):
+        attempt = 0
+
+        while True:
+            try:
+                return method(*args)
+            except base.Database.OperationalError as error:
+                # Inside a transaction only the whole transaction can be
+                # retried, which is up to the caller.
+                if (
+                    attempt >= self.busy_retries
+                    or self.connection.in_transaction
+                    or not is_busy_error(error)
+                ):
+                    raise
+
+                time.sleep(backoff_delay(attempt, self.busy_backoff))
+                attempt += 1
+
+    def execute(self, query, params=None):
+        return self._retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        # The parameters may be a generator, which can only be consumed once.
+        param_list = list(param_list)
+        return self._retry(super().executemany, query, param_list)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = {**DEFAULT_PRAGMAS, **options.get('pragmas', {})}
+        self.transaction_mode = options.get(
+            'transaction_mode', 'IMMEDIATE').upper()
+        self.busy_retries = options.get('busy_retries', 5)
+        self.busy_backoff = options.get('busy_backoff', 0.01)
+
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"transaction_mode must be one of {', '.join(TRANSACTION_MODES)}.")
+
+        kwargs = super().get_connection_params()
+
+        for name in ('pragmas', 'transaction_mode', 'busy_retries', 'busy_backoff'):
+            kwargs.pop(name, None)
+
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        apply_pragmas(conn, self.pragmas)
+        return conn
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=BusyRetryCursorWrapper)
+        cursor.busy_retries = self.busy_retries
+        cursor.busy_backoff = self.busy_backoff
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
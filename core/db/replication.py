@@ -0,0 +1,29 @@
+"""
+Keeps SQLite replica files up to date with the primary through the SQLite
+online backup API.
+"""
+
+import sqlite3
+
+from django.db import connections
+
+
+def backup(source, target_path, pages_per_step=1024):
+    """
+    Copy the database of the sqlite3 connection ``source`` into the file at
+    ``target_path``. Readers of the target keep working during the copy;
+    they only wait while a step of ``pages_per_step`` pages is written.
+    """
+    target = sqlite3.connect(target_path)
+
+    try:
+        source.backup(target, pages=pages_per_step)
+    finally:
+        target.close()
+
+
+def sync_replica(alias, source_alias='default'):
+    source = connections[source_alias]
+    source.ensure_connection()
+
+    backup(source.connection, connections[alias].settings_dict['NAME'])
@@ -0,0 +1,128 @@
+"""
+Database routers.
+"""
+
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.context import get_request_context
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def get_cache():
+    return caches[settings.READ_YOUR_WRITES_CACHE_ALIAS]
+
+
+def primary_pin_key(user_id):
+    return f'db:primary-pin:{user_id}'
+
+
+@contextmanager
+def primary_reads():
+    """
+    Send the reads of the current request to the primary while active.
+    """
+    context = get_request_context()
+
+    if context is None:
+        yield
+        return
+
+    context.primary_reads += 1
+
+    try:
+        yield
+    finally:
+        context.primary_reads -= 1
+
+
+def reads_use_primary():
+    """
+    Whether the reads of the current request go to the primary although
+    replicas are configured, e.g. because its user just wrote.
+    """
+    context = get_request_context()
+
+    if context is None or not settings.DATABASE_REPLICAS:
+        return False
+
+    return PrimaryReplicaRouter().use_primary(context)
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends the reads of ``settings.REPLICA_READ_MODELS`` made while handling
+    a request to a random alias of ``settings.DATABASE_REPLICAS``, and
+    everything else to the primary.
+
+    Reads stay on the primary for the whole request when it is a write
+    (non-safe method), and for ``settings.READ_YOUR_WRITES_WINDOW`` seconds
+    after a user's last write, so clients see their own changes even while
+    the replicas lag behind. That pin is kept in the
+    ``READ_YOUR_WRITES_CACHE_ALIAS`` cache, which must be shared by the
+    processes for the next request of the user to see it.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        instance = hints.get('instance')
+
+        if not replicas or (instance is not None and instance._state.db):
+            return None
+
+        if model._meta.label_lower not in settings.REPLICA_READ_MODELS:
+            return None
+
+        context = get_request_context()
+
+        if context is None or self.use_primary(context):
+            return None
+
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        context = get_request_context()
+
+        if context is not None and settings.DATABASE_REPLICAS:
+            user_id = context.user_id
+            context.use_primary = True
+
+            if user_id is not None and getattr(context, 'pinned_user_id', None) != user_id:
+                get_cache().set(primary_pin_key(user_id), True,
+                                settings.READ_YOUR_WRITES_WINDOW)
+                context.pinned_user_id = user_id
+
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema along with the data when they are synced.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+
+        return None
+
+    def use_primary(self, context):
+        if (
+            context.use_primary
+            or context.primary_reads
+            or context.request.method not in SAFE_METHODS
+        ):
+            return True
+
+        user_id = context.user_id
+
+        if user_id is None:
+            return False
+
+        if getattr(context, 'checked_user_id', None) != user_id:
+            context.checked_user_id = user_id
+            context.use_primary = bool(get_cache().get(primary_pin_key(user_id)))
+
+        return context.use_primary
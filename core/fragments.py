@@ -0,0 +1,88 @@
+"""
+Per-object cache of serialized rows.
+
+List serializers using ``FragmentCachedListSerializer`` look up the
+serialized dict of every row by model, pk and ``updated_at`` (plus whatever
+else the child serializer adds in ``get_fragment_version``), and only
+serialize the rows that changed since they were last cached.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models
+from rest_framework import serializers
+
+from core.cache import cache_requests
+
+
+def get_cache():
+    return caches[settings.FRAGMENT_CACHE_ALIAS]
+
+
+class FragmentCacheMixin:
+    """
+    Serializer mixin enabling the fragment cache when used with
+    ``many=True``.
+    """
+
+    def get_fragment_version(self, instance):
+        """
+        Values that change whenever the representation of ``instance``
+        does. Override to add fields of related objects.
+        """
+        return (instance.updated_at.isoformat(),)
+
+    def get_fragment_key(self, instance):
+        version = ':'.join(str(part)
+                           for part in self.get_fragment_version(instance))
+
+        return (
+            f'fragment:{instance._meta.label_lower}:{type(self).__name__}:'
+            f'{instance.pk}:{version}'
+        )
+
+
+class FragmentCachedListSerializer(serializers.ListSerializer):
+    fragment_hits = 0
+    fragment_misses = 0
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        instances = list(iterable)
+        keys = [self.child.get_fragment_key(instance) for instance in instances]
+
+        cache = get_cache()
+        fragments = cache.get_many(keys)
+        missing = {}
+        representation = []
+
+        for instance, key in zip(instances, keys):
+            fragment = fragments.get(key)
+
+            if fragment is None:
+                fragment = missing[key] = self.child.to_representation(instance)
+
+            representation.append(fragment)
+
+        if missing:
+            cache.set_many(missing, settings.FRAGMENT_CACHE_TIMEOUT)
+
+        self.fragment_misses = len(missing)
+        self.fragment_hits = len(instances) - self.fragment_misses
+
+        cache_requests.inc(self.fragment_hits, cache='fragment', result='hit')
+        cache_requests.inc(self.fragment_misses, cache='fragment', result='miss')
+
+        return representation
+
+
+def fragment_cache_header(serializer):
+    """
+    ``X-Fragment-Cache`` header value reporting the hits of a list
+    serialization.
+    """
+    hits = serializer.fragment_hits
+    total = hits + serializer.fragment_misses
+    ratio = hits / total if total else 0
+
+    return f'hits={hits}; misses={serializer.fragment_misses}; ratio={ratio:.2f}'
@@ -0,0 +1,23 @@
+"""
+Background jobs of the core app.
+"""
+
+from collections import Counter
+
+from core.purge import purge_deleted as purge
+from jobs.queue import job, report_progress
+
+
+@job('core.purge_deleted')
+def purge_deleted(older_than=0, batch_size=500):
+    """
+    Purge the soft-deleted rows. Returns the rows deleted per model.
+    """
+    deleted = Counter()
+
+    def progress(model, count):
+        deleted[model._meta.label] += count
+        report_progress(deleted=dict(deleted))
+
+    purge(older_than, batch_size, progress)
+    return dict(deleted)
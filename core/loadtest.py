@@ -0,0 +1,297 @@
+"""
+Open-loop load generator driving the API over HTTP.
+
+Scenarios, registered with ``@scenario(name, weight)``, replay what the
+clients do: loading a board, creating and dragging tasks, listing members
+and refreshing their token. Arrivals follow a Poisson process at a fixed
+rate whatever the response times, as real traffic does: a closed loop
+waiting on each response would slow down with the server and hide its
+queueing. Scenarios still in flight past ``max_in_flight`` are dropped
+rather than queued on the client, and counted.
+
+Every request is timed and recorded by route, the URL name of its view,
+with its error class: the HTTP status, ``timeout`` or ``connection``.
+"""
+
+import asyncio
+import bisect
+import math
+import random
+import time
+from collections import Counter
+
+import httpx
+from django.urls import reverse
+
+# Upper bounds, in milliseconds, of the buckets of the latency histograms.
+BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, math.inf]
+
+_scenarios = {}
+
+
+def scenario(name, weight):
+    """
+    Register an async function of a ``Session`` as a scenario, run with
+    ``weight`` relative to the other scenarios.
+    """
+    def register(func):
+        _scenarios[name] = (func, weight)
+        return func
+
+    return register
+
+
+def get_scenarios():
+    return dict(_scenarios)
+
+
+def http_client(connections, timeout):
+    """
+    Client keeping at most ``connections`` connections open. Requests wait
+    for a free connection as long as it takes, ``timeout`` only bounds the
+    time to connect and to exchange the request and its response.
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+        timeout=httpx.Timeout(timeout, pool=None))
+
+
+def classify(response=None, error=None):
+    """
+    Error class of a request, or None if it succeeded.
+    """
+    if error is not None:
+        return 'timeout' if isinstance(error, httpx.TimeoutException) else 'connection'
+
+    if response.status_code >= 400:
+        return str(response.status_code)
+
+    return None
+
+
+class Histogram:
+    def __init__(self):
+        self.samples = []
+        self.counts = [0] * len(BUCKETS)
+
+    def record(self, milliseconds):
+        self.samples.append(milliseconds)
+        self.counts[bisect.bisect_left(BUCKETS, milliseconds)] += 1
+
+    def percentile(self, percent):
+        values = sorted(self.samples)
+        rank = max(math.ceil(percent / 100 * len(values)), 1)
+        return values[rank - 1]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = Counter()
+        self.scenarios = Counter()
+        self.dropped = 0
+
+    def record(self, route, milliseconds, error_class):
+        self.latencies.setdefault(route, Histogram()).record(milliseconds)
+
+        if error_class is not None:
+            self.errors[route, error_class] += 1
+
+    def summary(self, elapsed):
+        routes = {}
+
+        for route, histogram in sorted(self.latencies.items()):
+            routes[route] = {
+                'count': len(histogram.samples),
+                'errors': sum(count for (name, _), count in self.errors.items()
+                              if name == route),
+                'rps': round(len(histogram.samples) / elapsed, 1),
+                'p50_ms': round(histogram.percentile(50), 2),
+                'p90_ms': round(histogram.percentile(90), 2),
+                'p99_ms': round(histogram.percentile(99), 2),
+                'max_ms': round(max(histogram.samples), 2),
+                'histogram': dict(zip(map(str, BUCKETS), histogram.counts)),
+            }
+
+        return {
+            'elapsed': round(elapsed, 2),
+            'scenarios': dict(self.scenarios),
+            'dropped': self.dropped,
+            'routes': routes,
+            'errors': {f'{route} {error_class}': count
+                       for (route, error_class), count in sorted(self.errors.items())},
+        }
+
+
+class Session:
+    """
+    A user of the API, with the project its scenarios work on.
+    """
+
+    def __init__(self, load_test, email, user_id, project_id, column_ids, task_ids):
+        self.load_test = load_test
+        self.email = email
+        self.user_id = user_id
+        self.project_id = project_id
+        self.column_ids = column_ids
+        self.task_ids = task_ids
+        self.access = None
+        self.refresh = None
+
+    async def request(self, method, name, kwargs=None, params=None, json=None,
+                      authenticated=True):
+        """
+        Send a request to the view named ``name`` and record it. Returns
+        the response, or None when no response came.
+        """
+        load_test = self.load_test
+        url = load_test.base_url + reverse(name, kwargs=kwargs)
+
+        if params:
+            url += '?' + '&'.join(f'{key}={value}' for key, value in params.items())
+
+        headers = {'Authorization': f'Bearer {self.access}'} if authenticated else {}
+        started = time.perf_counter()
+
+        try:
+            response = await load_test.client.request(method, url, headers=headers, json=json)
+        except httpx.HTTPError as error:
+            response, error_class = None, classify(error=error)
+        else:
+            error_class = classify(response)
+
+        load_test.stats.record(
+            f'{method} {name}', (time.perf_counter() - started) * 1000, error_class)
+        return response
+
+    async def log_in(self, password):
+        response = await self.request(
+            'POST', 'users:token', json={'email': self.email, 'password': password},
+            authenticated=False)
+
+        if response is None or not response.is_success:
+            raise httpx.HTTPError(f'Could not log in as {self.email}: {response!r}')
+
+        tokens = response.json()
+        self.access, self.refresh = tokens['access'], tokens['refresh']
+
+
+@scenario('board_load', weight=50)
+async def board_load(session):
+    params = {'project_id': session.project_id}
+
+    await session.request('GET', 'tasks:columns_list_create', params=params)
+    await session.request('GET', 'tasks:tasks_list_create', params=params)
+    await session.request('GET', 'tasks:task_counts', params=params)
+
+
+@scenario('task_create', weight=10)
+async def task_create(session):
+    response = await session.request('POST', 'tasks:tasks_list_create', json={
+        'title': 'Load test task',
+        'description': 'Created by the load test.',
+        'due_date': '2025-06-01T12:00:00Z',
+        'column': session.load_test.rng.choice(session.column_ids),
+        'project': session.project_id,
+        'assignee': session.user_id,
+    })
+
+    if response is not None and response.is_success:
+        session.task_ids.append(response.json()['id'])
+
+
+@scenario('task_drag', weight=25)
+async def task_drag(session):
+    if not session.task_ids:
+        return
+
+    rng = session.load_test.rng
+    await session.request(
+        'PATCH', 'tasks:task_detail', kwargs={'pk': rng.choice(session.task_ids)},
+        json={'column': rng.choice(session.column_ids)})
+
+
+@scenario('member_list', weight=10)
+async def member_list(session):
+    await session.request('GET', 'projects:members', kwargs={'pk': session.project_id})
+
+
+@scenario('token_refresh', weight=5)
+async def token_refresh(session):
+    response = await session.request(
+        'POST', 'users:token_refresh', json={'refresh': session.refresh},
+        authenticated=False)
+
+    if response is not None and response.is_success:
+        tokens = response.json()
+        session.access = tokens['access']
+        # Only sent back when the refresh tokens rotate.
+        session.refresh = tokens.get('refresh', session.refresh)
+
+
+class LoadTest:
+    def __init__(self, base_url, users, rate, duration, seed=0, connections=50,
+                 max_in_flight=1000, timeout=10, scenarios=None):
+        """
+        ``users`` are ``(email, user_id, project_id, column_ids, task_ids)``
+        of the users to log in as, and the project they work on.
+        """
+        self.base_url = base_url.rstrip('/')
+        self.rate = rate
+        self.duration = duration
+        self.connections = connections
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.stats = Stats()
+        self.client = None
+        self.sessions = [Session(self, *user) for user in users]
+
+        scenarios = scenarios or get_scenarios()
+        self.scenario_names = list(scenarios)
+        self.scenario_funcs = [func for func, _ in scenarios.values()]
+        self.scenario_weights = [weight for _, weight in scenarios.values()]
+
+    async def run(self, password):
+        async with http_client(self.connections, self.timeout) as self.client:
+            await asyncio.gather(*(session.log_in(password) for session in self.sessions))
+            # Logins aren't part of the traffic.
+            self.stats = Stats()
+
+            in_flight = set()
+            started = time.perf_counter()
+            arrival = started
+
+            while True:
+                arrival += self.rng.expovariate(self.rate)
+
+                if arrival - started >= self.duration:
+                    break
+
+                await asyncio.sleep(max(arrival - time.perf_counter(), 0))
+
+                if len(in_flight) >= self.max_in_flight:
+                    self.stats.dropped += 1
+                    continue
+
+                index, = self.rng.choices(
+                    range(len(self.scenario_funcs)), weights=self.scenario_weights)
+                task = asyncio.create_task(self.run_scenario(
+                    self.scenario_names[index], self.scenario_funcs[index],
+                    self.rng.choice(self.sessions)))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+            if in_flight:
+                await asyncio.wait(in_flight)
+
+            return self.stats.summary(time.perf_counter() - started)
+
+    async def run_scenario(self, name, func, session):
+        self.stats.scenarios[name] += 1
+
+        try:
+            await func(session)
+        except Exception as error:
+            # An unexpected response, counted rather than ending the run.
+            self.stats.errors[f'scenario {name}', type(error).__name__] += 1
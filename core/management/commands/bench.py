@@ -0,0 +1,95 @@
+"""
+Run the microbenchmarks of core.benchmarks against the seeded data.
+"""
+
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core import benchmarks
+from organizations.sharding import shard_context
+
+
+class Command(BaseCommand):
+    help = 'Time the hot paths of the API on seeded data, see manage.py seed_scale.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--benchmark', action='append', dest='names',
+            help='Only run the benchmarks whose name contains this. Can be repeated.')
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--rows', type=int, default=1000,
+            help='Tasks serialized and listed per operation.')
+        parser.add_argument(
+            '--project', type=int, default=None,
+            help='Project to run against. Defaults to the biggest one.')
+        parser.add_argument(
+            '--shard', default='default',
+            help='Database alias holding the project.')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument(
+            '--compare', help='JSON file of an earlier run to compare the results to.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.1,
+            help='Slowdown of the p50 counted as a regression, 0.1 for 10%%.')
+
+    def handle(self, *args, **options):
+        baseline = None
+
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)['results']
+
+        with shard_context(options['shard']):
+            try:
+                dataset = benchmarks.Dataset(options['project'], options['rows'])
+            except LookupError as error:
+                raise CommandError(f'{error} Seed some with manage.py seed_scale.')
+
+            results = benchmarks.run(
+                dataset, options['names'], options['iterations'], options['warmup'])
+
+        self.stdout.write(
+            f'Project {dataset.project.id}, {len(dataset.tasks)} rows, '
+            f'{options["iterations"]} iterations\n')
+        self.stdout.write(
+            f'{"benchmark":<32}{"p50 ms":>10}{"p95 ms":>10}{"ops/s":>10}'
+            f'{"queries":>9}{"alloc KB":>10}')
+
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<32}{result["p50_ms"]:>10.3f}{result["p95_ms"]:>10.3f}'
+                f'{result["ops_per_sec"]:>10.0f}{result["queries_per_op"]:>9g}'
+                f'{result["alloc_peak_kb"]:>10.1f}')
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({
+                    'created_at': timezone.now().isoformat(),
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'database': connection.vendor,
+                    'project': dataset.project.id,
+                    'rows': len(dataset.tasks),
+                    'results': results,
+                }, file, indent=2)
+
+        if baseline is None:
+            return
+
+        regressions = benchmarks.compare(baseline, results, options['threshold'])
+
+        for name, field, before, after in regressions:
+            self.stdout.write(self.style.ERROR(
+                f'{name}: {field} went from {before:g} to {after:g}'))
+
+        if regressions:
+            raise CommandError(f'{len(regressions)} regressions against {options["compare"]}.')
+
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {options["compare"]}.'))
@@ -0,0 +1,159 @@
+"""
+Compare mixed read/write throughput of SQLite with its default settings and
+with the profile of the core.db.backends.sqlite3 engine.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.db.backends.sqlite3.base import (
+    DEFAULT_PRAGMAS,
+    apply_pragmas,
+    backoff_delay,
+    is_busy_error,
+)
+
+ROWS = 10_000
+
+
+class Profile:
+    def __init__(self, name, pragmas, begin, retries):
+        self.name = name
+        self.pragmas = pragmas
+        self.begin = begin
+        self.retries = retries
+
+    def connect(self, path):
+        # isolation_level=None: transactions are started explicitly, as
+        # Django does under autocommit.
+        connection = sqlite3.connect(
+            path, timeout=0 if self.pragmas else 5, isolation_level=None,
+            check_same_thread=False)
+        apply_pragmas(connection, self.pragmas)
+        return connection
+
+    def run(self, connection, statements, transaction):
+        """
+        Run the statements, in a transaction or in autocommit mode like
+        Django's reads outside of ``atomic()``.
+        """
+        attempt = 0
+
+        while True:
+            try:
+                if transaction:
+                    connection.execute(self.begin)
+
+                for sql, params in statements:
+                    connection.execute(sql, params).fetchall()
+
+                if transaction:
+                    connection.execute('COMMIT')
+
+                return
+            except sqlite3.OperationalError as error:
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+
+                if attempt >= self.retries or not is_busy_error(error):
+                    raise
+
+                time.sleep(backoff_delay(attempt, 0.01))
+                attempt += 1
+
+
+PROFILES = [
+    Profile('default', {}, 'BEGIN', retries=0),
+    Profile('tuned', DEFAULT_PRAGMAS, 'BEGIN IMMEDIATE', retries=5),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark mixed read/write SQLite throughput before and after tuning.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=5.0,
+                            help='Seconds to run each profile for.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['readers']} readers, {options['writers']} writers, "
+            f"{options['duration']}s per profile\n")
+        self.stdout.write(
+            f"{'profile':<10}{'reads/s':>12}{'writes/s':>12}{'errors':>10}")
+
+        for profile in PROFILES:
+            with tempfile.TemporaryDirectory() as directory:
+                reads, writes, errors = self.bench(
+                    profile, os.path.join(directory, 'bench.sqlite3'), **options)
+
+            duration = options['duration']
+            self.stdout.write(
+                f'{profile.name:<10}{reads / duration:>12.0f}'
+                f'{writes / duration:>12.0f}{errors:>10}')
+
+    def bench(self, profile, path, readers, writers, duration, **options):
+        setup = profile.connect(path)
+        setup.execute(
+            'CREATE TABLE tasks (id INTEGER PRIMARY KEY, column_id INTEGER, title TEXT)')
+        setup.execute('CREATE INDEX tasks_column ON tasks (column_id)')
+        setup.executemany(
+            'INSERT INTO tasks (column_id, title) VALUES (?, ?)',
+            [(i % 20, f'task {i}') for i in range(ROWS)])
+        setup.close()
+
+        counts = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + duration
+
+        def worker(write):
+            connection = profile.connect(path)
+            done = failed = 0
+            i = 0
+
+            while time.monotonic() < deadline:
+                i += 1
+                column = i % 20
+
+                if write:
+                    # Read-then-write, like a task update: the read lock has
+                    # to be upgraded unless the transaction is IMMEDIATE.
+                    statements = [
+                        ('SELECT id FROM tasks WHERE column_id = ? LIMIT 1', (column,)),
+                        ('UPDATE tasks SET title = ? WHERE column_id = ? AND id % 50 = ?',
+                         (f'moved {i}', column, i % 50)),
+                    ]
+                else:
+                    statements = [
+                        ('SELECT id, title FROM tasks WHERE column_id = ?', (column,)),
+                    ]
+
+                try:
+                    profile.run(connection, statements, transaction=write)
+                    done += 1
+                except sqlite3.OperationalError:
+                    failed += 1
+
+            connection.close()
+
+            with lock:
+                counts['writes' if write else 'reads'] += done
+                counts['errors'] += failed
+
+        threads = [threading.Thread(target=worker, args=(False,)) for _ in range(readers)]
+        threads += [threading.Thread(target=worker, args=(True,)) for _ in range(writers)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        return counts['reads'], counts['writes'], counts['errors']
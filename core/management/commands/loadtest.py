@@ -0,0 +1,178 @@
+"""
+Drive the API with a mix of realistic traffic, see core.loadtest.
+"""
+
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import BUCKETS, LoadTest, get_scenarios
+from organizations.sharding import shard_context
+from projects.models import ProjectMembership
+from tasks.models import Columns, Tasks
+from users.models import User
+
+# Tasks of each project the drag scenario picks from.
+DRAGGED_TASKS = 200
+
+
+class Command(BaseCommand):
+    help = 'Send weighted scenarios of API traffic at a fixed rate and report the latencies.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument(
+            '--start-server', action='store_true',
+            help='Start a development server on the host and port of --url.')
+        parser.add_argument('--rate', type=float, default=20, help='Scenarios per second.')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds.')
+        parser.add_argument(
+            '--users', type=int, default=20,
+            help='Seeded project members to log in as, see manage.py seed_scale.')
+        parser.add_argument('--password', default='password')
+        parser.add_argument(
+            '--shard', default='default', help='Database alias to pick the users from.')
+        parser.add_argument(
+            '--scenario', action='append', default=[], metavar='NAME=WEIGHT',
+            help='Change the weight of a scenario, 0 to leave it out. Can be repeated.')
+        parser.add_argument('--connections', type=int, default=50)
+        parser.add_argument(
+            '--max-in-flight', type=int, default=1000,
+            help='Scenarios arriving while this many are running are dropped.')
+        parser.add_argument('--timeout', type=float, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the summary to this JSON file.')
+
+    def handle(self, *args, **options):
+        scenarios = self.get_scenarios(options['scenario'])
+        users = self.load_users(options['users'], options['shard'], options['seed'])
+        server = self.start_server(options['url']) if options['start_server'] else None
+
+        load_test = LoadTest(
+            options['url'], users, options['rate'], options['duration'],
+            seed=options['seed'], connections=options['connections'],
+            max_in_flight=options['max_in_flight'], timeout=options['timeout'],
+            scenarios=scenarios)
+
+        try:
+            summary = asyncio.run(load_test.run(options['password']))
+        except Exception as error:
+            raise CommandError(f'Load test failed: {error}')
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+        self.report(summary, options['rate'])
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(summary, file, indent=2)
+
+    def get_scenarios(self, weights):
+        scenarios = get_scenarios()
+
+        for value in weights:
+            name, _, weight = value.partition('=')
+
+            if name not in scenarios:
+                raise CommandError(
+                    f'Unknown scenario {name!r}, choose from {", ".join(scenarios)}.')
+
+            try:
+                scenarios[name] = (scenarios[name][0], float(weight))
+            except ValueError:
+                raise CommandError(f'Invalid weight {weight!r} for {name}.')
+
+        return {name: value for name, value in scenarios.items() if value[1] > 0}
+
+    def load_users(self, count, shard, seed):
+        with shard_context(shard):
+            memberships = list(ProjectMembership.objects.order_by('id').values_list(
+                'user_id', 'project_id')[:count * 100])
+
+            if not memberships:
+                raise CommandError('No project members to log in as. '
+                                   'Seed some with manage.py seed_scale.')
+
+            memberships = random.Random(seed).sample(memberships, min(count, len(memberships)))
+            project_ids = {project_id for _, project_id in memberships}
+            columns = {}
+
+            for project_id, column_id in Columns.objects.filter(
+                    project_id__in=project_ids).values_list('project_id', 'id'):
+                columns.setdefault(project_id, []).append(column_id)
+
+            tasks = {
+                project_id: list(Tasks.objects.filter(project_id=project_id)
+                                 .order_by('id').values_list('id', flat=True)[:DRAGGED_TASKS])
+                for project_id in project_ids
+            }
+
+        emails = dict(User.objects.filter(
+            id__in=[user_id for user_id, _ in memberships]).values_list('id', 'email'))
+
+        return [
+            (emails[user_id], user_id, project_id, columns[project_id], tasks[project_id])
+            for user_id, project_id in memberships if project_id in columns
+        ]
+
+    def start_server(self, url):
+        parts = urlsplit(url)
+        address = (parts.hostname, parts.port or 80)
+        server = subprocess.Popen(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'runserver',
+             f'{address[0]}:{address[1]}', '--noreload'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(address, timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+
+        server.terminate()
+        raise CommandError(f'The server did not start listening on {url}.')
+
+    def report(self, summary, rate):
+        elapsed = summary['elapsed']
+        scenarios = summary['scenarios']
+
+        self.stdout.write(
+            f'{sum(scenarios.values())} scenarios in {elapsed:.1f}s '
+            f'({sum(scenarios.values()) / elapsed:.1f}/s offered at {rate:g}/s), '
+            f'{summary["dropped"]} dropped')
+        self.stdout.write(', '.join(f'{name} {count}' for name, count in scenarios.items()))
+        self.stdout.write(
+            f'\n{"route":<36}{"count":>7}{"errors":>8}{"req/s":>8}'
+            f'{"p50":>9}{"p90":>9}{"p99":>9}{"max":>9}  (ms)')
+
+        for route, stats in summary['routes'].items():
+            self.stdout.write(
+                f'{route:<36}{stats["count"]:>7}{stats["errors"]:>8}{stats["rps"]:>8.1f}'
+                f'{stats["p50_ms"]:>9.1f}{stats["p90_ms"]:>9.1f}'
+                f'{stats["p99_ms"]:>9.1f}{stats["max_ms"]:>9.1f}')
+
+        self.stdout.write('\nLatency histograms (requests per bucket, upper bound in ms)')
+        self.stdout.write(f'{"route":<36}' + ''.join(
+            f'{"inf" if bound == float("inf") else bound:>7}' for bound in BUCKETS))
+
+        for route, stats in summary['routes'].items():
+            self.stdout.write(f'{route:<36}' + ''.join(
+                f'{count:>7}' for count in stats['histogram'].values()))
+
+        if summary['errors']:
+            self.stdout.write('\nErrors')
+
+            for error, count in summary['errors'].items():
+                self.stdout.write(self.style.ERROR(f'{error:<44}{count:>7}'))
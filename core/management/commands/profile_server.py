@@ -0,0 +1,75 @@
+"""
+Profile a running server through its sampling profiler endpoint, see
+core.sampler.
+"""
+
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core import sampler
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Sample the stacks of the requests a running server handles, as collapsed '
+            'stacks or speedscope JSON. Only the worker process answering is profiled, '
+            'and it must run several threads, e.g. gunicorn --threads, to serve other '
+            'requests meanwhile.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument(
+            '--interval', type=float, default=0.01, help='Seconds between two samples.')
+        parser.add_argument('--format', choices=sampler.FORMATS, default='collapsed')
+        parser.add_argument(
+            '--all-threads', action='store_true',
+            help='Sample every thread, not only those handling a request.')
+        parser.add_argument(
+            '--user', help='Email of the staff user to profile as. Defaults to any.')
+        parser.add_argument('--output', help='Write the profile to this file.')
+
+    def handle(self, *args, **options):
+        staff = User.objects.filter(is_staff=True, is_active=True)
+
+        if options['user']:
+            staff = staff.filter(email=options['user'])
+
+        user = staff.order_by('id').first()
+
+        if user is None:
+            raise CommandError('No staff user to profile as.')
+
+        params = {
+            'seconds': options['seconds'],
+            'interval': options['interval'],
+            'output': options['format'],
+        }
+
+        if options['all_threads']:
+            params['all_threads'] = 1
+
+        request = Request(
+            f'{options["url"].rstrip("/")}{reverse("profiler")}?{urlencode(params)}',
+            headers={'Authorization': f'Bearer {AccessToken.for_user(user)}'})
+
+        try:
+            with urlopen(request, timeout=options['seconds'] + 30) as response:
+                body = response.read().decode()
+        except HTTPError as error:
+            raise CommandError(f'The server answered {error.code}: {error.read().decode()}')
+        except URLError as error:
+            raise CommandError(f'Could not reach {options["url"]}: {error.reason}')
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(body)
+
+            self.stdout.write(f'Profile written to {options["output"]}.')
+        else:
+            self.stdout.write(body, ending='')
@@ -0,0 +1,28 @@
+"""
+Purge soft-deleted rows and the rows referencing them, in small batches.
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.purge import purge_deleted
+
+
+class Command(BaseCommand):
+    help = 'Delete soft-deleted rows for good, in batches of short transactions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Rows deleted per transaction.')
+        parser.add_argument(
+            '--older-than', type=float, default=0,
+            help='Only purge rows deleted at least this many seconds ago.')
+
+    def handle(self, *args, **options):
+        total = purge_deleted(
+            options['older_than'], options['batch_size'], self.report)
+
+        self.stdout.write(self.style.SUCCESS(f'Purged {total} rows.'))
+
+    def report(self, model, count):
+        self.stdout.write(f'Deleted {count} {model._meta.label} rows.')
@@ -0,0 +1,94 @@
+"""
+Replay traffic captured by core.capture against a server, see core.replay.
+"""
+
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.capture import read_capture
+from core.replay import Replay, regressions, summarize
+
+
+class Command(BaseCommand):
+    help = ('Send the requests of a traffic capture again, at their captured pace or '
+            'faster, and report the latency of each route.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('capture', help='File written by TrafficCaptureMiddleware.')
+        parser.add_argument(
+            '--url', default='http://127.0.0.1:8000',
+            help='Server to replay against, with a snapshot or seed of the captured data.')
+        parser.add_argument(
+            '--speed', type=float, default=1,
+            help='2 replays twice as fast as captured, 0 as fast as possible.')
+        parser.add_argument('--connections', type=int, default=50)
+        parser.add_argument('--timeout', type=float, default=10)
+        parser.add_argument('--output', help='Write the summary to this JSON file.')
+        parser.add_argument(
+            '--compare',
+            help='JSON file of an earlier replay to compare to, instead of the capture. '
+                 'Fails on regressions.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Growth of the p95 counted as a regression, 0.2 for 20%%.')
+
+    def handle(self, *args, **options):
+        if options['speed'] < 0:
+            raise CommandError('--speed must be positive, or 0.')
+
+        try:
+            records = read_capture(options['capture'])
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Could not read {options["capture"]}: {error}')
+
+        baseline = None
+
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)
+
+        replay = Replay(options['url'], records, speed=options['speed'],
+                        connections=options['connections'], timeout=options['timeout'])
+
+        if not replay.records:
+            raise CommandError(f'No requests to replay in {options["capture"]}.')
+
+        try:
+            results = asyncio.run(replay.run())
+        except Exception as error:
+            raise CommandError(f'Replay failed: {error}')
+
+        summary = summarize(results)
+        found = regressions(summary, baseline, options['threshold'])
+        self.report(summary, found)
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(summary, file, indent=2)
+
+        if baseline is None:
+            return
+
+        if found:
+            raise CommandError(f'{len(found)} regressions against {options["compare"]}.')
+
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {options["compare"]}.'))
+
+    def report(self, summary, found):
+        self.stdout.write(
+            f'{sum(route["count"] for route in summary.values())} requests replayed\n')
+        self.stdout.write(
+            f'{"route":<36}{"count":>7}{"errors":>8}{"status":>8}'
+            f'{"was p50":>9}{"was p95":>9}{"p50":>9}{"p95":>9}  (ms)')
+
+        for name, route in summary.items():
+            self.stdout.write(
+                f'{name:<36}{route["count"]:>7}{route["errors"]:>8}'
+                f'{route["status_changed"]:>8}'
+                f'{route["captured_p50_ms"]:>9.1f}{route["captured_p95_ms"]:>9.1f}'
+                f'{route["p50_ms"]:>9.1f}{route["p95_ms"]:>9.1f}')
+
+        for name, before, after in found:
+            self.stdout.write(self.style.ERROR(f'{name}: p95 went from {before:g} to {after:g}'))
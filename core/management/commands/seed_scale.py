@@ -0,0 +1,258 @@
+"""
+Generate a large data set with a realistic skew, to benchmark against.
+
+Project sizes and the tasks of each member of a project follow Zipf's law:
+a few projects hold most of the tasks, and most of the tasks of a project
+go to a few of its members. The same options and seed always generate the
+same rows.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from core.cache import invalidate_projects
+from organizations import sharding
+from organizations.models import Membership, Organization, OrganizationShard
+from projects.models import ProjectMembership, Projects
+from tasks.models import AssigneeTaskCount, ColumnTaskCount, Columns, Tasks
+from users.models import User
+
+COLUMN_NAMES = ['To Do', 'In Progress', 'Review', 'Done']
+
+# Share of the tasks in each column: finished tasks pile up in Done.
+COLUMN_CUM_WEIGHTS = list(accumulate([0.25, 0.1, 0.05, 0.6]))
+
+FIRST_NAMES = ['Ada', 'Alan', 'Barbara', 'Dennis', 'Edsger', 'Frances', 'Grace',
+               'Guido', 'John', 'Ken', 'Linus', 'Margaret', 'Niklaus', 'Radia']
+LAST_NAMES = ['Allen', 'Dijkstra', 'Hamilton', 'Hopper', 'Kernighan', 'Liskov',
+              'Lovelace', 'Perlman', 'Ritchie', 'Thompson', 'Torvalds', 'Turing']
+VERBS = ['Fix', 'Add', 'Refactor', 'Document', 'Test', 'Review', 'Deploy', 'Remove']
+NOUNS = ['login form', 'billing page', 'search index', 'API client', 'onboarding',
+         'export job', 'dashboard', 'audit log', 'mobile layout', 'rate limiter']
+
+TASK_FIELDS = ['created_at', 'updated_at', 'title', 'description', 'due_date',
+               'column', 'project', 'assignee']
+
+# Due dates are spread over the year from this date rather than from today,
+# so that a seed always generates the same rows.
+DUE_DATE_START = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def zipf_cum_weights(n, exponent):
+    """
+    Cumulative weights of the ranks 1 to ``n`` under Zipf's law, for
+    ``random.choices()``.
+    """
+    return list(accumulate(1 / rank ** exponent for rank in range(1, n + 1)))
+
+
+def zipf_split(total, n, exponent):
+    """
+    Split ``total`` into ``n`` parts following Zipf's law, largest first.
+    """
+    weights = [1 / rank ** exponent for rank in range(1, n + 1)]
+    scale = total / sum(weights)
+    sizes = [int(weight * scale) for weight in weights]
+
+    for index in range(total - sum(sizes)):
+        sizes[index % n] += 1
+
+    return sizes
+
+
+class Command(BaseCommand):
+    help = 'Generate organizations, users, projects, columns and tasks with a realistic skew.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orgs', type=int, default=10)
+        parser.add_argument('--users-per-org', type=int, default=50)
+        parser.add_argument('--projects-per-org', type=int, default=20)
+        parser.add_argument(
+            '--members-per-project', type=int, default=10,
+            help='Members of each project, drawn from the users of its organization.')
+        parser.add_argument(
+            '--tasks-per-project', type=int, default=500,
+            help='Average number of tasks of a project.')
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Zipf exponent of the project sizes and of the assignees. 0 is uniform.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Prefix of the generated emails and domains, to seed several data sets.')
+        parser.add_argument(
+            '--password', default='password',
+            help='Password of every generated user.')
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Rows inserted per transaction.')
+
+    def handle(self, *args, **options):
+        if options['members_per_project'] > options['users_per_org']:
+            raise CommandError('--members-per-project exceeds --users-per-org.')
+
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        # Hashing is slow by design: hash once, share the hash.
+        self.password = make_password(options['password'])
+
+        if User.objects.filter(email=self.email(0, 0)).exists():
+            raise CommandError(
+                f'The {options["prefix"]!r} data set exists, pass another --prefix.')
+
+        started = time.monotonic()
+        total = 0
+
+        for number in range(options['orgs']):
+            tasks = self.seed_organization(number)
+            total += tasks
+            self.stdout.write(
+                f'Organization {number + 1}/{options["orgs"]}: {tasks} tasks.')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {total} tasks in {elapsed:.1f}s '
+            f'({total / max(elapsed, 1e-9):.0f} tasks/s).'))
+
+    def email(self, organization, user):
+        return f'{self.options["prefix"]}.{organization}.{user}@example.com'
+
+    def seed_organization(self, number):
+        options = self.options
+        rng = self.rng
+        batch_size = options['batch_size']
+
+        users = User.objects.bulk_create([
+            User(email=self.email(number, index), password=self.password,
+                 first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES))
+            for index in range(options['users_per_org'])
+        ], batch_size=batch_size)
+        alias = sharding.choose_shard()
+
+        with sharding.shard_context(alias):
+            organization = Organization.objects.create(
+                name=f'{options["prefix"].title()} {number}',
+                domain=f'{options["prefix"]}-{number}.example.com')
+            Membership.objects.bulk_create([
+                Membership(organization=organization, user=user, role=role)
+                for user, role in zip(users, self.roles(
+                    len(users), Membership.ROLE_OWNER, Membership.ROLE_MANAGER,
+                    Membership.ROLE_MEMBER))
+            ], batch_size=batch_size)
+
+            projects = Projects.objects.bulk_create([
+                Projects(name=f'Project {index}', description='',
+                         organization=organization)
+                for index in range(options['projects_per_org'])
+            ], batch_size=batch_size)
+            total = self.seed_tasks(projects, users)
+
+            project_ids = [project.id for project in projects]
+            ColumnTaskCount.rebuild(project_ids)
+            AssigneeTaskCount.rebuild(project_ids)
+
+        sharding.set_directory_entry(
+            organization.id, alias, OrganizationShard.STATUS_ACTIVE)
+        invalidate_projects(project_ids)
+        return total
+
+    def roles(self, count, owner, manager, member):
+        """
+        Roles of ``count`` members: ``owner`` for the first, ``manager`` for
+        the next two and ``member`` for the others.
+        """
+        return [owner] + [manager] * min(2, count - 1) + [member] * max(count - 3, 0)
+
+    def seed_tasks(self, projects, users):
+        options = self.options
+        rng = self.rng
+        batch_size = options['batch_size']
+        skew = options['skew']
+
+        columns = Columns.objects.bulk_create([
+            Columns(project=project, name=name, position=position)
+            for project in projects
+            for position, name in enumerate(COLUMN_NAMES, 1)
+        ], batch_size=batch_size)
+
+        sizes = zipf_split(
+            options['tasks_per_project'] * len(projects), len(projects), skew)
+        rng.shuffle(sizes)
+
+        assignee_weights = zipf_cum_weights(options['members_per_project'], skew)
+        titles = [f'{verb} {noun}' for verb in VERBS for noun in NOUNS]
+        alias = router.db_for_write(Tasks)
+        connection = connections[alias]
+        # Values adapted for the database once, rather than once per row.
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        due_dates = [
+            connection.ops.adapt_datetimefield_value(DUE_DATE_START + timedelta(hours=hours))
+            for hours in range(365 * 24)
+        ]
+        project_members = []
+        batch = []
+        total = 0
+
+        for index, (project, size) in enumerate(zip(projects, sizes)):
+            # Shuffled by the sampling: the busiest member is anyone.
+            members = rng.sample(users, options['members_per_project'])
+            project_members.extend(
+                ProjectMembership(project=project, user=user, role=role)
+                for user, role in zip(members, self.roles(
+                    len(members), ProjectMembership.PROJECT_MANAGER,
+                    ProjectMembership.PROJECT_MEMBER, ProjectMembership.PROJECT_MEMBER)))
+
+            width = len(COLUMN_NAMES)
+            column_ids = [column.id for column in columns[index * width:(index + 1) * width]]
+            column_choices = rng.choices(column_ids, cum_weights=COLUMN_CUM_WEIGHTS, k=size)
+            assignee_choices = rng.choices(
+                [member.id for member in members], cum_weights=assignee_weights, k=size)
+
+            title_choices = rng.choices(titles, k=size)
+            due_date_choices = rng.choices(due_dates, k=size)
+
+            for number, title, due_date, column_id, assignee_id in zip(
+                    range(size), title_choices, due_date_choices, column_choices,
+                    assignee_choices):
+                batch.append((now, now, f'{title} #{number}', '', due_date,
+                               column_id, project.id, assignee_id))
+
+                if len(batch) >= batch_size:
+                    total += self.insert_tasks(alias, batch)
+                    batch = []
+
+        total += self.insert_tasks(alias, batch)
+        ProjectMembership.objects.bulk_create(project_members, batch_size=batch_size)
+        return total
+
+    def insert_tasks(self, alias, rows):
+        """
+        Insert tasks given as tuples of ``TASK_FIELDS`` values, adapted for
+        the database.
+
+        Plain SQL rather than ``bulk_create()``: building and compiling a
+        model instance per row takes ten times as long as the insert
+        itself. The counters are rebuilt once per organization instead.
+        """
+        if not rows:
+            return 0
+
+        connection = connections[alias]
+        quote = connection.ops.quote_name
+        columns = [quote(Tasks._meta.get_field(name).column) for name in TASK_FIELDS]
+        sql = (
+            f'INSERT INTO {quote(Tasks._meta.db_table)} ({", ".join(columns)}) '
+            f'VALUES ({", ".join(["%s"] * len(columns))})'
+        )
+
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+
+        return len(rows)
@@ -0,0 +1,90 @@
+"""
+Show the traces written by core.tracing to settings.TRACING_FILE_PATH.
+"""
+
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def span_tree(trace):
+    """
+    ``(depth, span)`` of the spans of ``trace``, each after its parent.
+    """
+    children = {}
+    ids = {span['span_id'] for span in trace['spans']}
+
+    for span in trace['spans']:
+        # The parent of the root span is in the calling service.
+        parent_id = span['parent_id'] if span['parent_id'] in ids else None
+        children.setdefault(parent_id, []).append(span)
+
+    def walk(parent_id, depth):
+        for span in sorted(children.get(parent_id, []), key=lambda span: span['start_ns']):
+            yield depth, span
+            yield from walk(span['span_id'], depth + 1)
+
+    return list(walk(None, 0))
+
+
+def root_of(trace):
+    return span_tree(trace)[0][1]
+
+
+class Command(BaseCommand):
+    help = 'Show the slowest traces of the trace file, span by span.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='Defaults to settings.TRACING_FILE_PATH.')
+        parser.add_argument(
+            '--view', help='Only the traces of the views whose URL name contains this.')
+        parser.add_argument('--trace-id', help='Only the trace with this id.')
+        parser.add_argument('--limit', type=int, default=1)
+
+    def handle(self, *args, **options):
+        path = options['file'] or settings.TRACING_FILE_PATH
+
+        if not path:
+            raise CommandError('No trace file: pass --file or set TRACING_FILE_PATH.')
+
+        try:
+            with open(path) as file:
+                traces = [json.loads(line) for line in file if line.strip()]
+        except OSError as error:
+            raise CommandError(f'Could not read {path}: {error}')
+
+        traces = [trace for trace in traces if trace['spans']]
+
+        if options['trace_id']:
+            traces = [trace for trace in traces if trace['trace_id'] == options['trace_id']]
+
+        if options['view']:
+            traces = [trace for trace in traces
+                      if options['view'] in root_of(trace)['attributes'].get('http.route', '')]
+
+        traces.sort(key=lambda trace: root_of(trace)['duration_ms'], reverse=True)
+
+        if not traces:
+            self.stdout.write('No traces.')
+            return
+
+        for trace in traces[:options['limit']]:
+            root = root_of(trace)
+            self.stdout.write(f'trace {trace["trace_id"]}  {root["duration_ms"]:.1f} ms')
+
+            for depth, span in span_tree(trace):
+                share = span['duration_ms'] / root['duration_ms'] * 100 if root['duration_ms'] else 0
+                name = span['name']
+
+                if span['name'] == 'db.query':
+                    name = f'db.query {span["attributes"]["db.statement"][:80]}'
+
+                self.stdout.write(
+                    f'{span["duration_ms"]:>10.1f} ms {share:>5.1f}%  {"  " * depth}{name}'
+                    f'{"  !" + span["error"] if span["error"] else ""}')
+
+            if trace['dropped_spans']:
+                self.stdout.write(f'{trace["dropped_spans"]} spans dropped.')
+
+            self.stdout.write('')
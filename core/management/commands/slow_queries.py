@@ -0,0 +1,67 @@
+"""
+Show the statements logged by core.slowqueries.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from core.models import SlowQuery
+
+ORDERINGS = {
+    'total': F('total_ms').desc(),
+    'max': F('max_ms').desc(),
+    'mean': (F('total_ms') / F('count')).desc(),
+    'count': F('count').desc(),
+}
+
+
+class Command(BaseCommand):
+    help = 'List the slowest statements of the slow query log.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--order-by', choices=ORDERINGS, default='total',
+            help='Sort by total, max or mean time, or by count.')
+        parser.add_argument(
+            '--view', help='Only the statements of the views whose URL name contains this.')
+        parser.add_argument(
+            '--plan', action='store_true', help='Show the SQL and query plan of each statement.')
+        parser.add_argument('--clear', action='store_true', help='Empty the log.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(f'Deleted {deleted} slow queries.')
+            return
+
+        queries = SlowQuery.objects.order_by(ORDERINGS[options['order_by']])
+
+        if options['view']:
+            queries = queries.filter(view__contains=options['view'])
+
+        queries = list(queries[:options['limit']])
+
+        if not queries:
+            self.stdout.write('No slow queries.')
+            return
+
+        self.stdout.write(
+            f'{"fingerprint":<18}{"count":>7}{"total ms":>11}{"mean ms":>10}{"max ms":>10}'
+            f'  {"view":<32}call site')
+
+        for query in queries:
+            self.stdout.write(
+                f'{query.fingerprint:<18}{query.count:>7}{query.total_ms:>11.1f}'
+                f'{query.total_ms / query.count:>10.1f}{query.max_ms:>10.1f}'
+                f'  {query.view or "-":<32}{query.call_site}')
+
+            if options['plan']:
+                self.stdout.write(f'    {query.sql}')
+
+                for line in query.plan.splitlines():
+                    self.stdout.write(f'      {line}')
+
+                self.stdout.write('')
+            else:
+                self.stdout.write(f'    {query.sql[:120]}')
@@ -0,0 +1,35 @@
+"""
+Copy the primary database into its SQLite read replicas.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db.replication import sync_replica
+
+
+class Command(BaseCommand):
+    help = 'Sync the read replicas in DATABASE_REPLICAS from the primary database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Keep syncing every INTERVAL seconds instead of syncing once.')
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('No replicas configured in DATABASE_REPLICAS.')
+
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                started = time.monotonic()
+                sync_replica(alias)
+                self.stdout.write(
+                    f'Synced {alias} in {time.monotonic() - started:.3f}s')
+
+            if options['interval'] is None:
+                return
+
+            time.sleep(options['interval'])
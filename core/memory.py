@@ -0,0 +1,238 @@
+"""
+Memory diagnostics of the requests, with ``tracemalloc``.
+
+When ``settings.MEMORY_PROFILING_SAMPLE_RATE`` is above 0, the first
+sampled request starts ``tracemalloc``, which then traces every allocation
+of the process: expect the requests to run slower, and only turn it on to
+investigate. For each sampled request, ``MemoryProfilingMiddleware``
+snapshots the traced memory before and after the view to record, by route:
+
+- the peak memory of the request, above what was allocated before it;
+- the allocation sites of the memory it left allocated when its response
+  was ready, by innermost frame and innermost frame of the project (the
+  serializer or queryset that led there);
+- the memory held at each of these sites over the successive snapshots.
+
+A site whose memory grew over the last ``MEMORY_LEAK_WINDOW`` snapshots, by
+at least ``MEMORY_LEAK_MIN_GROWTH`` bytes in all, is flagged as growing, and
+so are the routes allocating there: memory allocated by their requests is
+kept after them. With ``DEBUG`` on, ``connection.queries`` is one such site.
+
+Snapshots see the whole process: one sampled request is profiled at a time,
+but requests running alongside it in other threads are counted with it.
+The report is served to staff at ``/api/memory/``.
+"""
+
+import gc
+import random
+import threading
+import tracemalloc
+from collections import Counter, deque
+
+from django.conf import settings
+from django.db import connections
+
+from core.sampler import source_location
+
+# Allocation sites kept per route, the others are dropped.
+MAX_ROUTE_SITES = 50
+
+IGNORED_FILES = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+
+def frame_location(frame):
+    return f'{source_location(frame.filename)}:{frame.lineno}'
+
+
+def site_of(traceback):
+    """
+    ``(innermost frame, innermost frame of the project)`` of an allocation,
+    the second one None when it is the first one or out of the project.
+    """
+    base_dir = str(settings.BASE_DIR)
+    innermost = frame_location(traceback[-1])
+
+    for frame in reversed(traceback):
+        if frame.filename.startswith(base_dir) and 'site-packages' not in frame.filename:
+            location = frame_location(frame)
+            return innermost, (location if location != innermost else None)
+
+    return innermost, None
+
+
+def site_sizes(snapshot):
+    sizes = Counter()
+
+    for statistic in snapshot.statistics('traceback'):
+        sizes[site_of(statistic.traceback)] += statistic.size
+
+    return sizes
+
+
+def take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces(IGNORED_FILES)
+
+
+class RouteMemory:
+    def __init__(self):
+        self.requests = 0
+        self.peak_max = 0
+        self.peak_total = 0
+        self.allocated_total = 0
+        # Bytes left allocated by the requests, by site.
+        self.sites = Counter()
+
+
+class MemoryReport:
+    def __init__(self):
+        self.routes = {}
+        # Bytes held at each site of the routes, over the last snapshots.
+        self.history = {}
+        self.lock = threading.Lock()
+
+    def add(self, route, peak, allocated, sites, held):
+        """
+        Record a request of ``route`` and the memory ``held`` by site before
+        it.
+        """
+        with self.lock:
+            stats = self.routes.setdefault(route, RouteMemory())
+            stats.requests += 1
+            stats.peak_max = max(stats.peak_max, peak)
+            stats.peak_total += peak
+            stats.allocated_total += allocated
+            stats.sites.update({site: size for site, size in sites.items() if size > 0})
+
+            if len(stats.sites) > MAX_ROUTE_SITES:
+                stats.sites = Counter(dict(stats.sites.most_common(MAX_ROUTE_SITES)))
+
+            tracked = set().union(*(route.sites for route in self.routes.values()))
+
+            for site in tracked:
+                self.history.setdefault(
+                    site, deque(maxlen=settings.MEMORY_LEAK_WINDOW)).append(held.get(site, 0))
+
+            for site in set(self.history) - tracked:
+                del self.history[site]
+
+    def growth(self, site):
+        """
+        Growth of the memory held at ``site`` over the window, or 0 if it
+        didn't only grow.
+        """
+        history = self.history.get(site)
+
+        if history is None or len(history) < settings.MEMORY_LEAK_WINDOW:
+            return 0
+
+        values = list(history)
+
+        if any(later < earlier for earlier, later in zip(values, values[1:])):
+            return 0
+
+        growth = values[-1] - values[0]
+        return growth if growth >= settings.MEMORY_LEAK_MIN_GROWTH else 0
+
+    def summary(self, top=10):
+        with self.lock:
+            routes = {}
+
+            for route, stats in sorted(self.routes.items(),
+                                       key=lambda item: item[1].peak_max, reverse=True):
+                top_sites = [
+                    {
+                        'site': site,
+                        'via': via,
+                        'kb_per_request': round(size / stats.requests / 1024, 1),
+                        'growth_kb': round(self.growth((site, via)) / 1024, 1),
+                    }
+                    for (site, via), size in stats.sites.most_common(top)
+                ]
+                routes[route] = {
+                    'requests': stats.requests,
+                    'peak_kb_max': round(stats.peak_max / 1024, 1),
+                    'peak_kb_mean': round(stats.peak_total / stats.requests / 1024, 1),
+                    'allocated_kb_mean': round(stats.allocated_total / stats.requests / 1024, 1),
+                    'growing': any(self.growth(site) for site in stats.sites),
+                    'top_sites': top_sites,
+                }
+
+        try:
+            import resource
+        except ImportError:
+            # Windows.
+            max_rss_kb = None
+        else:
+            max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        summary = {
+            'tracing': tracemalloc.is_tracing(),
+            'max_rss_kb': max_rss_kb,
+            'routes': routes,
+        }
+
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            summary['traced_kb'] = round(current / 1024, 1)
+            summary['traced_peak_kb'] = round(peak / 1024, 1)
+
+        if settings.DEBUG:
+            summary['debug_queries_logged'] = sum(
+                len(connections[alias].queries_log) for alias in connections)
+
+        return summary
+
+    def clear(self):
+        with self.lock:
+            self.routes = {}
+            self.history = {}
+
+
+memory_report = MemoryReport()
+
+_profiling = threading.Lock()
+
+
+class MemoryProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.MEMORY_PROFILING_SAMPLE_RATE
+
+        if not rate or random.random() >= rate or not _profiling.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            return self.profile(request)
+        finally:
+            _profiling.release()
+
+    def profile(self, request):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(settings.MEMORY_PROFILING_FRAMES)
+
+        gc.collect()
+        before = take_snapshot()
+        start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+        response = self.get_response(request)
+
+        current, peak = tracemalloc.get_traced_memory()
+        after = take_snapshot()
+        held = site_sizes(before)
+        sites = site_sizes(after)
+        sites.subtract(held)
+
+        match = request.resolver_match
+        memory_report.add(
+            f'{request.method} {match.view_name if match is not None else "unresolved"}',
+            peak - start, current - start, sites, held)
+        return response
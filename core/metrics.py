@@ -0,0 +1,426 @@
+"""
+In-process metrics registry, exposed in the Prometheus text format at
+``/metrics`` to the scrapers allowed by ``settings.METRICS_ALLOWED_IPS`` and
+``settings.METRICS_TOKEN``.
+
+Values are kept in a dict of the process, unless
+``settings.METRICS_MULTIPROCESS_DIR`` is set: each process then writes its
+values to its own memory-mapped file in that directory, and ``/metrics``
+sums the files of every process, whichever worker serves it. The directory
+must be emptied when the server starts, not when a worker restarts: the
+files of exited workers keep their counts, so that counters never go back.
+"""
+
+import bisect
+import functools
+import glob
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Methods labelled as they are, the others, chosen by clients, as 'other'.
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+class LocalValues:
+    """
+    Values of the process, by ``(metric name, suffix, labels)``.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, items):
+        with self._lock:
+            for key, amount in items:
+                self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, key):
+        return self._values.get(key, 0)
+
+    def items(self):
+        with self._lock:
+            return list(self._values.items())
+
+
+class MmapValues:
+    """
+    Values of the process in a memory-mapped file, read by the others.
+
+    The file starts with the number of bytes in use, followed by entries of
+    a key length, the JSON encoded key, padding and an 8 byte aligned double.
+    Entries are only appended, and the length in use is updated once the
+    entry is complete, so readers never see a partial one. Only the process
+    owning the file writes to it.
+    """
+
+    INITIAL_SIZE = 64 * 1024
+    HEADER = struct.Struct('Q')
+    VALUE = struct.Struct('d')
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        size = os.fstat(self._file.fileno()).st_size
+
+        if size == 0:
+            size = self.INITIAL_SIZE
+            self._file.truncate(size)
+
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        self._used = self.HEADER.unpack_from(self._mmap)[0] or self.HEADER.size
+        self._positions = {
+            key: position for key, position in self.entries(self._mmap, self._used)
+        }
+
+    @classmethod
+    def entries(cls, data, used):
+        """
+        ``(key, position of the value)`` of the entries of ``data``.
+        """
+        position = cls.HEADER.size
+
+        while position < used:
+            length, = struct.unpack_from('I', data, position)
+            name, suffix, labels = json.loads(bytes(data[position + 4:position + 4 + length]))
+            position += cls.entry_size(length)
+            yield (name, suffix, tuple(map(tuple, labels))), position - cls.VALUE.size
+
+    @staticmethod
+    def entry_size(length):
+        # Key length and key, padded for the value to be 8 byte aligned.
+        return (4 + length + 7) // 8 * 8 + 8
+
+    @classmethod
+    def read(cls, path):
+        with open(path, 'rb') as file:
+            data = file.read()
+
+        if len(data) < cls.HEADER.size:
+            return {}
+
+        return {
+            key: cls.VALUE.unpack_from(data, position)[0]
+            for key, position in cls.entries(data, cls.HEADER.unpack_from(data)[0])
+        }
+
+    def _append(self, key):
+        encoded = json.dumps(key, separators=(',', ':')).encode()
+        size = self.entry_size(len(encoded))
+
+        if self._used + size > len(self._mmap):
+            capacity = len(self._mmap)
+
+            while self._used + size > capacity:
+                capacity *= 2
+
+            self._mmap.close()
+            self._file.truncate(capacity)
+            self._mmap = mmap.mmap(self._file.fileno(), capacity)
+
+        struct.pack_into(f'I{len(encoded)}s', self._mmap, self._used, len(encoded), encoded)
+        position = self._used + size - self.VALUE.size
+        self.VALUE.pack_into(self._mmap, position, 0.0)
+        self._used += size
+        self.HEADER.pack_into(self._mmap, 0, self._used)
+        self._positions[key] = position
+        return position
+
+    def inc(self, items):
+        with self._lock:
+            for key, amount in items:
+                position = self._positions.get(key)
+
+                if position is None:
+                    position = self._append(key)
+
+                value, = self.VALUE.unpack_from(self._mmap, position)
+                self.VALUE.pack_into(self._mmap, position, value + amount)
+
+    def get(self, key):
+        position = self._positions.get(key)
+        return 0 if position is None else self.VALUE.unpack_from(self._mmap, position)[0]
+
+
+_local_values = LocalValues()
+_process_values = None
+_process_values_lock = threading.Lock()
+
+
+def get_values():
+    """
+    Values the current process writes to.
+    """
+    global _process_values
+
+    directory = settings.METRICS_MULTIPROCESS_DIR
+
+    if not directory:
+        return _local_values
+
+    values = _process_values
+    path = os.path.join(directory, f'metrics_{os.getpid()}.db')
+
+    # A forked worker mustn't write to the file of its parent.
+    if values is None or values.path != path:
+        with _process_values_lock:
+            if _process_values is None or _process_values.path != path:
+                _process_values = MmapValues(path)
+
+            values = _process_values
+
+    return values
+
+
+def collect_values():
+    """
+    Values of every process, summed.
+    """
+    directory = settings.METRICS_MULTIPROCESS_DIR
+
+    if not directory:
+        return _local_values.items()
+
+    totals = {}
+
+    for path in glob.glob(os.path.join(directory, 'metrics_*.db')):
+        for key, value in MmapValues.read(path).items():
+            totals[key] = totals.get(key, 0) + value
+
+    return totals.items()
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+
+    return repr(float(value))
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+
+    escaped = (
+        (name, value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _labels(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def render(self, values):
+        """
+        Lines of the exposition of ``values``, ``{(suffix, labels): value}``.
+        """
+        return [
+            f'{self.name}{suffix}{format_labels(labels)} {format_value(value)}'
+            for (suffix, labels), value in sorted(values.items())
+        ]
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing value, optionally split by labels.
+    """
+
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        get_values().inc([((self.name, '', self._labels(labels)), amount)])
+
+    def value(self, **labels):
+        """
+        Value counted by the current process.
+        """
+        return get_values().get((self.name, '', self._labels(labels)))
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values, counted in buckets by upper bound.
+    """
+
+    type = 'histogram'
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        labels = self._labels(labels)
+        bound = self.buckets[bisect.bisect_left(self.buckets, value)]
+        # Buckets are counted apart and made cumulative when exposed.
+        get_values().inc([
+            ((self.name, '_bucket', labels + (('le', format_value(bound)),)), 1),
+            ((self.name, '_sum', labels), value),
+            ((self.name, '_count', labels), 1),
+        ])
+
+    def time(self, **labels):
+        """
+        Decorator observing the duration of the calls, in seconds.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, **labels)
+
+            return wrapper
+
+        return decorator
+
+    def render(self, values):
+        series = {}
+
+        for (suffix, labels), value in values.items():
+            if suffix == '_bucket':
+                series.setdefault(labels[:-1], {})[labels[-1][1]] = value
+            else:
+                series.setdefault(labels, {})[suffix] = value
+
+        lines = []
+
+        for labels, counts in sorted(series.items()):
+            total = 0
+
+            for bound in self.buckets:
+                total += counts.get(format_value(bound), 0)
+                lines.append(
+                    f'{self.name}_bucket{format_labels(labels + (("le", format_value(bound)),))} '
+                    f'{format_value(total)}')
+
+            lines.append(f'{self.name}_sum{format_labels(labels)} '
+                         f'{format_value(counts.get("_sum", 0))}')
+            lines.append(f'{self.name}_count{format_labels(labels)} '
+                         f'{format_value(counts.get("_count", 0))}')
+
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def get_or_create(self, metric_class, name, documentation, labelnames=(), **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+
+            if metric is None:
+                metric = metric_class(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f'{name} is already registered as a {metric.type}')
+
+            return metric
+
+    def collect(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def exposition(self):
+        """
+        The metrics and their values in the Prometheus text format.
+        """
+        values = {}
+
+        for (name, suffix, labels), value in collect_values():
+            values.setdefault(name, {})[suffix, labels] = value
+
+        lines = []
+
+        for metric in sorted(self.collect(), key=lambda metric: metric.name):
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.render(values.get(metric.name, {})))
+
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.get_or_create(Counter, name, documentation, labelnames)
+
+
+def histogram(name, documentation, labelnames=(), buckets=Histogram.DEFAULT_BUCKETS):
+    return REGISTRY.get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+request_duration = histogram(
+    'http_request_duration_seconds', 'Duration of the requests by route and status.',
+    ['method', 'route', 'status'])
+request_queries = histogram(
+    'http_request_queries', 'Database queries run by the views, by route.',
+    ['method', 'route'], buckets=(1, 2, 3, 5, 10, 20, 50, 100))
+permission_checks = histogram(
+    'permission_check_duration_seconds', 'Duration of the permission checks of the views.',
+    ['check'], buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+auth_failures = counter(
+    'http_auth_failures_total', 'Requests refused with 401, by route.', ['route'])
+
+
+class MetricsMiddleware:
+    """
+    Records the duration of every request, the queries of its view counted
+    by ``QueryBudgetMiddleware``, and the authentication failures. Routes
+    are URL names, the requests matching none are counted together, and so
+    are the requests with a method outside of ``METHODS``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        route = match.view_name if match is not None else 'unmatched'
+        method = request.method if request.method in METHODS else 'other'
+        request_duration.observe(
+            elapsed, method=method, route=route, status=response.status_code)
+
+        counter = getattr(request, 'query_counter', None)
+
+        if counter is not None and match is not None:
+            request_queries.observe(counter.queries, method=method, route=route)
+
+        if response.status_code == 401:
+            auth_failures.inc(route=route)
+
+        return response
@@ -1,9 +1,142 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.utils import timezone
+
+from core.querycache import CachedQuerySet
+
+
+class BaseQuerySet(CachedQuerySet):
+    """
+    Keeps ``updated_at`` current on the bulk paths, the way ``auto_now``
+    does on ``save()``.
+    """
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if 'updated_at' not in fields:
+            now = timezone.now()
+
+            for obj in objs:
+                obj.updated_at = now
+
+            fields = [*fields, 'updated_at']
+
+        return super().bulk_update(objs, fields, *args, **kwargs)
 
 
 class BaseModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BaseQuerySet.as_manager()
+
     class Meta:
         abstract = True
+
+
+class SoftDeleteQuerySet(BaseQuerySet):
+    def delete(self):
+        """
+        Soft-delete every row, see ``SoftDeleteModel.delete()``.
+        """
+        with transaction.atomic(using=self.db, savepoint=False):
+            instances = list(self)
+
+            for instance in instances:
+                instance.delete()
+
+        return len(instances), {self.model._meta.label: len(instances)}
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def hard_delete(self):
+        return super().delete()
+
+    hard_delete.alters_data = True
+    hard_delete.queryset_only = True
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """
+    Manager hiding soft-deleted rows.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class SoftDeleteModel(BaseModel):
+    """
+    Model whose ``delete()`` only sets ``deleted_at``, leaving the rows and
+    the rows referencing them to ``manage.py purge_deleted``, which removes
+    them in small batches.
+
+    ``objects`` hides deleted rows, ``all_objects`` doesn't.
+    """
+
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def delete(self, using=None, keep_parents=False):
+        """
+        Flag this row and the soft-deletable rows referencing it as deleted.
+        """
+        using = using or router.db_for_write(type(self), instance=self)
+
+        with transaction.atomic(using=using, savepoint=False):
+            if self.deleted_at is None:
+                self.deleted_at = timezone.now()
+                self.save(using=using, update_fields=['deleted_at', 'updated_at'])
+
+            for relation in self._meta.related_objects:
+                related_model = relation.related_model
+
+                if (
+                    issubclass(related_model, SoftDeleteModel)
+                    and relation.on_delete is models.CASCADE
+                ):
+                    related_model.objects.using(using).filter(
+                        **{relation.field.name: self}).delete()
+
+        return 1, {self._meta.label: 1}
+
+    delete.alters_data = True
+
+    def hard_delete(self, using=None, keep_parents=False):
+        return super().delete(using=using, keep_parents=keep_parents)
+
+    hard_delete.alters_data = True
+
+
+class SlowQuery(BaseModel):
+    """
+    Statement that ran slower than ``settings.SLOW_QUERY_THRESHOLD_MS``,
+    counted by view, see ``core.slowqueries``. ``updated_at`` is when it
+    was last seen.
+    """
+
+    fingerprint = models.CharField(max_length=16)
+    view = models.CharField(max_length=255, blank=True)
+    sql = models.TextField()
+    plan = models.TextField(blank=True)
+    call_site = models.CharField(max_length=500, blank=True)
+    count = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fingerprint', 'view'], name='unique_slow_query_view'),
+        ]
+
+    def __str__(self):
+        return f'{self.sql[:80]} ({self.count}x)'
@@ -0,0 +1,153 @@
+"""
+Per-request profiling.
+
+For a sample of the requests (``settings.PROFILING_SAMPLE_RATE``),
+``ProfilingMiddleware`` measures the number and total time of the SQL
+queries, the time spent serializing and rendering, and the total time of
+the request. They are sent back in a ``Server-Timing`` header, which the
+browser developer tools display, and logged as one JSON line tagged with
+the view name, e.g.::
+
+    {"view": "tasks:tasks_list_create", "method": "GET", "status": 200,
+     "queries": 4, "db_ms": 1.92, "serializer_ms": 3.1, "render_ms": 0.8,
+     "total_ms": 9.4}
+
+The serialization is the time spent in the ``serializer_data()`` calls of
+the views. Requests that aren't sampled pay for one random draw. Sampled
+ones pay for a couple of ``perf_counter()`` calls per query and per
+serialization.
+"""
+
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+from core.tracing import get_current_span, span
+
+logger = logging.getLogger(__name__)
+
+_current_profile = ContextVar('request_profile', default=None)
+
+
+class Profile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.render_time = 0.0
+        self.total_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """
+        ``execute_wrapper`` timing the queries.
+        """
+        started = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+    def timings(self):
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'serializer_ms': round(self.serializer_time * 1000, 2),
+            'render_ms': round(self.render_time * 1000, 2),
+            'total_ms': round(self.total_time * 1000, 2),
+        }
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries"',
+            f'serializer;dur={self.serializer_time * 1000:.2f}',
+            f'render;dur={self.render_time * 1000:.2f}',
+            f'total;dur={self.total_time * 1000:.2f}',
+        ])
+
+
+def get_current_profile():
+    return _current_profile.get()
+
+
+def serializer_data(serializer):
+    """
+    ``serializer.data``, timed while a profile is active and recorded as a
+    span of the current trace (see core.tracing). Views get the data of
+    their serializers through it.
+    """
+    profile = _current_profile.get()
+
+    if hasattr(serializer, '_data') or (profile is None and get_current_span() is None):
+        return serializer.data
+
+    with span(f'serialize {type(serializer).__name__}'):
+        if profile is None:
+            return serializer.data
+
+        started = time.perf_counter()
+
+        try:
+            return serializer.data
+        finally:
+            profile.serializer_time += time.perf_counter() - started
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.PROFILING_SAMPLE_RATE
+
+        if not rate or random.random() >= rate:
+            return self.get_response(request)
+
+        profile = Profile()
+        token = _current_profile.set(profile)
+
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(profile))
+
+                response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+
+        profile.total_time = time.perf_counter() - profile.started
+        response['Server-Timing'] = profile.server_timing()
+        self.log(request, response, profile)
+        return response
+
+    def process_template_response(self, request, response):
+        profile = _current_profile.get()
+
+        if profile is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                profile.render_time += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+
+        return response
+
+    def log(self, request, response, profile):
+        match = request.resolver_match
+
+        logger.info(json.dumps({
+            'view': match.view_name if match is not None else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **profile.timings(),
+        }))
@@ -0,0 +1,106 @@
+"""
+Removal of soft-deleted rows in bounded batches.
+
+Deleting a row through Django collects every row referencing it in memory
+and deletes them all in one transaction, holding the write lock of the
+database for as long as that takes. ``purge()`` instead deletes the rows
+referencing a batch of rows first, a batch at a time, and commits after
+each batch.
+
+Soft-deleted rows stay flagged until their own batch is deleted, so a purge
+interrupted at any point picks up where it stopped when it runs again.
+"""
+
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from core.models import SoftDeleteModel, SoftDeleteQuerySet
+from organizations.sharding import shard_context
+
+
+def cascade_relations(model):
+    """
+    Relations whose rows are deleted along with the rows of ``model``.
+    """
+    return [
+        relation for relation in model._meta.related_objects
+        if not relation.many_to_many and relation.on_delete is models.CASCADE
+    ]
+
+
+def get_manager(model):
+    """
+    Manager seeing every row of ``model``, soft-deleted or not.
+    """
+    if issubclass(model, SoftDeleteModel):
+        return model.all_objects
+
+    return model._default_manager
+
+
+def purge(queryset, batch_size=500, progress=None):
+    """
+    Delete the rows of ``queryset`` and every row referencing them,
+    ``batch_size`` rows per transaction. ``progress(model, count)`` is
+    called after each batch. Returns the number of rows deleted.
+    """
+    model = queryset.model
+    using = queryset.db
+    deleted = 0
+
+    while True:
+        pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+
+        if not pks:
+            return deleted
+
+        for relation in cascade_relations(model):
+            related_model = relation.related_model
+            deleted += purge(
+                get_manager(related_model).using(using).filter(
+                    **{f'{relation.field.name}__in': pks}),
+                batch_size,
+                progress,
+            )
+
+        with transaction.atomic(using=using):
+            batch = get_manager(model).using(using).filter(pk__in=pks)
+
+            if isinstance(batch, SoftDeleteQuerySet):
+                count = batch.hard_delete()[0]
+            else:
+                count = batch.delete()[0]
+
+        deleted += count
+
+        if progress is not None:
+            progress(model, count)
+
+
+def purge_deleted(older_than=0, batch_size=500, progress=None):
+    """
+    Purge the rows of every soft-delete model deleted at least
+    ``older_than`` seconds ago, on every shard. Returns the number of rows
+    deleted.
+    """
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    soft_delete_models = [
+        model for model in apps.get_models()
+        if issubclass(model, SoftDeleteModel)
+    ]
+    total = 0
+
+    for alias in settings.SHARD_DATABASES:
+        with shard_context(alias):
+            for model in soft_delete_models:
+                total += purge(
+                    model.all_objects.using(alias).filter(deleted_at__lte=cutoff),
+                    batch_size,
+                    progress,
+                )
+
+    return total
@@ -0,0 +1,233 @@
+"""
+Opt-in cache for queryset results.
+
+``Model.objects.filter(...).cached()`` stores the rows under a key made of
+the compiled SQL, its params and the current version of every table the SQL
+reads. Any write to one of those tables bumps that table's version, so the
+entries of every query reading it are skipped from then on.
+
+Writes are detected by an execute wrapper installed on each database
+connection. It sees every statement, so ``update()``, ``delete()``,
+``bulk_create()`` and raw SQL invalidate the same way ``save()`` does.
+
+Table versions must be shared by every process serving the project, so
+with ``SERVER_PROCESSES`` above 1 a process-local ``QUERY_CACHE_ALIAS``
+fails the system checks. Permission checks don't use ``cached()``: a member
+removed in one transaction must lose access right away.
+
+Table versions are shared by all aliases: a write on the primary must also
+invalidate the results read from its replicas.
+
+Inside a transaction that has written, the connection bypasses the cache:
+its reads may see uncommitted rows, which must never be shared. Results
+read inside any transaction aren't stored either, since the transaction
+may be looking at a snapshot older than the current table versions.
+"""
+
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+
+from core.cache import cache_requests
+
+TABLE_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+[`"]?(\w+)[`"]?', re.IGNORECASE)
+WRITE_PATTERN = re.compile(
+    r'\s*(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM'
+    r'|ALTER\s+TABLE|DROP\s+TABLE)\s+[`"]?(\w+)[`"]?',
+    re.IGNORECASE,
+)
+
+# Marker for "use QUERY_CACHE_TIMEOUT" in ``cached()``.
+DEFAULT_TIMEOUT = object()
+
+
+def get_cache():
+    return caches[settings.QUERY_CACHE_ALIAS]
+
+
+def table_version_key(table):
+    return f'querycache:table:{table}'
+
+
+def get_table_versions(tables):
+    cache = get_cache()
+    keys = [table_version_key(table) for table in sorted(tables)]
+    versions = cache.get_many(keys)
+
+    for key in keys:
+        if key not in versions:
+            # Start from the clock, like the project versions of the response
+            # cache, so an evicted version never reuses an old number.
+            version = time.time_ns()
+
+            if not cache.add(key, version, timeout=None):
+                version = cache.get(key, version)
+
+            versions[key] = version
+
+    return [versions[key] for key in keys]
+
+
+def bump_table_version(table):
+    cache = get_cache()
+    key = table_version_key(table)
+
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def track_writes(execute, sql, params, many, context):
+    """
+    Execute wrapper invalidating the tables written by a statement.
+    """
+    match = WRITE_PATTERN.match(sql)
+
+    if match is None:
+        return execute(sql, params, many, context)
+
+    connection = context['connection']
+    table = match.group(1)
+    result = execute(sql, params, many, context)
+
+    bump_table_version(table)
+
+    if connection.in_atomic_block:
+        # Bump again on commit: another connection may have cached the old
+        # rows under the new version while this transaction was open.
+        connection.querycache_dirty = True
+        transaction.on_commit(
+            lambda: bump_table_version(table),
+            using=connection.alias)
+
+    return result
+
+
+def install_write_tracking(sender, connection, **kwargs):
+    """
+    ``connection_created`` receiver adding ``track_writes`` to a connection.
+    """
+    if track_writes not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_writes)
+
+
+def fetch(using, query, iterable_name, compute, timeout):
+    """
+    Return the rows of ``query`` from the cache, or compute and store them.
+    """
+    connection = connections[using]
+    in_transaction = connection.in_atomic_block
+
+    if not in_transaction:
+        connection.querycache_dirty = False
+    elif getattr(connection, 'querycache_dirty', False):
+        cache_requests.inc(cache='query', result='bypass')
+        return compute()
+
+    try:
+        sql, params = query.get_compiler(using=using).as_sql()
+    except EmptyResultSet:
+        return compute()
+
+    tables = set(TABLE_PATTERN.findall(sql))
+    versions = get_table_versions(tables)
+    digest = hashlib.md5(
+        repr((iterable_name, sql, tuple(params), versions)).encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+    # Replicas share the entries of the primary they copy.
+    source = DEFAULT_DB_ALIAS if using in settings.DATABASE_REPLICAS else using
+    key = f'querycache:{source}:{digest}'
+
+    cache = get_cache()
+    rows = cache.get(key)
+
+    if rows is not None:
+        cache_requests.inc(cache='query', result='hit')
+        return rows
+
+    cache_requests.inc(cache='query', result='miss')
+    rows = compute()
+
+    # Replicas may lag behind the table versions, so only rows read from a
+    # primary are stored.
+    if (
+        not in_transaction
+        and using not in settings.DATABASE_REPLICAS
+        and len(rows) <= settings.QUERY_CACHE_MAX_ROWS
+    ):
+        cache.set(key, rows, timeout)
+
+    return rows
+
+
+class CachedQuerySet(models.QuerySet):
+    """
+    QuerySet with an opt-in result cache, see ``cached()``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cached = False
+        self._cache_timeout = None
+
+    def cached(self, timeout=DEFAULT_TIMEOUT):
+        """
+        Serve the results of this queryset from the query cache, for
+        ``timeout`` seconds (``None`` for no expiry).
+        """
+        clone = self._chain()
+        clone._cached = True
+        clone._cache_timeout = (
+            settings.QUERY_CACHE_TIMEOUT if timeout is DEFAULT_TIMEOUT else timeout)
+        return clone
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._cached = self._cached
+        clone._cache_timeout = self._cache_timeout
+        return clone
+
+    def _fetch_all(self):
+        if self._result_cache is None and self._cached:
+            self._result_cache = fetch(
+                self.db,
+                self.query,
+                self._iterable_class.__name__,
+                lambda: list(self._iterable_class(self)),
+                self._cache_timeout,
+            )
+
+        super()._fetch_all()
+
+    def exists(self):
+        if self._result_cache is None and self._cached:
+            return fetch(
+                self.db,
+                self.query.exists(),
+                'exists',
+                lambda: [super(CachedQuerySet, self).exists()],
+                self._cache_timeout,
+            )[0]
+
+        return super().exists()
+
+
+class CachedManager(models.Manager.from_queryset(CachedQuerySet)):
+    """
+    Manager caching every query of a model for ``timeout`` seconds, for
+    models that are read far more often than they are written.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        super().__init__()
+        self.cache_timeout = timeout
+
+    def get_queryset(self):
+        return super().get_queryset().cached(self.cache_timeout)
@@ -0,0 +1,151 @@
+"""
+Replay of captured traffic, see ``core.capture``.
+
+Requests are sent again at the pace they were captured at, ``speed`` times
+faster, whether or not the earlier ones were answered. Each is sent as its
+user, with an access token minted for them, so the replayed database must
+have the users and rows of the captured one: a snapshot of it, or a seed
+with the same ids. The token endpoints are skipped, their bodies were
+redacted.
+"""
+
+import asyncio
+import time
+from urllib.parse import urlencode
+
+import httpx
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.benchmarks import percentile
+from core.capture import REDACTED
+from core.loadtest import classify, http_client
+from users.models import User
+
+SKIPPED_ROUTES = {'users:token', 'users:token_refresh', 'users:create'}
+
+
+class Replay:
+    def __init__(self, base_url, records, speed=1.0, connections=50, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.records = [record for record in records if record['route'] not in SKIPPED_ROUTES]
+        self.speed = speed
+        self.connections = connections
+        self.timeout = timeout
+        self.tokens = {}
+
+    def get_token(self, user_id):
+        if user_id not in self.tokens:
+            # Only the id goes in the token, no need to load the user.
+            self.tokens[user_id] = str(AccessToken.for_user(User(pk=user_id)))
+
+        return self.tokens[user_id]
+
+    def url(self, record):
+        params = {key: value for key, value in record['params'].items() if value != REDACTED}
+        query = urlencode(params, doseq=True)
+        return self.base_url + record['path'] + (f'?{query}' if query else '')
+
+    async def send(self, client, record):
+        headers = {}
+
+        if record['user'] is not None:
+            headers['Authorization'] = f'Bearer {self.get_token(record["user"])}'
+
+        started = time.perf_counter()
+
+        try:
+            response = await client.request(
+                record['method'], self.url(record), headers=headers, json=record['body'])
+        except httpx.HTTPError as error:
+            return None, (time.perf_counter() - started) * 1000, classify(error=error)
+
+        return (response.status_code, (time.perf_counter() - started) * 1000,
+                classify(response))
+
+    async def run(self):
+        """
+        Replay the records. Returns ``(record, status, ms, error_class)``
+        for each of them, status None when no response came.
+        """
+        if not self.records:
+            return []
+
+        for record in self.records:
+            if record['user'] is not None:
+                self.get_token(record['user'])
+
+        first = self.records[0]['ts']
+        results = []
+
+        async with http_client(self.connections, self.timeout) as client:
+            started = time.perf_counter()
+            pending = []
+
+            for record in self.records:
+                if self.speed:
+                    delay = (record['ts'] - first) / self.speed
+                    await asyncio.sleep(max(started + delay - time.perf_counter(), 0))
+
+                pending.append(asyncio.create_task(self.send(client, record)))
+
+            for record, (status, ms, error_class) in zip(
+                    self.records, await asyncio.gather(*pending)):
+                results.append((record, status, ms, error_class))
+
+        return results
+
+
+def summarize(results):
+    """
+    Captured and replayed latencies by route.
+    """
+    routes = {}
+
+    for record, status, ms, error_class in results:
+        route = routes.setdefault(f'{record["method"]} {record["route"]}', {
+            'captured': [], 'replayed': [], 'errors': 0, 'status_changed': 0,
+        })
+        route['captured'].append(record['ms'])
+        route['replayed'].append(ms)
+        route['errors'] += error_class is not None
+        route['status_changed'] += status != record['status']
+
+    summary = {}
+
+    for name, route in sorted(routes.items()):
+        captured = sorted(route['captured'])
+        replayed = sorted(route['replayed'])
+        summary[name] = {
+            'count': len(replayed),
+            'errors': route['errors'],
+            'status_changed': route['status_changed'],
+            'captured_p50_ms': round(percentile(captured, 50), 2),
+            'captured_p95_ms': round(percentile(captured, 95), 2),
+            'p50_ms': round(percentile(replayed, 50), 2),
+            'p95_ms': round(percentile(replayed, 95), 2),
+        }
+
+    return summary
+
+
+def regressions(summary, baseline=None, threshold=0.2):
+    """
+    ``(route, before, after)`` of the routes whose p95 grew by more than
+    ``threshold``, compared to the ``baseline`` summary of an earlier
+    replay, or to the captured latencies.
+    """
+    found = []
+
+    for name, route in summary.items():
+        if baseline is not None:
+            if name not in baseline:
+                continue
+
+            before = baseline[name]['p95_ms']
+        else:
+            before = route['captured_p95_ms']
+
+        if route['p95_ms'] > before * (1 + threshold):
+            found.append((name, before, route['p95_ms']))
+
+    return found
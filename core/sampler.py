@@ -0,0 +1,205 @@
+"""
+Statistical CPU profiler of a running process.
+
+``sample()`` takes a snapshot of the stacks of the threads handling a
+request (see ``core.context.active_requests``) every ``interval`` seconds,
+with ``sys._current_frames()``, and counts the identical stacks. Nothing
+is installed in the profiled threads: no tracing or profiling hook, no
+signal handler, so the requests run at full speed and any server can be
+profiled while it serves traffic. The sampling itself runs in the thread
+calling ``sample()``, holds the GIL for the time of a snapshot, and stops
+after ``MAX_SECONDS`` at most. One profile runs at a time per process.
+
+Only the threads of the process serving the profile request are seen: the
+server must run threaded workers (``gunicorn --threads N``, ``runserver``)
+for the process to handle other requests meanwhile. Profiles of request
+threads are refused when no other request is running in the process.
+
+Stacks are rooted at the URL name of the view of their request, and
+rendered as collapsed stacks, for ``flamegraph.pl`` and most flame graph
+tools, or in the speedscope format (https://www.speedscope.app).
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+from core.context import active_requests
+
+MAX_SECONDS = 60
+MIN_INTERVAL = 0.001
+
+FORMATS = ('collapsed', 'speedscope')
+
+_running = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+class NoRequestThreads(Exception):
+    pass
+
+
+class Profile:
+    def __init__(self, interval):
+        self.interval = interval
+        # Occurrences of ``(root, code objects from the outermost)``.
+        self.stacks = Counter()
+        self.snapshots = 0
+        self.elapsed = 0
+
+
+def thread_root(thread_id, context, names):
+    if context is None:
+        return f'thread {names.get(thread_id, thread_id)}'
+
+    match = context.request.resolver_match
+    return f'{context.request.method} {match.view_name if match is not None else "unresolved"}'
+
+
+def sample(seconds, interval=0.01, all_threads=False):
+    """
+    Profile the request threads of the process, or every thread with
+    ``all_threads``, for ``seconds``. Raises ``ProfilerBusy`` when a
+    profile is already running, and ``NoRequestThreads`` when no other
+    thread is handling a request, as with single-threaded workers.
+    """
+    own_id = threading.get_ident()
+
+    if not all_threads and not any(thread_id != own_id for thread_id in list(active_requests)):
+        raise NoRequestThreads(
+            'No other request is running in this process. Profiles need threaded '
+            'workers, e.g. gunicorn --threads, and traffic while they run.')
+
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusy('A profile is already running in this process.')
+
+    try:
+        return _sample(min(seconds, MAX_SECONDS), max(interval, MIN_INTERVAL), all_threads)
+    finally:
+        _running.release()
+
+
+def _sample(seconds, interval, all_threads):
+    profile = Profile(interval)
+    own_id = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    started = next_snapshot = time.perf_counter()
+    deadline = started + seconds
+
+    while time.perf_counter() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            context = active_requests.get(thread_id)
+
+            if thread_id == own_id or (context is None and not all_threads):
+                continue
+
+            # Code objects only: keeping the frames would keep their locals.
+            stack = []
+
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+
+            stack.reverse()
+            profile.stacks[thread_root(thread_id, context, names), tuple(stack)] += 1
+
+        profile.snapshots += 1
+        next_snapshot += interval
+        time.sleep(max(next_snapshot - time.perf_counter(), 0))
+
+    profile.elapsed = time.perf_counter() - started
+    return profile
+
+
+def source_location(filename):
+    """
+    ``filename`` relative to the project or to site-packages.
+    """
+    base_dir = str(settings.BASE_DIR)
+
+    if 'site-packages' in filename:
+        return filename.rsplit('site-packages', 1)[1].lstrip('/\\')
+
+    if filename.startswith(base_dir):
+        return filename[len(base_dir):].lstrip('/\\')
+
+    return filename
+
+
+def code_name(code):
+    return f'{code.co_qualname} ({source_location(code.co_filename)}:{code.co_firstlineno})'
+
+
+def collapsed(profile):
+    """
+    One ``root;outer frame;...;inner frame count`` line per stack.
+    """
+    names = {}
+    lines = []
+
+    for (root, stack), count in profile.stacks.most_common():
+        frames = [root]
+
+        for code in stack:
+            if code not in names:
+                names[code] = code_name(code).replace(';', ',')
+
+            frames.append(names[code])
+
+        lines.append(f'{";".join(frames)} {count}')
+
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def speedscope(profile, name='orchestrate'):
+    """
+    The profile in the speedscope file format, with a sampled profile per
+    root.
+    """
+    frames = []
+    indexes = {}
+    profiles = {}
+
+    def index(key, frame):
+        if key not in indexes:
+            indexes[key] = len(frames)
+            frames.append(frame)
+
+        return indexes[key]
+
+    for (root, stack), count in profile.stacks.most_common():
+        samples = [index(root, {'name': root})]
+
+        for code in stack:
+            samples.append(index(code, {
+                'name': code.co_qualname,
+                'file': source_location(code.co_filename),
+                'line': code.co_firstlineno,
+            }))
+
+        root_profile = profiles.setdefault(root, {
+            'type': 'sampled',
+            'name': root,
+            'unit': 'seconds',
+            'startValue': 0,
+            'endValue': round(profile.elapsed, 6),
+            'samples': [],
+            'weights': [],
+        })
+        root_profile['samples'].append(samples)
+        root_profile['weights'].append(round(count * profile.interval, 6))
+
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'orchestrate',
+        'activeProfileIndex': 0,
+        'shared': {'frames': frames},
+        'profiles': list(profiles.values()),
+    }
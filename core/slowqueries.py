@@ -0,0 +1,316 @@
+"""
+Slow query log.
+
+``log_slow_queries`` is added to every database connection. It times each
+query, and those over ``settings.SLOW_QUERY_THRESHOLD_MS`` are logged to
+the ``core.slowqueries`` logger as a JSON line::
+
+    {"view": "tasks:tasks_list_create", "ms": 412.3, "fingerprint": "3f0c...",
+     "params": "9a41...", "call_site": "tasks/views.py:88 in get_queryset",
+     "sql": "SELECT ... WHERE project_id = %s AND id IN (...)",
+     "plan": "SCAN tasks_tasks"}
+
+The SQL is normalized, its literals and lists of placeholders collapsed, so
+that every run of a statement has the same fingerprint. Parameters are
+only logged as a hash, which tells apart runs of a statement without
+logging their values. On SQLite, the ``EXPLAIN QUERY PLAN`` of a statement
+is taken the first time the process sees it slow.
+
+Slow queries are also counted by fingerprint and view in a buffer of the
+process, added to the ``SlowQuery`` table once the oldest count waited
+``settings.SLOW_QUERY_FLUSH_INTERVAL`` seconds (checked at the end of every
+request), and when the process exits. Rows are inserted if missing and
+then incremented, so processes writing the same statement don't lose
+counts. ``manage.py slow_queries`` shows the slowest.
+
+With ``settings.SQL_COMMENT_VIEW_TAGS``, the queries of a view end with a
+``/* view=<url name> */`` comment, so that the statements seen by the
+database, like those in its own logs, can be traced back to the view.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from core.context import get_request_context
+
+logger = logging.getLogger(__name__)
+
+TAG_PATTERN = re.compile(r' /\* view=[^*]* \*/$')
+STRING_PATTERN = re.compile(r"'(?:[^']|'')*'")
+NUMBER_PATTERN = re.compile(r'\b\d+(\.\d+)?\b')
+PLACEHOLDERS_PATTERN = re.compile(r'\((\s*%s\s*,)*\s*%s\s*\)')
+VALUES_PATTERN = re.compile(r'(\(\.\.\.\))(\s*,\s*\(\.\.\.\))+')
+SPACE_PATTERN = re.compile(r'\s+')
+
+# Files whose frames are never the call site of a query.
+INFRASTRUCTURE_FILES = ('core/slowqueries.py', 'core/querycache.py', 'core/db/',
+                        'core/budgets.py', 'core/profiling.py')
+
+# Statements whose plan was taken, bounded as new statements keep coming.
+MAX_EXPLAINED = 1000
+
+_explained = {}
+_local = threading.local()
+
+
+def normalize(sql):
+    """
+    ``sql`` with its literals and lists of placeholders collapsed.
+    """
+    sql = TAG_PATTERN.sub('', sql)
+    sql = STRING_PATTERN.sub('?', sql)
+    sql = NUMBER_PATTERN.sub('?', sql)
+    sql = PLACEHOLDERS_PATTERN.sub('(...)', sql)
+    sql = VALUES_PATTERN.sub(r'\1', sql)
+    return SPACE_PATTERN.sub(' ', sql).strip()
+
+
+def fingerprint(value):
+    return hashlib.sha1(value.encode()).hexdigest()[:16]
+
+
+def current_view():
+    """
+    URL name of the view handling the current request, or ''.
+    """
+    context = get_request_context()
+    match = context.request.resolver_match if context is not None else None
+
+    return match.view_name if match is not None else ''
+
+
+def call_site():
+    """
+    Innermost frame of the project that ran the query.
+    """
+    base_dir = str(settings.BASE_DIR) + os.sep
+
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        filename = frame.filename
+
+        if not filename.startswith(base_dir) or 'site-packages' in filename:
+            continue
+
+        path = filename[len(base_dir):]
+
+        if not path.startswith(INFRASTRUCTURE_FILES):
+            return f'{path}:{frame.lineno} in {frame.name}'
+
+    return ''
+
+
+def explain(connection, sql, params, many):
+    """
+    Query plan of ``sql`` on SQLite, one line per step, or ''.
+    """
+    if connection.vendor != 'sqlite':
+        return ''
+
+    if many:
+        params = next(iter(params), None)
+
+    # A cursor of the backend skips the execute wrappers, this one included.
+    cursor = connection.create_cursor()
+
+    try:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        rows = cursor.fetchall()
+    except Exception as error:
+        return f'(no plan: {error})'
+    finally:
+        cursor.close()
+
+    depths = {0: -1}
+    lines = []
+
+    for step, parent, _, detail in rows:
+        depths[step] = depths.get(parent, -1) + 1
+        lines.append('  ' * depths[step] + detail)
+
+    return '\n'.join(lines)
+
+
+class SlowQueryBuffer:
+    """
+    Slow queries of the process, counted by ``(fingerprint, view)`` until
+    they are written.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.database = None
+        self.oldest = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, key, sql, plan, site, milliseconds):
+        with self.lock:
+            self.database = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+
+            if not self.entries:
+                self.oldest = time.monotonic()
+
+            entry = self.entries.get(key)
+
+            if entry is None:
+                entry = self.entries[key] = {
+                    'sql': sql, 'plan': plan, 'call_site': site,
+                    'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                }
+
+            entry['count'] += 1
+            entry['total_ms'] += milliseconds
+            entry['max_ms'] = max(entry['max_ms'], milliseconds)
+            entry['plan'] = entry['plan'] or plan
+
+    def is_due(self):
+        return (
+            self.oldest is not None
+            and time.monotonic() - self.oldest >= settings.SLOW_QUERY_FLUSH_INTERVAL
+        )
+
+    def take(self):
+        with self.lock:
+            entries, self.entries = self.entries, {}
+            self.oldest = None
+
+        return entries
+
+    def flush(self):
+        """
+        Add the buffered counts to the ``SlowQuery`` table.
+        """
+        from core.models import SlowQuery
+
+        database = self.database
+        entries = self.take()
+
+        # Counted against a database that was since swapped out, like the
+        # test database by the time the process exits.
+        if not entries or connections[DEFAULT_DB_ALIAS].settings_dict['NAME'] != database:
+            return 0
+
+        # The queries writing the log aren't logged themselves.
+        _local.flushing = True
+
+        try:
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                # Rows missing so far, created empty whichever process gets
+                # there first, then incremented like the others.
+                SlowQuery.objects.using(DEFAULT_DB_ALIAS).bulk_create([
+                    SlowQuery(fingerprint=key, view=view, sql=entry['sql'],
+                              plan=entry['plan'], call_site=entry['call_site'])
+                    for (key, view), entry in entries.items()
+                ], ignore_conflicts=True)
+
+                for (key, view), entry in entries.items():
+                    updates = {
+                        'count': F('count') + entry['count'],
+                        'total_ms': F('total_ms') + entry['total_ms'],
+                        'max_ms': Greatest(F('max_ms'), entry['max_ms']),
+                        'call_site': entry['call_site'],
+                    }
+
+                    if entry['plan']:
+                        updates['plan'] = entry['plan']
+
+                    SlowQuery.objects.using(DEFAULT_DB_ALIAS).filter(
+                        fingerprint=key, view=view).update(**updates)
+        except Exception:
+            logger.exception('Could not write %d slow queries.', len(entries))
+        finally:
+            _local.flushing = False
+
+        return len(entries)
+
+    def clear(self):
+        self.take()
+
+
+slow_query_buffer = SlowQueryBuffer()
+
+
+def record(connection, sql, params, many, milliseconds, view):
+    normalized = normalize(sql)
+    key = fingerprint(normalized)
+    plan = ''
+
+    if key not in _explained:
+        if len(_explained) >= MAX_EXPLAINED:
+            _explained.clear()
+
+        plan = _explained[key] = explain(connection, TAG_PATTERN.sub('', sql), params, many)
+
+    site = call_site()
+    logger.warning(json.dumps({
+        'view': view,
+        'ms': round(milliseconds, 2),
+        'fingerprint': key,
+        'params': fingerprint(repr(params)),
+        'call_site': site,
+        'sql': normalized,
+        'plan': plan,
+    }))
+    slow_query_buffer.add((key, view), normalized, plan, site, milliseconds)
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+
+    if threshold is None or getattr(_local, 'flushing', False):
+        return execute(sql, params, many, context)
+
+    view = current_view()
+
+    if view and settings.SQL_COMMENT_VIEW_TAGS:
+        # URL names never hold '*/', which would end the comment.
+        sql = f'{sql} /* view={view} */'
+
+    started = time.perf_counter()
+
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        milliseconds = (time.perf_counter() - started) * 1000
+
+        if milliseconds >= threshold:
+            record(context['connection'], sql, params, many, milliseconds, view)
+
+
+def install_slow_query_log(sender, connection, **kwargs):
+    """
+    ``connection_created`` receiver adding ``log_slow_queries`` to a
+    connection.
+    """
+    if log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_queries)
+
+
+class SlowQueryFlushMiddleware:
+    """
+    Writes the slow queries of the process at the end of a request, once
+    the buffer is due.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            if slow_query_buffer.is_due():
+                slow_query_buffer.flush()
@@ -0,0 +1,27 @@
+"""
+Test runner of the project.
+"""
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """
+    Runs the tests with the query budgets of the views enforced: a request
+    over budget raises ``QueryBudgetExceeded`` instead of being logged. The
+    profiling is off, unless a test turns it on, to keep its log lines out
+    of the output.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._query_budget_raise = settings.QUERY_BUDGET_RAISE
+        self._profiling_sample_rate = settings.PROFILING_SAMPLE_RATE
+        settings.QUERY_BUDGET_RAISE = True
+        settings.PROFILING_SAMPLE_RATE = 0
+
+    def teardown_test_environment(self, **kwargs):
+        settings.QUERY_BUDGET_RAISE = self._query_budget_raise
+        settings.PROFILING_SAMPLE_RATE = self._profiling_sample_rate
+        super().teardown_test_environment(**kwargs)
@@ -1,3 +1,1269 @@
-from django.test import TestCase
+"""
+Tests for the core app.
+"""
 
-# Create your tests here.
+import json
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.http import QueryDict
+from django.urls import resolve, reverse
+from django.test import (
+    LiveServerTestCase,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+
+from core import metrics, sampler, slowqueries, tracing
+from core.budgets import QueryBudgetExceeded
+from core.cache import (
+    coalesced_waiters,
+    get_cache,
+    get_project_version,
+    invalidate_project,
+    normalize_query_params,
+    project_version_key,
+    response_cache_key,
+    single_flight,
+)
+from core.capture import read_capture
+from core.checks import check_shared_caches
+from core.context import RequestContext, RequestContextMiddleware, active_requests
+from core.db.backends.sqlite3.base import BusyRetryCursorWrapper
+from core.db.replication import backup
+from core.db.routers import PrimaryReplicaRouter, primary_reads, reads_use_primary
+from core.memory import memory_report
+from core.models import SlowQuery
+from core.profiling import get_current_profile
+from core.purge import purge
+from organizations.models import Membership, Organization
+from organizations.tests import create_membership, create_organization
+from projects.models import ProjectMembership, Projects
+from projects.tests import create_project_membership, create_projects
+from tasks.models import ColumnTaskCount, Columns, Tasks
+from tasks.tests.test_columns import create_column
+from tasks.views import TaskListCreateView
+from users.models import User
+from users.tests import create_user
+
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+class ResponseCacheKeyTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+
+    def test_query_params_are_normalized(self):
+        self.assertEqual(
+            normalize_query_params(QueryDict('b=2&a=1&a=0')),
+            normalize_query_params(QueryDict('a=0&b=2&a=1')),
+        )
+
+    def test_invalidate_project_changes_keys(self):
+        params = QueryDict('project_id=1')
+        key = response_cache_key('tasks:tasks_list_create', 1, params)
+
+        self.assertEqual(
+            key, response_cache_key('tasks:tasks_list_create', 1, params))
+
+        invalidate_project(1)
+
+        self.assertNotEqual(
+            key, response_cache_key('tasks:tasks_list_create', 1, params))
+
+    def test_evicted_version_restarts_from_a_new_value(self):
+        version = get_project_version(1)
+        get_cache().delete(project_version_key(1))
+
+        self.assertNotEqual(version, get_project_version(1))
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        get_cache().clear()
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+        results = []
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return 'value'
+
+        def request():
+            results.append(single_flight('key', compute, 60, name='test'))
+
+        waiters = coalesced_waiters.value(cache='test')
+        leader = threading.Thread(target=request)
+        leader.start()
+        time.sleep(0.05)
+
+        followers = [threading.Thread(target=request) for _ in range(4)]
+
+        for thread in followers:
+            thread.start()
+
+        time.sleep(0.05)
+        release.set()
+
+        for thread in [leader] + followers:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 5)
+        self.assertEqual(coalesced_waiters.value(cache='test'), waiters + 4)
+
+    def test_stale_value_served_while_revalidating(self):
+        get_cache().set('key', (time.time() - 1, 'stale'), 60)
+        release = threading.Event()
+        results = []
+
+        def compute():
+            release.wait(5)
+            return 'fresh'
+
+        def request():
+            results.append(single_flight(
+                'key', compute, 60, name='test', stale_timeout=30))
+
+        leader = threading.Thread(target=request)
+        leader.start()
+        time.sleep(0.05)
+
+        self.assertEqual(single_flight(
+            'key', compute, 60, name='test', stale_timeout=30), 'stale')
+
+        release.set()
+        leader.join()
+
+        self.assertEqual(results, ['fresh'])
+        self.assertEqual(single_flight('key', compute, 60), 'fresh')
+
+    def test_lock_held_elsewhere_times_out(self):
+        get_cache().add('key:lock', 'other-process', 60)
+
+        value = single_flight('key', lambda: 'value', 60, lock_timeout=0.1)
+
+        self.assertEqual(value, 'value')
+
+    def test_uncacheable_values_are_not_stored(self):
+        single_flight('key', lambda: 'error', 60,
+                      cacheable=lambda value: value != 'error')
+
+        self.assertIsNone(get_cache().get('key'))
+
+
+class QueryCacheTests(TransactionTestCase):
+    def setUp(self):
+        organization = Organization.objects.create(
+            name='Test Organization', domain='test.com')
+        self.project = Projects.objects.create(
+            name='Test Project', description='Test Description',
+            organization=organization)
+        Columns.objects.create(project=self.project, name='To Do', position=1)
+
+    def column_names(self):
+        return [column.name for column in Columns.objects.filter(
+            project=self.project).cached()]
+
+    def test_repeated_query_is_served_from_cache(self):
+        self.assertEqual(self.column_names(), ['To Do'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.column_names(), ['To Do'])
+
+    def test_repeated_exists_is_served_from_cache(self):
+        columns = Columns.objects.filter(project=self.project)
+
+        self.assertTrue(columns.cached().exists())
+
+        with self.assertNumQueries(0):
+            self.assertTrue(columns.cached().exists())
+
+    def test_queryset_update_invalidates(self):
+        self.column_names()
+        Columns.objects.filter(project=self.project).update(name='Backlog')
+
+        self.assertEqual(self.column_names(), ['Backlog'])
+
+    def test_raw_write_invalidates(self):
+        self.column_names()
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE tasks_columns SET name = %s', ['Backlog'])
+
+        self.assertEqual(self.column_names(), ['Backlog'])
+
+    def test_uncommitted_writes_are_not_cached(self):
+        self.column_names()
+
+        with transaction.atomic():
+            Columns.objects.create(
+                project=self.project, name='Done', position=2)
+
+            self.assertEqual(self.column_names(), ['To Do', 'Done'])
+
+            transaction.set_rollback(True)
+
+        self.assertEqual(self.column_names(), ['To Do'])
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_single_process(self):
+        self.assertEqual(check_shared_caches(None), [])
+
+    @override_settings(SERVER_PROCESSES=4, DATABASE_REPLICAS=['replica'])
+    def test_process_local_cache(self):
+        errors = check_shared_caches(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E001'] * 3)
+        self.assertIn('RESPONSE_CACHE_ALIAS', errors[0].msg)
+        self.assertIn('QUERY_CACHE_ALIAS', errors[1].msg)
+        self.assertIn('READ_YOUR_WRITES_CACHE_ALIAS', errors[2].msg)
+
+    @override_settings(SERVER_PROCESSES=4, RESPONSE_CACHE_ALIAS='shared')
+    def test_shared_cache(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        shared = {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': directory.name,
+        }
+
+        with self.settings(CACHES={'default': settings.CACHES['default'], 'shared': shared}):
+            self.assertNotIn('RESPONSE_CACHE_ALIAS',
+                             ' '.join(error.msg for error in check_shared_caches(None)))
+
+
+class SQLiteBackendTests(TestCase):
+    def test_pragmas_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+    def test_busy_statement_is_retried_outside_transaction(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'busy.sqlite3')
+            holder = sqlite3.connect(
+                path, isolation_level=None, check_same_thread=False)
+            holder.execute('CREATE TABLE items (id INTEGER PRIMARY KEY)')
+            holder.execute('BEGIN IMMEDIATE')
+
+            waiter = sqlite3.connect(path, timeout=0, isolation_level=None)
+            cursor = waiter.cursor(factory=BusyRetryCursorWrapper)
+            cursor.busy_retries = 10
+            cursor.busy_backoff = 0.02
+
+            release = threading.Timer(0.1, holder.execute, ['COMMIT'])
+            release.start()
+
+            cursor.execute('INSERT INTO items (id) VALUES (%s)', [1])
+
+            release.join()
+            self.assertEqual(
+                waiter.execute('SELECT COUNT(*) FROM items').fetchone()[0], 1)
+
+            waiter.close()
+            holder.close()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], READ_YOUR_WRITES_WINDOW=5)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def handle(self, request, callback, user=None):
+        if user is not None:
+            request.user = user
+
+        return RequestContextMiddleware(callback)(request)
+
+    def read(self, request, model=Tasks, user=None):
+        return self.handle(
+            request, lambda request: self.router.db_for_read(model), user)
+
+    def test_reads_go_to_replicas(self):
+        self.assertEqual(self.read(self.factory.get('/')), 'replica')
+
+    def test_other_models_and_writes_stay_on_primary(self):
+        self.assertIsNone(self.read(self.factory.get('/'), model=Organization))
+        self.assertIsNone(self.read(self.factory.post('/')))
+        self.assertIsNone(self.router.db_for_read(Tasks))
+
+    def test_primary_reads_block(self):
+        def callback(request):
+            with primary_reads():
+                return self.router.db_for_read(Tasks)
+
+        self.assertIsNone(self.handle(self.factory.get('/'), callback))
+
+    def test_user_pinned_to_primary_after_write(self):
+        writer, other = User(pk=1), User(pk=2)
+
+        self.handle(
+            self.factory.patch('/'),
+            lambda request: self.router.db_for_write(Tasks),
+            writer,
+        )
+
+        self.assertIsNone(self.read(self.factory.get('/'), user=writer))
+        self.assertEqual(self.read(self.factory.get('/'), user=other), 'replica')
+
+        def pinned(user):
+            return self.handle(self.factory.get('/'), lambda request: reads_use_primary(), user)
+
+        self.assertTrue(pinned(writer))
+        self.assertFalse(pinned(other))
+
+        with self.settings(DATABASE_REPLICAS=[]):
+            self.assertFalse(pinned(writer))
+
+
+class ReplicaBackupTests(SimpleTestCase):
+    def test_backup_copies_primary_into_replica(self):
+        with tempfile.TemporaryDirectory() as directory:
+            replica_path = os.path.join(directory, 'replica.sqlite3')
+            primary = sqlite3.connect(os.path.join(directory, 'primary.sqlite3'))
+            primary.execute('CREATE TABLE items (id INTEGER PRIMARY KEY)')
+            primary.execute('INSERT INTO items (id) VALUES (1)')
+            primary.commit()
+
+            backup(primary, replica_path)
+
+            primary.execute('INSERT INTO items (id) VALUES (2)')
+            primary.commit()
+
+            backup(primary, replica_path)
+
+            replica = sqlite3.connect(replica_path)
+            self.assertEqual(
+                replica.execute('SELECT COUNT(*) FROM items').fetchone()[0], 2)
+
+            replica.close()
+            primary.close()
+
+
+class SoftDeleteTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com', password='testpass123',
+            first_name='John', last_name='Doe')
+        self.organization = Organization.objects.create(
+            name='Test Organization', domain='test.com')
+        self.project = Projects.objects.create(
+            name='Test Project', description='Test Description',
+            organization=self.organization)
+        self.column = Columns.objects.create(
+            project=self.project, name='To Do', position=1)
+        Tasks.objects.bulk_create([
+            Tasks(title=f'Task {number}', description='Test Description',
+                  due_date='2021-12-12T12:00:00Z', column=self.column,
+                  project=self.project, assignee=self.user)
+            for number in range(5)
+        ])
+
+    def test_delete_flags_rows_and_their_soft_deletable_children(self):
+        self.organization.delete()
+
+        self.assertFalse(Organization.objects.exists())
+        self.assertFalse(Projects.objects.exists())
+        self.assertFalse(Columns.objects.exists())
+        self.assertTrue(Columns.all_objects.get().deleted_at)
+        self.assertEqual(Tasks.objects.count(), 5)
+
+    def test_deleted_column_name_can_be_reused(self):
+        self.column.delete()
+
+        Columns.objects.create(project=self.project, name='To Do', position=1)
+
+        self.assertEqual(Columns.all_objects.filter(name='To Do').count(), 2)
+
+    def test_purge_deletes_children_in_batches(self):
+        self.column.delete()
+        batches = []
+
+        deleted = purge(
+            Columns.all_objects.filter(deleted_at__isnull=False),
+            batch_size=2,
+            progress=lambda model, count: batches.append((model, count)),
+        )
+
+        self.assertEqual(deleted, 7)
+        self.assertEqual(
+            batches,
+            [(Tasks, 2), (Tasks, 2), (Tasks, 1), (ColumnTaskCount, 1), (Columns, 1)])
+        self.assertFalse(Tasks.objects.exists())
+        self.assertFalse(Columns.all_objects.exists())
+
+    def test_interrupted_purge_resumes(self):
+        self.column.delete()
+
+        def crash(model, count):
+            raise RuntimeError('crashed')
+
+        with self.assertRaises(RuntimeError):
+            purge(Columns.all_objects.filter(deleted_at__isnull=False),
+                  batch_size=2, progress=crash)
+
+        self.assertEqual(Tasks.objects.count(), 3)
+        self.assertTrue(Columns.all_objects.exists())
+
+        out = StringIO()
+        call_command('purge_deleted', stdout=out)
+
+        self.assertIn('Purged 5 rows.', out.getvalue())
+        self.assertFalse(Tasks.objects.exists())
+        self.assertFalse(Columns.all_objects.exists())
+        self.assertTrue(Projects.objects.exists())
+
+
+class ProjectRequestTestCase(TestCase):
+    """
+    An organization owned by ``self.user``, who manages its project, with a
+    column, and a client authenticated as them.
+    """
+
+    # Extra fields of the user, e.g. is_staff.
+    user_fields = {}
+
+    def setUp(self):
+        self.user = create_user(
+            email='manager@example.com', password='password', **self.user_fields)
+        self.organization = create_organization(
+            name='Test Organization', domain='test.com')
+        create_membership(
+            organization=self.organization, user=self.user, role=Membership.ROLE_OWNER)
+        self.project = create_projects(
+            name='Test Project', description='Test Description',
+            organization=self.organization)
+        create_project_membership(
+            project=self.project, user=self.user,
+            role=ProjectMembership.PROJECT_MANAGER)
+        self.column = create_column(project=self.project, name='To Do', position=1)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def list_tasks(self, **params):
+        return self.client.get(
+            reverse('tasks:tasks_list_create'), {'project_id': self.project.id, **params})
+
+
+class ProfilingMiddlewareTests(ProjectRequestTestCase):
+    def list_tasks(self):
+        return super().list_tasks(column_id=self.column.id)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_requests_are_profiled(self):
+        with self.assertLogs('core.profiling') as logs:
+            with self.assertNumQueries(4) as queries:
+                res = self.list_tasks()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertRegex(
+            res['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="(\d+) queries", serializer;dur=[\d.]+, '
+            r'render;dur=[\d.]+, total;dur=[\d.]+$')
+
+        line = json.loads(logs.records[0].getMessage())
+
+        self.assertEqual(line['view'], 'tasks:tasks_list_create')
+        self.assertEqual(line['method'], 'GET')
+        self.assertEqual(line['status'], 200)
+        self.assertEqual(line['queries'], len(queries))
+        self.assertIn(f'desc="{len(queries)} queries"', res['Server-Timing'])
+        self.assertGreater(line['render_ms'], 0)
+        self.assertIsNone(get_current_profile())
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_profiled(self):
+        with self.assertNoLogs('core.profiling'):
+            res = self.list_tasks()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn('Server-Timing', res)
+
+
+class QueryBudgetTests(ProjectRequestTestCase):
+    def list_tasks(self):
+        return super().list_tasks(column_id=self.column.id)
+
+    @mock.patch.object(TaskListCreateView, 'query_budget', {'GET': 1})
+    def test_requests_over_budget_raise_in_tests(self):
+        with self.assertRaisesMessage(
+                QueryBudgetExceeded,
+                'GET tasks:tasks_list_create ran 3 queries, over its budget of 1.'):
+            self.list_tasks()
+
+    @override_settings(QUERY_BUDGET_RAISE=False)
+    @mock.patch.object(TaskListCreateView, 'query_budget', {'GET': 2})
+    def test_requests_over_budget_are_logged_with_stacks(self):
+        with self.assertLogs('core.budgets', 'WARNING') as logs:
+            res = self.list_tasks()
+
+        self.assertEqual(res.status_code, 200)
+
+        message = logs.records[0].getMessage()
+
+        self.assertIn('Query 3: SELECT', message)
+        self.assertIn('in list_tasks', message)
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        users = User.objects.bulk_create([
+            User(email=f'user{number}@example.com', first_name='User', last_name=str(number))
+            for number in range(20)
+        ])
+        Membership.objects.bulk_create([
+            Membership(organization=self.organization, user=user, role=Membership.ROLE_MEMBER)
+            for user in users
+        ])
+        ProjectMembership.objects.bulk_create([
+            ProjectMembership(project=self.project, user=user,
+                              role=ProjectMembership.PROJECT_MEMBER)
+            for user in users
+        ])
+        Tasks.objects.bulk_create([
+            Tasks(title=f'Task {number}', description='Test Description',
+                  due_date='2021-12-12T12:00:00Z', column=self.column,
+                  project=self.project, assignee=user)
+            for number, user in enumerate(users)
+        ])
+
+        responses = [
+            self.list_tasks(),
+            self.client.get(reverse('tasks:columns_list_create'), {'project_id': self.project.id}),
+            self.client.get(reverse('tasks:task_counts'), {'project_id': self.project.id}),
+            self.client.get(reverse('projects:members', kwargs={'pk': self.project.id})),
+            self.client.get(reverse('organizations:members', kwargs={'pk': self.organization.id})),
+        ]
+
+        self.assertEqual([res.status_code for res in responses], [200] * 5)
+        self.assertEqual(len(responses[0].data), 20)
+        self.assertEqual(len(responses[4].data), 21)
+
+
+class SeedScaleTests(TestCase):
+    options = {
+        'orgs': 2, 'users_per_org': 6, 'projects_per_org': 4,
+        'members_per_project': 4, 'tasks_per_project': 25, 'batch_size': 40,
+        'stdout': StringIO(),
+    }
+
+    def test_seed_scale(self):
+        call_command('seed_scale', **self.options)
+
+        self.assertEqual(User.objects.count(), 12)
+        self.assertEqual(Organization.objects.count(), 2)
+        self.assertEqual(Membership.objects.count(), 12)
+        self.assertEqual(ProjectMembership.objects.count(), 32)
+        self.assertEqual(Columns.objects.count(), 32)
+        self.assertEqual(Tasks.objects.count(), 200)
+        self.assertEqual(
+            sum(ColumnTaskCount.objects.values_list('count', flat=True)), 200)
+        self.assertTrue(User.objects.get(email='seed.0.0@example.com').check_password('password'))
+
+        # Every assignee is a member of the project of the task.
+        self.assertFalse(Tasks.objects.exclude(
+            assignee__projects__project=F('project')).exists())
+
+        sizes = Tasks.objects.values('project').annotate(size=Count('id')).order_by('-size')
+
+        self.assertGreater(sizes[0]['size'], 2 * sizes.last()['size'])
+
+    def test_seed_is_deterministic(self):
+        def seed(prefix):
+            call_command('seed_scale', prefix=prefix, seed=7, **self.options)
+
+            return list(Tasks.objects.filter(project__organization__domain__startswith=prefix)
+                        .order_by('id').values_list('title', 'due_date', 'column__name'))
+
+        self.assertEqual(seed('first'), seed('second'))
+
+        with self.assertRaisesMessage(CommandError, "The 'first' data set exists"):
+            seed('first')
+
+
+class SeededTestMixin:
+    """
+    Data generated by ``seed_scale``, and a temporary directory for the
+    files written by the commands under test.
+    """
+
+    seed_options = {
+        'orgs': 1, 'users_per_org': 4, 'projects_per_org': 2,
+        'members_per_project': 3, 'tasks_per_project': 10,
+    }
+
+    def setUp(self):
+        super().setUp()
+        call_command('seed_scale', stdout=StringIO(), **self.seed_options)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+
+class BenchTests(SeededTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.directory, 'bench.json')
+
+    def bench(self, **options):
+        out = StringIO()
+        call_command('bench', iterations=3, warmup=1, rows=10, stdout=out, **options)
+        return out.getvalue()
+
+    def test_bench_writes_results(self):
+        out = self.bench(output=self.path)
+
+        with open(self.path) as file:
+            results = json.load(file)['results']
+
+        self.assertIn('serializer.task_list', out)
+        self.assertEqual(results['auth.jwt']['iterations'], 3)
+        self.assertEqual(results['query.task_list']['queries_per_op'], 1)
+        self.assertEqual(
+            set(results['render.task_list']),
+            {'iterations', 'p50_ms', 'p95_ms', 'mean_ms', 'ops_per_sec',
+             'queries_per_op', 'alloc_peak_kb'})
+
+    def test_bench_compares_runs(self):
+        self.bench(output=self.path, benchmark=['query.'])
+
+        with open(self.path) as file:
+            baseline = json.load(file)
+
+        baseline['results']['query.task_list']['queries_per_op'] = 0
+
+        with open(self.path, 'w') as file:
+            json.dump(baseline, file)
+
+        with self.assertRaisesMessage(CommandError, '1 regressions'):
+            self.bench(compare=self.path, benchmark=['query.task_list'], threshold=100)
+
+
+class LoadTestTests(SeededTestMixin, LiveServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.directory, 'loadtest.json')
+
+    def test_load_test(self):
+        out = StringIO()
+        call_command(
+            # The live server threads share one connection to the test
+            # database, requests mustn't overlap.
+            'loadtest', url=self.live_server_url, rate=40, duration=1, users=3,
+            connections=1, output=self.path, stdout=out)
+
+        with open(self.path) as file:
+            summary = json.load(file)
+
+        self.assertEqual(summary['errors'], {})
+        self.assertEqual(summary['dropped'], 0)
+        self.assertIn('GET tasks:tasks_list_create', summary['routes'])
+        self.assertEqual(
+            sum(summary['routes']['GET tasks:columns_list_create']['histogram'].values()),
+            summary['scenarios']['board_load'])
+        self.assertIn('GET tasks:tasks_list_create', out.getvalue())
+
+    def test_scenario_weights(self):
+        with self.assertRaisesMessage(CommandError, "Unknown scenario 'nope'"):
+            call_command('loadtest', url=self.live_server_url, scenario=['nope=1'])
+
+        call_command(
+            'loadtest', url=self.live_server_url, rate=20, duration=0.5, users=2,
+            connections=1,
+            scenario=['board_load=0', 'task_drag=0', 'task_create=0', 'token_refresh=0'],
+            output=self.path, stdout=StringIO())
+
+        with open(self.path) as file:
+            summary = json.load(file)
+
+        self.assertEqual(list(summary['routes']), ['GET projects:members'])
+
+
+class TrafficReplayTests(SeededTestMixin, LiveServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.capture_path = os.path.join(self.directory, 'capture.jsonl')
+        self.output_path = os.path.join(self.directory, 'replay.json')
+
+        membership = ProjectMembership.objects.select_related('user').first()
+        self.user = membership.user
+        self.project_id = membership.project_id
+        self.task = Tasks.objects.filter(project_id=self.project_id).first()
+
+    def capture(self):
+        client = APIClient()
+
+        with override_settings(TRAFFIC_CAPTURE_PATH=self.capture_path):
+            response = client.post(reverse('users:token'), {
+                'email': self.user.email, 'password': 'password',
+            }, format='json')
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+
+            client.get(reverse('tasks:tasks_list_create'), {
+                'project_id': self.project_id, 'search': 'Quarterly report',
+            })
+            client.patch(reverse('tasks:task_detail', kwargs={'pk': self.task.pk}), {
+                'title': 'Renamed', 'due_date': '2025-06-01T12:00:00Z',
+            }, format='json')
+            client.get(reverse('tasks:task_detail', kwargs={'pk': 0}))
+
+        return read_capture(self.capture_path)
+
+    def test_capture(self):
+        login, task_list, task_update, missing = self.capture()
+
+        self.assertEqual(login['route'], 'users:token')
+        self.assertEqual(login['body'], {'email': 'x' * len(self.user.email),
+                                         'password': '[redacted]'})
+        self.assertIsNone(login['user'])
+
+        self.assertEqual(task_list['method'], 'GET')
+        self.assertEqual(task_list['route'], 'tasks:tasks_list_create')
+        self.assertEqual(task_list['params'], {
+            'project_id': [str(self.project_id)], 'search': ['x' * 16],
+        })
+        self.assertEqual(task_list['user'], self.user.pk)
+        self.assertEqual(task_list['status'], 200)
+        self.assertGreater(task_list['size'], 0)
+
+        self.assertEqual(task_update['path'], f'/api/tasks/{self.task.pk}/')
+        self.assertEqual(task_update['body'], {
+            'title': 'xxxxxxx', 'due_date': '2025-06-01T12:00:00Z',
+        })
+        self.assertGreaterEqual(missing['status'], 400)
+
+    def test_capture_disabled(self):
+        APIClient().get(reverse('tasks:task_detail', kwargs={'pk': 0}))
+
+        self.assertFalse(os.path.exists(self.capture_path))
+
+    def test_replay(self):
+        self.capture()
+        out = StringIO()
+        call_command(
+            # The live server threads share one connection to the test
+            # database, requests mustn't overlap.
+            'replay_traffic', self.capture_path, url=self.live_server_url, speed=0,
+            connections=1, output=self.output_path, stdout=out)
+
+        with open(self.output_path) as file:
+            summary = json.load(file)
+
+        self.assertEqual(list(summary), [
+            'GET tasks:task_detail', 'GET tasks:tasks_list_create', 'PATCH tasks:task_detail',
+        ])
+
+        for route in summary.values():
+            self.assertEqual(route['count'], 1)
+            self.assertEqual(route['status_changed'], 0)
+
+        self.assertEqual(summary['GET tasks:task_detail']['errors'], 1)
+        self.assertEqual(Tasks.objects.get(pk=self.task.pk).title, 'xxxxxxx')
+
+        with open(self.output_path, 'w') as file:
+            json.dump({route: dict(stats, p95_ms=0) for route, stats in summary.items()}, file)
+
+        with self.assertRaisesMessage(CommandError, '3 regressions'):
+            call_command(
+                'replay_traffic', self.capture_path, url=self.live_server_url, speed=0,
+                connections=1, compare=self.output_path, stdout=StringIO())
+
+
+def increment_in_child(name):
+    metrics.counter(name, 'Test counter.').inc(2)
+
+
+@override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+class MetricsTests(ProjectRequestTestCase):
+    def get_metrics(self):
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return response.content.decode()
+
+    def test_histogram_exposition(self):
+        histogram = metrics.Registry().get_or_create(
+            metrics.Histogram, 'test_seconds', 'Test histogram.', ['view'], buckets=(0.1, 1))
+        values = {}
+
+        for value in (0.05, 0.5, 0.5, 3):
+            label_values = histogram._labels({'view': 'a "b"'})
+            bound = '0.1' if value < 0.1 else '1.0' if value < 1 else '+Inf'
+            key = ('_bucket', label_values + (('le', bound),))
+            values[key] = values.get(key, 0) + 1
+
+        values['_sum', label_values] = 4.05
+        values['_count', label_values] = 4
+
+        self.assertEqual(histogram.render(values), [
+            'test_seconds_bucket{view="a \\"b\\"",le="0.1"} 1.0',
+            'test_seconds_bucket{view="a \\"b\\"",le="1.0"} 3.0',
+            'test_seconds_bucket{view="a \\"b\\"",le="+Inf"} 4.0',
+            'test_seconds_sum{view="a \\"b\\""} 4.05',
+            'test_seconds_count{view="a \\"b\\""} 4.0',
+        ])
+
+    def test_request_metrics(self):
+        self.client.get(reverse('tasks:tasks_list_create'), {'project_id': self.project.id})
+        APIClient().get(reverse('tasks:tasks_list_create'), {'project_id': self.project.id})
+        body = self.get_metrics()
+
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn(
+            'http_request_duration_seconds_count'
+            '{method="GET",route="tasks:tasks_list_create",status="200"}', body)
+        self.assertIn(
+            'http_request_queries_bucket{method="GET",route="tasks:tasks_list_create",le="+Inf"}',
+            body)
+        self.assertIn('http_auth_failures_total{route="tasks:tasks_list_create"}', body)
+        self.assertIn('permission_check_duration_seconds_count{check="project_member"}', body)
+        self.assertIn('cache_requests_total{cache=', body)
+
+    def test_unknown_methods_are_counted_together(self):
+        self.client.generic('PURGE', reverse('tasks:tasks_list_create'))
+        self.client.generic('BREW', reverse('tasks:tasks_list_create'))
+        body = self.get_metrics()
+
+        self.assertIn(
+            'http_request_duration_seconds_count'
+            '{method="other",route="tasks:tasks_list_create",status="405"} 2.0', body)
+        self.assertNotIn('PURGE', body)
+
+    def test_scrapers_are_restricted(self):
+        url = reverse('metrics')
+
+        with self.settings(METRICS_ALLOWED_IPS=['10.0.0.0/8'], METRICS_TOKEN='scrape'):
+            self.assertEqual(self.client.get(url).status_code, 403)
+            self.assertEqual(self.client.get(url, REMOTE_ADDR='10.1.2.3').status_code, 200)
+            self.assertEqual(self.client.get(
+                url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            self.assertEqual(self.client.get(
+                url, HTTP_AUTHORIZATION='Bearer scrape').status_code, 200)
+
+        with self.settings(METRICS_ALLOWED_IPS=[]):
+            self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_multiprocess(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        counter = metrics.counter('test_multiprocess_total', 'Test counter.')
+
+        with override_settings(METRICS_MULTIPROCESS_DIR=directory.name):
+            counter.inc()
+            child = multiprocessing.get_context('fork').Process(
+                target=increment_in_child, args=('test_multiprocess_total',))
+            child.start()
+            child.join()
+
+            # Enough keys to grow the file past its initial size.
+            histogram = metrics.histogram('test_multiprocess_seconds', 'Test.', ['n'])
+
+            for n in range(2000):
+                histogram.observe(0.2, n=n)
+
+            body = self.get_metrics()
+
+            self.assertEqual(len(os.listdir(directory.name)), 2)
+            self.assertIn('test_multiprocess_total 3.0', body)
+            self.assertIn('test_multiprocess_seconds_count{n="1999"} 1.0', body)
+            self.assertEqual(counter.value(), 1)
+
+
+@override_settings(SLOW_QUERY_FLUSH_INTERVAL=0)
+class SlowQueryLogTests(ProjectRequestTestCase):
+    def setUp(self):
+        super().setUp()
+        slowqueries._explained.clear()
+
+    def test_normalize(self):
+        self.assertEqual(
+            slowqueries.normalize(
+                "SELECT *  FROM t WHERE a = 'x' AND b IN (%s, %s, %s) AND c = 12 "
+                "/* view=tasks:task_detail */"),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) AND c = ?')
+        self.assertEqual(
+            slowqueries.normalize('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)'),
+            slowqueries.normalize('INSERT INTO t (a, b) VALUES (%s, %s)'))
+
+    def test_slow_queries(self):
+        executed = []
+
+        def capture(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        # Runs after the slow query log, which tags the queries.
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=0, SQL_COMMENT_VIEW_TAGS=True), \
+                connection.execute_wrapper(capture), \
+                self.assertLogs('core.slowqueries', 'WARNING') as logs:
+            response = self.client.get(
+                reverse('tasks:tasks_list_create'), {'project_id': self.project.id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            ' /* view=tasks:tasks_list_create */', [sql[-35:] for sql in executed])
+
+        record = json.loads(logs.output[-1].split(':', 2)[2])
+        self.assertEqual(record['view'], 'tasks:tasks_list_create')
+        self.assertNotIn('/*', record['sql'])
+        self.assertFalse(record['call_site'].startswith(slowqueries.INFRASTRUCTURE_FILES))
+        self.assertTrue(any('projects/mixins.py' in line for line in logs.output))
+
+        slow = SlowQuery.objects.filter(view='tasks:tasks_list_create')
+        self.assertTrue(slow.exists())
+        self.assertTrue(any('SEARCH' in query.plan or 'SCAN' in query.plan for query in slow))
+
+        # Statements run again are counted, and not explained again. Others
+        # are served from the caches the second time.
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=0), \
+                self.assertLogs('core.slowqueries', 'WARNING') as logs:
+            self.client.get(reverse('tasks:tasks_list_create'), {'project_id': self.project.id})
+
+        self.assertTrue(all(json.loads(line.split(':', 2)[2])['plan'] == ''
+                            for line in logs.output))
+        self.assertIn(2, slow.values_list('count', flat=True))
+
+        out = StringIO()
+        call_command('slow_queries', view='tasks_list', plan=True, stdout=out)
+
+        self.assertIn('tasks:tasks_list_create', out.getvalue())
+        self.assertIn(slow.first().fingerprint, out.getvalue())
+
+    def test_fast_queries(self):
+        self.client.get(reverse('tasks:tasks_list_create'), {'project_id': self.project.id})
+
+        self.assertFalse(SlowQuery.objects.exists())
+
+    def test_counts_are_written_once_due(self):
+        buffer = slowqueries.SlowQueryBuffer()
+        buffer.add(('f00d', 'tasks:task_detail'), 'SELECT ?', 'SCAN t', 'a.py:1', 150)
+
+        with self.settings(SLOW_QUERY_FLUSH_INTERVAL=60):
+            self.assertFalse(buffer.is_due())
+
+        self.assertTrue(buffer.is_due())
+
+        # Inserted meanwhile by another process.
+        SlowQuery.objects.create(
+            fingerprint='f00d', view='tasks:task_detail', sql='SELECT ?',
+            count=2, total_ms=300, max_ms=200)
+
+        self.assertEqual(buffer.flush(), 1)
+        self.assertFalse(buffer.is_due())
+
+        query = SlowQuery.objects.get(fingerprint='f00d')
+        self.assertEqual((query.count, query.total_ms, query.max_ms), (3, 450, 200))
+        self.assertEqual(query.plan, 'SCAN t')
+
+
+def spin(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class SamplingProfilerTests(LiveServerTestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            email='staff@example.com', password='password', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+        # A request spinning in spin() while it is profiled.
+        request = RequestFactory().get('/api/tasks/')
+        request.resolver_match = resolve('/api/tasks/')
+        stop = threading.Event()
+        thread = threading.Thread(target=spin, args=(stop,))
+        thread.start()
+        active_requests[thread.ident] = RequestContext(request)
+        self.thread = thread
+
+        def finish():
+            stop.set()
+            thread.join()
+            active_requests.pop(thread.ident, None)
+
+        self.addCleanup(finish)
+
+    def test_collapsed(self):
+        response = self.client.get(reverse('profiler'), {'seconds': 0.2, 'interval': 0.005})
+
+        self.assertEqual(response.status_code, 200)
+        lines = response.content.decode().splitlines()
+        self.assertTrue(lines)
+
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertTrue(stack.startswith('GET tasks:tasks_list_create;'))
+            self.assertGreater(int(count), 0)
+
+        self.assertTrue(any(';spin (core/tests.py:' in line for line in lines))
+        # Threads not handling a request, like the test runner, aren't sampled.
+        self.assertFalse(any(line.startswith('thread ') for line in lines))
+
+    def test_speedscope(self):
+        response = self.client.get(
+            reverse('profiler'),
+            {'seconds': 0.2, 'interval': 0.005, 'output': 'speedscope', 'all_threads': '1'})
+
+        self.assertEqual(response.status_code, 200)
+        profile = response.json()
+        names = [profile['name'] for profile in profile['profiles']]
+        self.assertIn('GET tasks:tasks_list_create', names)
+        # The live server thread, waiting for connections.
+        self.assertTrue(any(name.startswith('thread ') for name in names))
+
+        frames = profile['shared']['frames']
+        samples = profile['profiles'][names.index('GET tasks:tasks_list_create')]['samples']
+        self.assertIn('spin', [frames[index]['name'] for index in samples[0]])
+
+    def test_no_other_request(self):
+        active_requests.pop(self.thread.ident)
+        response = self.client.get(reverse('profiler'), {'seconds': 0.05})
+
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('threaded workers', response.json()['message'])
+
+        response = self.client.get(
+            reverse('profiler'), {'seconds': 0.05, 'all_threads': '1'})
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_permissions_and_errors(self):
+        user = User.objects.create_user(email='user@example.com', password='password')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        self.assertEqual(client.get(reverse('profiler')).status_code, 403)
+        self.assertEqual(
+            self.client.get(reverse('profiler'), {'output': 'svg'}).status_code, 400)
+
+        with sampler._running:
+            self.assertEqual(
+                self.client.get(reverse('profiler'), {'seconds': 0.1}).status_code, 409)
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            'profile_server', url=self.live_server_url, seconds=0.2, interval=0.005,
+            stdout=out)
+
+        self.assertIn(';spin (core/tests.py:', out.getvalue())
+
+
+@override_settings(MEMORY_PROFILING_SAMPLE_RATE=1, MEMORY_LEAK_WINDOW=3,
+                   MEMORY_LEAK_MIN_GROWTH=64 * 1024)
+class MemoryProfilingTests(ProjectRequestTestCase):
+    user_fields = {'is_staff': True}
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(memory_report.clear)
+        self.addCleanup(tracemalloc.stop)
+
+    def list_tasks(self):
+        response = super().list_tasks()
+        self.assertEqual(response.status_code, 200)
+
+    def test_report(self):
+        for _ in range(3):
+            self.list_tasks()
+
+        report = self.client.get(reverse('memory')).json()
+        route = report['routes']['GET tasks:tasks_list_create']
+
+        self.assertTrue(report['tracing'])
+        self.assertEqual(route['requests'], 3)
+        self.assertGreater(route['peak_kb_max'], 0)
+        self.assertGreaterEqual(route['peak_kb_max'], route['peak_kb_mean'])
+        self.assertTrue(route['top_sites'])
+        self.assertFalse(route['growing'])
+
+        self.assertEqual(self.client.delete(reverse('memory')).status_code, 204)
+        self.assertNotIn('GET tasks:tasks_list_create',
+                         self.client.get(reverse('memory')).json()['routes'])
+
+    def test_report_without_resource_module(self):
+        self.assertIsNotNone(memory_report.summary()['max_rss_kb'])
+
+        with mock.patch.dict('sys.modules', {'resource': None}):
+            self.assertIsNone(memory_report.summary()['max_rss_kb'])
+
+    def test_growing_route(self):
+        leaked = []
+        get = TaskListCreateView.get
+
+        def leaking_get(view, request, *args, **kwargs):
+            leaked.append(bytearray(100 * 1024))
+            return get(view, request, *args, **kwargs)
+
+        with mock.patch.object(TaskListCreateView, 'get', leaking_get):
+            for _ in range(5):
+                self.list_tasks()
+
+        route = self.client.get(reverse('memory')).json()['routes']['GET tasks:tasks_list_create']
+
+        self.assertTrue(route['growing'])
+        site = route['top_sites'][0]
+        self.assertTrue(site['site'].startswith('core/tests.py:'))
+        self.assertGreaterEqual(site['kb_per_request'], 100)
+        self.assertGreaterEqual(site['growth_kb'], 200)
+
+    def test_staff_only(self):
+        user = User.objects.create_user(email='user@example.com', password='password')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        self.assertEqual(client.get(reverse('memory')).status_code, 403)
+
+
+@override_settings(TRACING_ENABLED=True, TRACING_SAMPLE_RATE=1)
+class TracingTests(ProjectRequestTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # Authenticated with a token, which TracedJWTAuthentication traces.
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        tracing.memory_exporter.clear()
+        self.addCleanup(tracing.memory_exporter.clear)
+
+    def list_tasks(self, **headers):
+        return self.client.get(
+            reverse('tasks:tasks_list_create'), {'project_id': self.project.id}, headers=headers)
+
+    def test_request_spans(self):
+        response = self.list_tasks()
+
+        trace, = tracing.memory_exporter.traces()
+        spans = {span['name']: span for span in trace['spans']}
+        root = trace['spans'][0]
+
+        self.assertEqual(root['name'], 'GET tasks:tasks_list_create')
+        self.assertEqual(root['kind'], 'server')
+        self.assertIsNone(root['parent_id'])
+        self.assertEqual(root['attributes']['http.status_code'], 200)
+        self.assertTrue(response['traceresponse'].startswith(f'00-{trace["trace_id"]}-'))
+
+        check = spans['ProjectPermissionMixin.check_permissions_member']
+        self.assertIn('authenticate', spans)
+        self.assertTrue(any(name.startswith('serialize ') for name in spans))
+        self.assertIn('render', spans)
+        self.assertEqual(check['parent_id'], root['span_id'])
+
+        queries = [span for span in trace['spans'] if span['name'] == 'db.query']
+        self.assertIn(check['span_id'], {span['parent_id'] for span in queries})
+        self.assertTrue(all(span['attributes']['db.statement'] for span in queries))
+
+    @override_settings(TRACING_TRUST_TRACEPARENT=True)
+    def test_traceparent(self):
+        trace_id, parent_id = 'ab' * 16, 'cd' * 8
+        response = self.list_tasks(traceparent=f'00-{trace_id}-{parent_id}-01')
+
+        trace, = tracing.memory_exporter.traces()
+        self.assertEqual(trace['trace_id'], trace_id)
+        self.assertEqual(trace['spans'][0]['parent_id'], parent_id)
+        self.assertTrue(response['traceresponse'].startswith(f'00-{trace_id}-'))
+
+    @override_settings(TRACING_TRUST_TRACEPARENT=True)
+    def test_traceparent_not_sampled(self):
+        response = self.list_tasks(traceparent=f'00-{"ab" * 16}-{"cd" * 8}-00')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('traceresponse', response)
+        self.assertEqual(tracing.memory_exporter.traces(), [])
+
+    def test_untrusted_traceparent_is_sampled_by_rate(self):
+        trace_id, parent_id = 'ab' * 16, 'cd' * 8
+
+        with self.settings(TRACING_SAMPLE_RATE=0):
+            response = self.list_tasks(traceparent=f'00-{trace_id}-{parent_id}-01')
+
+        self.assertNotIn('traceresponse', response)
+        self.assertEqual(tracing.memory_exporter.traces(), [])
+
+        self.list_tasks(traceparent=f'00-{trace_id}-{parent_id}-00')
+
+        trace, = tracing.memory_exporter.traces()
+        self.assertEqual(trace['trace_id'], trace_id)
+        self.assertEqual(trace['spans'][0]['parent_id'], parent_id)
+
+    def test_disabled(self):
+        with self.settings(TRACING_ENABLED=False):
+            self.list_tasks()
+
+        self.assertEqual(tracing.memory_exporter.traces(), [])
+
+    def test_file_exporter(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'traces.jsonl')
+
+        with self.settings(TRACING_FILE_PATH=path):
+            self.list_tasks()
+
+        with open(path) as file:
+            trace, = [json.loads(line) for line in file]
+
+        self.assertEqual(trace['spans'][0]['name'], 'GET tasks:tasks_list_create')
+
+        output = StringIO()
+        call_command('show_traces', file=path, view='tasks_list_create', stdout=output)
+        self.assertIn(f'trace {trace["trace_id"]}', output.getvalue())
+        self.assertIn('ProjectPermissionMixin.check_permissions_member', output.getvalue())
+
+    def test_otlp_exporter(self):
+        self.list_tasks()
+        trace, = tracing.memory_exporter.traces()
+        exporter = tracing.OTLPExporter('http://collector:4318/v1/traces', 'orchestrate')
+
+        with mock.patch('core.tracing.urlopen') as urlopen:
+            exporter.post([trace])
+
+        request = urlopen.call_args.args[0]
+        body = json.loads(request.data)
+        resource_spans, = body['resourceSpans']
+        spans = resource_spans['scopeSpans'][0]['spans']
+
+        self.assertEqual(request.full_url, 'http://collector:4318/v1/traces')
+        self.assertEqual(resource_spans['resource']['attributes'][0]['value'],
+                         {'stringValue': 'orchestrate'})
+        self.assertEqual(len(spans), len(trace['spans']))
+        self.assertEqual(spans[0]['traceId'], trace['trace_id'])
+        self.assertEqual(spans[0]['kind'], 2)
+        self.assertNotIn('parentSpanId', spans[0])
+        self.assertTrue(all(span['parentSpanId'] for span in spans[1:]))
+
+    def test_outside_of_a_trace(self):
+        with tracing.span('nothing') as current:
+            self.assertIsNone(current)
+
+        self.assertIsNone(tracing.get_current_span())
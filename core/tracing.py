@@ -0,0 +1,434 @@
+"""
+Request tracing.
+
+``TracingMiddleware`` traces a ``TRACING_SAMPLE_RATE`` share of the
+requests when ``settings.TRACING_ENABLED`` is set. A request with a W3C
+``traceparent`` header continues its trace when traced. Its sampled flag
+is only followed with ``settings.TRACING_TRUST_TRACEPARENT``, for servers
+behind a proxy or gateway that sets the header itself: otherwise any
+client could have all its requests traced. A trace is a tree of spans,
+timed from their start to their end:
+
+- the request, named after its method and URL name;
+- the authentication of the JWT of DRF views (see
+  ``TracedJWTAuthentication``);
+- the permission checks, and any function decorated with ``@traced``;
+- every query, with its SQL;
+- the serialization of the ``data`` of the serializers of the views (see
+  ``core.profiling.serializer_data()``);
+- the rendering of the response.
+
+The trace id and the span id of the request are sent back in a
+``traceresponse`` header. Finished traces are kept in ``memory_exporter``,
+the last ``MEMORY_TRACES`` of them, appended as a JSON line to
+``TRACING_FILE_PATH`` when set, and sent to the OTLP/HTTP JSON endpoint
+``TRACING_OTLP_ENDPOINT`` of a collector when set, from a background thread.
+
+Requests that aren't traced pay for a random draw, and code that isn't
+running in a traced request for a context variable lookup per span.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.db import connections
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from core.capture import append_line
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_PATTERN = re.compile(r'^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+# Spans recorded per trace, the next ones are counted as dropped.
+MAX_SPANS = 2000
+
+# Traces kept by ``memory_exporter``.
+MEMORY_TRACES = 100
+
+# OTLP span kinds.
+KINDS = {'internal': 1, 'server': 2, 'client': 3}
+
+_current_span = ContextVar('trace_span', default=None)
+
+
+def new_id(size):
+    return os.urandom(size).hex()
+
+
+class Trace:
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or new_id(16)
+        self.spans = []
+        self.dropped = 0
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'dropped_spans': self.dropped,
+            'spans': [span.to_dict() for span in self.spans],
+        }
+
+
+class Span:
+    def __init__(self, trace, name, parent_id=None, kind='internal', attributes=None):
+        self.trace = trace
+        self.span_id = new_id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+        if len(trace.spans) < MAX_SPANS:
+            trace.spans.append(self)
+        else:
+            trace.dropped += 1
+
+    def end(self):
+        self.end_ns = time.time_ns()
+
+    def to_dict(self):
+        return {
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start_ns': self.start_ns,
+            'duration_ms': round(((self.end_ns or time.time_ns()) - self.start_ns) / 1e6, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+def get_current_span():
+    return _current_span.get()
+
+
+@contextmanager
+def span(name, attributes=None, kind='internal'):
+    """
+    Record the block as a child of the current span. Does nothing outside
+    of a trace, and yields None.
+    """
+    parent = _current_span.get()
+
+    if parent is None:
+        yield None
+        return
+
+    child = Span(parent.trace, name, parent.span_id, kind, attributes)
+    token = _current_span.set(child)
+
+    try:
+        yield child
+    except Exception as error:
+        child.error = f'{type(error).__name__}: {error}'
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
+
+
+def traced(func):
+    """
+    Record the calls of ``func`` as spans named after it.
+    """
+    name = func.__qualname__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current_span.get() is None:
+            return func(*args, **kwargs)
+
+        with span(name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def trace_query(execute, sql, params, many, context):
+    """
+    ``execute_wrapper`` recording the queries as spans.
+    """
+    connection = context['connection']
+
+    with span('db.query', {
+        'db.system': connection.vendor,
+        'db.name': connection.alias,
+        'db.statement': sql,
+    }, kind='client'):
+        return execute(sql, params, many, context)
+
+
+class TracedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` recording the authentication as a span.
+    """
+
+    def authenticate(self, request):
+        with span('authenticate'):
+            return super().authenticate(request)
+
+
+def parse_traceparent(value):
+    """
+    ``(trace id, parent span id, sampled)`` of a ``traceparent`` header, or
+    None when it is missing or invalid.
+    """
+    match = TRACEPARENT_PATTERN.match(value or '')
+
+    if match is None:
+        return None
+
+    version, trace_id, span_id, flags = match.groups()
+
+    if version == 'ff' or trace_id == '0' * 32 or span_id == '0' * 16:
+        return None
+
+    return trace_id, span_id, bool(int(flags, 16) & 1)
+
+
+def format_traceparent(current):
+    return f'00-{current.trace.trace_id}-{current.span_id}-01'
+
+
+class InMemoryExporter:
+    def __init__(self, size=MEMORY_TRACES):
+        self._traces = deque(maxlen=size)
+
+    def export(self, trace):
+        self._traces.append(trace.to_dict())
+
+    def traces(self):
+        return list(self._traces)
+
+    def clear(self):
+        self._traces.clear()
+
+
+class FileExporter:
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, trace):
+        append_line(self.path, trace.to_dict())
+
+
+def attribute_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+
+    if isinstance(value, float):
+        return {'doubleValue': value}
+
+    return {'stringValue': str(value)}
+
+
+def to_otlp(traces, service_name):
+    """
+    ``traces``, as dicts, in the OTLP JSON encoding of an export request.
+    """
+    spans = []
+
+    for trace in traces:
+        for item in trace['spans']:
+            otlp_span = {
+                'traceId': trace['trace_id'],
+                'spanId': item['span_id'],
+                'name': item['name'],
+                'kind': KINDS[item['kind']],
+                'startTimeUnixNano': str(item['start_ns']),
+                'endTimeUnixNano': str(item['start_ns'] + int(item['duration_ms'] * 1e6)),
+                'attributes': [
+                    {'key': key, 'value': attribute_value(value)}
+                    for key, value in item['attributes'].items()
+                ],
+                'status': ({'code': 2, 'message': item['error']} if item['error']
+                           else {'code': 0}),
+            }
+
+            if item['parent_id']:
+                otlp_span['parentSpanId'] = item['parent_id']
+
+            spans.append(otlp_span)
+
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [
+                {'key': 'service.name', 'value': {'stringValue': service_name}},
+            ]},
+            'scopeSpans': [{'scope': {'name': __name__}, 'spans': spans}],
+        }],
+    }
+
+
+class OTLPExporter:
+    """
+    Sends the traces to an OTLP/HTTP collector in batches, from a thread of
+    its own. Traces arriving while ``max_queue`` of them wait are dropped.
+    """
+
+    def __init__(self, endpoint, service_name, timeout=5, max_queue=1000, batch_size=100):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.queue = queue.Queue(max_queue)
+        self.dropped = 0
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def export(self, trace):
+        # A forked worker starts its own thread.
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._thread = threading.Thread(
+                        target=self.run, name='otlp-exporter', daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+
+        try:
+            self.queue.put_nowait(trace.to_dict())
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self.post(batch)
+
+    def post(self, traces):
+        request = Request(
+            self.endpoint, data=json.dumps(to_otlp(traces, self.service_name)).encode(),
+            headers={'Content-Type': 'application/json'})
+
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except Exception as error:
+            logger.warning('Could not send %d traces to %s: %s', len(traces), self.endpoint, error)
+
+
+memory_exporter = InMemoryExporter()
+
+_exporters = {}
+_exporters_lock = threading.Lock()
+
+
+def get_exporters():
+    key = (settings.TRACING_FILE_PATH, settings.TRACING_OTLP_ENDPOINT)
+
+    with _exporters_lock:
+        if key not in _exporters:
+            exporters = [memory_exporter]
+
+            if settings.TRACING_FILE_PATH:
+                exporters.append(FileExporter(settings.TRACING_FILE_PATH))
+
+            if settings.TRACING_OTLP_ENDPOINT:
+                exporters.append(OTLPExporter(
+                    settings.TRACING_OTLP_ENDPOINT, settings.TRACING_SERVICE_NAME))
+
+            _exporters[key] = exporters
+
+        return _exporters[key]
+
+
+def export(trace):
+    for exporter in get_exporters():
+        try:
+            exporter.export(trace)
+        except Exception:
+            logger.exception('Could not export trace %s with %s.',
+                             trace.trace_id, type(exporter).__name__)
+
+
+class TracingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.TRACING_ENABLED:
+            return self.get_response(request)
+
+        parent = parse_traceparent(request.META.get('HTTP_TRACEPARENT'))
+
+        if parent is not None and settings.TRACING_TRUST_TRACEPARENT:
+            sampled = parent[2]
+        else:
+            rate = settings.TRACING_SAMPLE_RATE
+            sampled = bool(rate) and random.random() < rate
+
+        if not sampled:
+            return self.get_response(request)
+
+        trace = Trace(parent[0] if parent is not None else None)
+        root = Span(trace, request.method, parent[1] if parent is not None else None,
+                    kind='server', attributes={
+                        'http.method': request.method,
+                        'http.target': request.path,
+                    })
+        token = _current_span.set(root)
+
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(trace_query))
+
+                response = self.get_response(request)
+        finally:
+            _current_span.reset(token)
+
+        match = request.resolver_match
+
+        if match is not None:
+            root.name = f'{request.method} {match.view_name}'
+            root.attributes['http.route'] = match.view_name
+
+        root.attributes['http.status_code'] = response.status_code
+
+        if response.status_code >= 500:
+            root.error = f'HTTP {response.status_code}'
+
+        root.end()
+        response['traceresponse'] = format_traceparent(root)
+        export(trace)
+        return response
+
+    def process_template_response(self, request, response):
+        current = _current_span.get()
+
+        if current is not None:
+            # Rendered right after the process_template_response() of every
+            # middleware, only the end can be hooked.
+            render = Span(current.trace, 'render', current.span_id)
+            response.add_post_render_callback(lambda response: render.end())
+
+        return response
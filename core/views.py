@@ -1,3 +1,103 @@
-from django.shortcuts import render
+import hmac
+import ipaddress
 
-# Create your views here.
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import metrics, sampler
+from core.memory import memory_report
+
+
+def can_scrape(request):
+    """
+    Whether ``request`` comes from one of ``settings.METRICS_ALLOWED_IPS``
+    or carries the bearer token ``settings.METRICS_TOKEN``.
+    """
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+
+    if token and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+        return True
+
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+
+    return any(address in ipaddress.ip_network(network)
+               for network in settings.METRICS_ALLOWED_IPS)
+
+
+def metrics_view(request):
+    """
+    Metrics of every process, for Prometheus to scrape. Only served to the
+    scrapers allowed by ``can_scrape()``.
+    """
+    if not can_scrape(request):
+        return HttpResponseForbidden()
+
+    return HttpResponse(metrics.REGISTRY.exposition(), content_type=metrics.CONTENT_TYPE)
+
+
+class ProfilerView(APIView):
+    """
+    Sample the stacks of the requests the serving process handles for
+    ``seconds``, and return them as collapsed stacks or, with
+    ``output=speedscope``, speedscope JSON.
+    Only the process serving this request is profiled, so the server must
+    run threaded workers: answers 409 when no other request is running in
+    the process, unless ``all_threads=1``.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            seconds = float(request.GET.get('seconds', 10))
+            interval = float(request.GET.get('interval', 0.01))
+        except ValueError:
+            return Response({"message": "seconds and interval must be numbers"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        output = request.GET.get('output', 'collapsed')
+
+        if output not in sampler.FORMATS:
+            return Response({"message": f"output must be one of {', '.join(sampler.FORMATS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            profile = sampler.sample(
+                seconds, interval, all_threads=request.GET.get('all_threads') == '1')
+        except (sampler.ProfilerBusy, sampler.NoRequestThreads) as error:
+            return Response({"message": str(error)}, status=status.HTTP_409_CONFLICT)
+
+        if output == 'speedscope':
+            return Response(sampler.speedscope(profile))
+
+        return HttpResponse(sampler.collapsed(profile), content_type='text/plain; charset=utf-8')
+
+
+class MemoryReportView(APIView):
+    """
+    Memory diagnostics of the serving process by route, see core.memory.
+    DELETE starts them over.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            top = int(request.GET.get('top', 10))
+        except ValueError:
+            return Response({"message": "top must be a number"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(memory_report.summary(top))
+
+    def delete(self, request):
+        memory_report.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,47 @@
+"""
+Run queued background jobs.
+"""
+
+import signal
+
+from django.core.management.base import BaseCommand
+
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Claim and run queued jobs on a pool of threads or processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Jobs run at the same time.')
+        parser.add_argument(
+            '--mode', choices=['thread', 'process'], default='thread',
+            help='Run jobs on a pool of threads, or of processes for CPU-bound jobs.')
+        parser.add_argument(
+            '--poll-interval', type=float,
+            help='Seconds between polls of an empty queue. '
+                 'Defaults to JOB_POLL_INTERVAL.')
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once no job is due instead of waiting for more.')
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=options['concurrency'],
+            mode=options['mode'],
+            poll_interval=options['poll_interval'],
+            burst=options['burst'],
+            log=self.stdout.write,
+        )
+
+        # Finish the running jobs on Ctrl-C or SIGTERM.
+        signal.signal(signal.SIGINT, worker.stop)
+        signal.signal(signal.SIGTERM, worker.stop)
+
+        self.stdout.write(
+            f'Worker {worker.id} running {options["concurrency"]} '
+            f'{options["mode"]}(s).')
+        processed = worker.run()
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} jobs.'))
@@ -0,0 +1,30 @@
+"""
+Functions run by the pool of a worker.
+
+Processes of the pool are spawned without the state of the worker and
+import this module before Django is set up, so the models are only
+imported once ``setup_process()`` ran.
+"""
+
+import django
+
+
+def setup_process():
+    django.setup()
+
+
+def run_job(job_id):
+    """
+    Run the claimed job ``job_id`` in a thread or process of the pool.
+    """
+    from django.db import close_old_connections, connections
+
+    from jobs import queue
+    from jobs.models import Job
+
+    close_old_connections()
+
+    try:
+        queue.execute(Job.objects.get(pk=job_id))
+    finally:
+        connections.close_all()
@@ -0,0 +1,269 @@
+"""
+Database-backed job queue.
+
+Functions are registered with ``@job('name')`` in the ``jobs`` module of an
+app, and queued with ``enqueue('name', **kwargs)``. Workers started by
+``manage.py runworker`` claim the queued jobs by priority, then age, and
+run them.
+
+Claiming uses ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database
+supports it. SQLite has no row locks: there a job is claimed with a single
+conditional ``UPDATE`` of one queued row, which SQLite serializes with every
+other write, so two workers never claim the same job.
+"""
+
+import json
+import random
+import traceback
+import uuid
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from jobs.models import Job
+
+# Times a worker retries claiming when another worker took the job it chose.
+CLAIM_ATTEMPTS = 3
+
+_registry = {}
+_current_job = ContextVar('current_job', default=None)
+
+
+class JobError(Exception):
+    pass
+
+
+def job(name, max_attempts=None):
+    """
+    Register a function as the job ``name``. It is called with the kwargs
+    given to ``enqueue``, and its return value, if JSON serializable, is
+    stored as the result of the job.
+    """
+    def decorator(function):
+        if name in _registry:
+            raise JobError(f'A job named {name} is already registered.')
+
+        function.job_name = name
+        function.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        _registry[name] = function
+        return function
+
+    return decorator
+
+
+def get_job_function(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise JobError(f'No job named {name} is registered.') from None
+
+
+def enqueue(name, *, priority=0, dedupe_key=None, run_at=None, created_by=None,
+            **kwargs):
+    """
+    Queue the job ``name``. With a ``dedupe_key``, returns the job already
+    queued under that key, if any, instead of queueing another one.
+    """
+    function = get_job_function(name)
+    using = router.db_for_write(Job)
+
+    try:
+        with transaction.atomic(using=using):
+            return Job.objects.using(using).create(
+                name=name,
+                kwargs=kwargs,
+                priority=priority,
+                dedupe_key=dedupe_key,
+                run_at=run_at or timezone.now(),
+                max_attempts=function.max_attempts,
+                created_by=created_by,
+            )
+    except IntegrityError:
+        if dedupe_key is None:
+            raise
+
+        existing = Job.objects.using(using).filter(
+            dedupe_key=dedupe_key, status=Job.STATUS_QUEUED).first()
+
+        if existing is None:
+            # Claimed between the insert and this lookup.
+            return enqueue(name, priority=priority, dedupe_key=dedupe_key,
+                           run_at=run_at, created_by=created_by, **kwargs)
+
+        return existing
+
+
+def claim(worker_id):
+    """
+    Mark the next job due as running for ``worker_id`` and return it, or
+    None when no job is due.
+    """
+    using = router.db_for_write(Job)
+    now = timezone.now()
+    due = Job.objects.using(using).filter(
+        status=Job.STATUS_QUEUED, run_at__lte=now).order_by('-priority', 'run_at', 'pk')
+    claimed = {
+        'status': Job.STATUS_RUNNING,
+        'locked_by': worker_id,
+        'locked_at': now,
+        'attempts': F('attempts') + 1,
+    }
+
+    if connections[using].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=using):
+            job = due.select_for_update(skip_locked=True).first()
+
+            if job is None:
+                return None
+
+            Job.objects.using(using).filter(pk=job.pk).update(**claimed)
+    else:
+        token = f'{worker_id}:{uuid.uuid4().hex}'
+
+        # The candidate is re-checked by the UPDATE itself; when another
+        # worker got it first, try the next one.
+        for attempt in range(CLAIM_ATTEMPTS):
+            candidate = due.values('pk')[:1]
+
+            if Job.objects.using(using).filter(
+                    pk__in=candidate, status=Job.STATUS_QUEUED).update(
+                    **{**claimed, 'locked_by': token}):
+                break
+
+            if not due.exists():
+                return None
+        else:
+            return None
+
+        job = Job.objects.using(using).get(locked_by=token)
+        Job.objects.using(using).filter(pk=job.pk).update(locked_by=worker_id)
+
+    job.refresh_from_db(using=using)
+    return job
+
+
+def retry_delay(attempts):
+    """
+    Seconds before retrying a job that failed ``attempts`` times:
+    exponential backoff with full jitter.
+    """
+    ceiling = min(settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1),
+                  settings.JOB_RETRY_BACKOFF_MAX)
+    return random.uniform(0, ceiling)
+
+
+def execute(job):
+    """
+    Run a claimed job and record how it went.
+    """
+    token = _current_job.set(job)
+
+    try:
+        result = get_job_function(job.name)(**job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+
+        if job.attempts < job.max_attempts:
+            requeue(job.pk, now + timedelta(seconds=retry_delay(job.attempts)), error)
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.STATUS_FAILED, finished_at=now,
+                last_error=error, locked_by='', locked_at=None)
+    else:
+        if not is_json_serializable(result):
+            result = None
+
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.STATUS_SUCCEEDED,
+            result=result,
+            locked_by='',
+            locked_at=None,
+            finished_at=timezone.now(),
+        )
+    finally:
+        _current_job.reset(token)
+
+
+def is_json_serializable(value):
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        return False
+
+    return True
+
+
+def report_progress(**progress):
+    """
+    Record the progress of the job running in this context, shown by the
+    status API. Does nothing outside of jobs.
+    """
+    job = _current_job.get()
+
+    if job is not None:
+        job.progress = progress
+        Job.objects.filter(pk=job.pk).update(progress=progress)
+
+
+def heartbeat(job_ids):
+    """
+    Keep the locks of running jobs fresh, so they aren't taken for jobs
+    of a dead worker.
+    """
+    if job_ids:
+        Job.objects.filter(pk__in=job_ids, status=Job.STATUS_RUNNING).update(
+            locked_at=timezone.now())
+
+
+def requeue(job_id, run_at, error):
+    """
+    Queue the job ``job_id`` again to run at ``run_at``, or fail it when
+    another job is already queued under its dedupe key, which will do the
+    same work. Returns whether it was queued.
+    """
+    using = router.db_for_write(Job)
+    released = {'locked_by': '', 'locked_at': None}
+
+    try:
+        with transaction.atomic(using=using):
+            Job.objects.using(using).filter(pk=job_id).update(
+                status=Job.STATUS_QUEUED, run_at=run_at, last_error=error, **released)
+    except IntegrityError:
+        Job.objects.using(using).filter(pk=job_id).update(
+            status=Job.STATUS_FAILED, finished_at=timezone.now(),
+            last_error=f'{error}\nAnother job is already queued under its dedupe key.',
+            **released)
+        return False
+
+    return True
+
+
+def recover_stale_jobs():
+    """
+    Requeue the running jobs whose worker stopped renewing their lock,
+    or fail them when they have no attempt left. Returns how many.
+    """
+    stale = Job.objects.filter(
+        status=Job.STATUS_RUNNING,
+        locked_at__lt=timezone.now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT),
+    )
+    error = 'The worker running this job stopped.'
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.STATUS_FAILED, finished_at=timezone.now(),
+        locked_by='', locked_at=None, last_error=error)
+    requeued = stale.filter(dedupe_key__isnull=True).update(
+        status=Job.STATUS_QUEUED, run_at=timezone.now(),
+        locked_by='', locked_at=None, last_error=error)
+
+    # Jobs with a dedupe key may clash with one queued since: one by one.
+    deduped = list(stale.values_list('pk', flat=True))
+
+    for job_id in deduped:
+        requeue(job_id, timezone.now(), error)
+
+    return failed + requeued + len(deduped)
@@ -0,0 +1,20 @@
+"""
+Serializers for the jobs app.
+"""
+
+from rest_framework import serializers
+
+from jobs.models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Status of a background job"""
+
+    class Meta:
+        model = Job
+        fields = (
+            'id', 'name', 'kwargs', 'priority', 'status', 'run_at', 'attempts',
+            'max_attempts', 'progress', 'result', 'last_error', 'created_at',
+            'updated_at', 'finished_at',
+        )
+        read_only_fields = fields
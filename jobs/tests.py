@@ -0,0 +1,210 @@
+"""
+Tests for the jobs app.
+"""
+
+from datetime import timedelta
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from jobs import queue
+from jobs.models import Job
+from jobs.worker import Worker
+
+from users.tests import create_user
+
+LIST_JOBS_URL = reverse('jobs:list')
+
+
+@queue.job('tests.add', max_attempts=2)
+def add(a, b):
+    queue.report_progress(step='adding')
+    return a + b
+
+
+@queue.job('tests.fail', max_attempts=2)
+def fail():
+    raise ValueError('Something went wrong.')
+
+
+def detail_url(job_id):
+    return reverse('jobs:detail', kwargs={'pk': job_id})
+
+
+class JobQueueTests(TestCase):
+    def test_enqueue_unknown_job(self):
+        with self.assertRaises(queue.JobError):
+            queue.enqueue('tests.unknown')
+
+    def test_enqueue_with_dedupe_key_returns_queued_job(self):
+        first = queue.enqueue('tests.add', dedupe_key='sum', a=1, b=2)
+        second = queue.enqueue('tests.add', dedupe_key='sum', a=3, b=4)
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_dedupe_key_is_free_once_job_is_claimed(self):
+        first = queue.enqueue('tests.add', dedupe_key='sum', a=1, b=2)
+        queue.claim('worker')
+
+        second = queue.enqueue('tests.add', dedupe_key='sum', a=3, b=4)
+
+        self.assertNotEqual(first.pk, second.pk)
+
+    def test_claim_by_priority_then_age(self):
+        old = queue.enqueue('tests.add', a=1, b=1)
+        urgent = queue.enqueue('tests.add', priority=10, a=2, b=2)
+        queue.enqueue('tests.add', a=3, b=3,
+                      run_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(queue.claim('worker').pk, urgent.pk)
+
+        job = queue.claim('worker')
+
+        self.assertEqual(job.pk, old.pk)
+        self.assertEqual(job.status, Job.STATUS_RUNNING)
+        self.assertEqual(job.locked_by, 'worker')
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNone(queue.claim('worker'))
+
+    def test_execute_stores_result_and_progress(self):
+        queue.enqueue('tests.add', a=1, b=2)
+
+        queue.execute(queue.claim('worker'))
+        job = Job.objects.get()
+
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(job.result, 3)
+        self.assertEqual(job.progress, {'step': 'adding'})
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failed_job_is_retried_then_failed(self):
+        queue.enqueue('tests.fail')
+
+        queue.execute(queue.claim('worker'))
+        job = Job.objects.get()
+
+        self.assertEqual(job.status, Job.STATUS_QUEUED)
+        self.assertIn('Something went wrong.', job.last_error)
+        self.assertGreaterEqual(job.run_at, job.updated_at - timedelta(seconds=1))
+
+        Job.objects.update(run_at=timezone.now())
+        queue.execute(queue.claim('worker'))
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    @override_settings(JOB_RETRY_BACKOFF=10, JOB_RETRY_BACKOFF_MAX=30)
+    def test_retry_delay_is_capped(self):
+        self.assertLessEqual(queue.retry_delay(1), 10)
+        self.assertLessEqual(queue.retry_delay(20), 30)
+
+    @override_settings(JOB_LOCK_TIMEOUT=60)
+    def test_recover_stale_jobs(self):
+        queue.enqueue('tests.add', a=1, b=2)
+        queue.enqueue('tests.fail')
+        stale = timezone.now() - timedelta(minutes=5)
+        queue.claim('worker')
+        queue.claim('worker')
+        Job.objects.filter(name='tests.add').update(locked_at=stale)
+        Job.objects.filter(name='tests.fail').update(locked_at=stale, attempts=2)
+
+        self.assertEqual(queue.recover_stale_jobs(), 2)
+        self.assertEqual(Job.objects.get(name='tests.add').status, Job.STATUS_QUEUED)
+        self.assertEqual(Job.objects.get(name='tests.fail').status, Job.STATUS_FAILED)
+
+
+    def test_retry_fails_when_dedupe_key_is_queued_again(self):
+        queue.enqueue('tests.fail', dedupe_key='fail')
+        job = queue.claim('worker')
+        queued = queue.enqueue('tests.fail', dedupe_key='fail')
+
+        queue.execute(job)
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIn('Something went wrong.', job.last_error)
+        self.assertIn('dedupe key', job.last_error)
+        self.assertEqual(Job.objects.get(pk=queued.pk).status, Job.STATUS_QUEUED)
+
+    @override_settings(JOB_LOCK_TIMEOUT=60)
+    def test_recover_stale_job_whose_dedupe_key_is_queued_again(self):
+        queue.enqueue('tests.add', dedupe_key='add', a=1, b=2)
+        queue.enqueue('tests.add', dedupe_key='other', a=3, b=4)
+        stale = queue.claim('worker')
+        other = queue.claim('worker')
+        queued = queue.enqueue('tests.add', dedupe_key='add', a=1, b=2)
+        Job.objects.filter(pk__in=[stale.pk, other.pk]).update(
+            locked_at=timezone.now() - timedelta(minutes=5))
+
+        self.assertEqual(queue.recover_stale_jobs(), 2)
+        self.assertEqual(Job.objects.get(pk=stale.pk).status, Job.STATUS_FAILED)
+        self.assertEqual(Job.objects.get(pk=other.pk).status, Job.STATUS_QUEUED)
+        self.assertEqual(Job.objects.get(pk=queued.pk).status, Job.STATUS_QUEUED)
+
+
+class WorkerTests(TransactionTestCase):
+    def test_burst_worker_runs_every_due_job(self):
+        for value in range(3):
+            queue.enqueue('tests.add', a=value, b=1)
+
+        processed = Worker(concurrency=2, burst=True, poll_interval=0.01).run()
+
+        self.assertEqual(processed, 3)
+        self.assertEqual(
+            sorted(Job.objects.values_list('result', flat=True)), [1, 2, 3])
+
+
+class JobApiTests(TestCase):
+    def setUp(self):
+        self.user = create_user(email='user@example.com', password='testpass123')
+        self.other = create_user(email='other@example.com', password='testpass123')
+        self.staff = create_user(
+            email='staff@example.com', password='testpass123', is_staff=True)
+
+        self.job = queue.enqueue('tests.add', created_by=self.user, a=1, b=2)
+        self.other_job = queue.enqueue('tests.add', created_by=self.other, a=3, b=4)
+
+        self.client = APIClient()
+
+    def test_list_own_jobs(self):
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(LIST_JOBS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([job['id'] for job in res.data], [self.job.id])
+
+    def test_staff_lists_every_job(self):
+        self.client.force_authenticate(self.staff)
+
+        res = self.client.get(LIST_JOBS_URL, {'status': Job.STATUS_QUEUED})
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_retrieve_job_status(self):
+        queue.execute(queue.claim('worker'))
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(detail_url(self.job.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], Job.STATUS_SUCCEEDED)
+        self.assertEqual(res.data['result'], 3)
+
+    def test_retrieve_job_of_other_user(self):
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(detail_url(self.other_job.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unauthenticated(self):
+        res = self.client.get(LIST_JOBS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,14 @@
+"""
+URLs for the jobs app.
+"""
+
+from django.urls import path
+
+from .views import *
+
+app_name = 'jobs'
+
+urlpatterns = [
+    path('', JobListView.as_view(), name='list'),
+    path('<int:pk>/', JobRetrieveView.as_view(), name='detail'),
+]
@@ -0,0 +1,52 @@
+"""
+This file contains the views for the status of background jobs.
+"""
+
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+
+from jobs.models import Job
+from jobs.serializers import JobSerializer
+
+
+class JobQuerysetMixin:
+    """
+    Users see the jobs they started, staff sees every job.
+    """
+
+    def get_queryset(self):
+        queryset = Job.objects.order_by('-created_at')
+
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(created_by=self.request.user)
+
+        return queryset
+
+
+class JobListView(JobQuerysetMixin, generics.ListAPIView):
+    """
+    List jobs, optionally filtered by status and name.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+
+        for field in ('status', 'name'):
+            value = self.request.GET.get(field)
+
+            if value:
+                queryset = queryset.filter(**{field: value})
+
+        return queryset
+
+
+class JobRetrieveView(JobQuerysetMixin, generics.RetrieveAPIView):
+    """
+    Retrieve the status, progress and result of a job.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = JobSerializer
@@ -0,0 +1,106 @@
+"""
+Worker running queued jobs on a pool of threads or processes.
+
+The main thread claims jobs while the pool has a free slot, hands them to
+the pool and keeps the locks of the running jobs fresh. Jobs of workers
+that died are requeued once their lock is older than
+``settings.JOB_LOCK_TIMEOUT``.
+"""
+
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connections
+
+from jobs import queue
+from jobs.pool import run_job, setup_process
+
+
+class Worker:
+    def __init__(self, concurrency=1, mode='thread', poll_interval=None,
+                 burst=False, log=None):
+        self.concurrency = concurrency
+        self.mode = mode
+        self.poll_interval = poll_interval or settings.JOB_POLL_INTERVAL
+        self.burst = burst
+        self.log = log or (lambda message: None)
+        self.id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+        self.processed = 0
+
+    def create_pool(self):
+        if self.mode == 'process':
+            return ProcessPoolExecutor(
+                self.concurrency,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=setup_process,
+            )
+
+        return ThreadPoolExecutor(self.concurrency, thread_name_prefix='job')
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def run(self):
+        """
+        Run jobs until ``stop()`` is called or, in burst mode, until no
+        job is due. Running jobs are finished before returning.
+        """
+        running = {}
+        last_heartbeat = time.monotonic()
+
+        with self.create_pool() as pool:
+            while not self.stopping.is_set():
+                queue.recover_stale_jobs()
+                claimed = self.fill(pool, running)
+
+                if running:
+                    done, _ = wait(running, timeout=self.poll_interval,
+                                   return_when=FIRST_COMPLETED)
+                    self.collect(done, running)
+                elif not claimed:
+                    if self.burst:
+                        break
+
+                    self.stopping.wait(self.poll_interval)
+
+                if time.monotonic() - last_heartbeat >= settings.JOB_LOCK_TIMEOUT / 3:
+                    queue.heartbeat(list(running.values()))
+                    last_heartbeat = time.monotonic()
+
+            self.collect(wait(running).done, running)
+
+        connections.close_all()
+        return self.processed
+
+    def fill(self, pool, running):
+        """
+        Claim jobs for the free slots of the pool. Returns how many.
+        """
+        claimed = 0
+
+        while len(running) < self.concurrency and not self.stopping.is_set():
+            job = queue.claim(self.id)
+
+            if job is None:
+                break
+
+            self.log(f'Running job {job.pk} ({job.name}), attempt {job.attempts}.')
+            running[pool.submit(run_job, job.pk)] = job.pk
+            claimed += 1
+
+        return claimed
+
+    def collect(self, done, running):
+        for future in done:
+            job_id = running.pop(future)
+            self.processed += 1
+
+            # Errors of the job itself are recorded by queue.execute().
+            if future.exception() is not None:
+                self.log(f'Job {job_id} crashed the worker: {future.exception()!r}')
@@ -46,10 +46,24 @@ INSTALLED_APPS = [
     'projects',
     'tasks',
     'core',
+    'jobs',
+    'webhooks',
+    'activity',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.metrics.MetricsMiddleware',
+    'core.profiling.ProfilingMiddleware',
+    'core.memory.MemoryProfilingMiddleware',
+    'core.context.RequestContextMiddleware',
+    'core.tracing.TracingMiddleware',
+    'core.capture.TrafficCaptureMiddleware',
+    'activity.buffer.ActivityFlushMiddleware',
+    'core.slowqueries.SlowQueryFlushMiddleware',
+    'organizations.middleware.TenantMiddleware',
+    'organizations.middleware.ShardMiddleware',
+    'core.budgets.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -82,13 +96,288 @@ WSGI_APPLICATION = 'orchestrate.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# The core.db.backends.sqlite3 engine is Django's sqlite3 backend plus WAL
+# journaling, per-connection PRAGMA tuning, BEGIN IMMEDIATE transactions and
+# retries on SQLITE_BUSY. See its module docstring for the OPTIONS.
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'mmap_size': 256 * 1024 * 1024,
+                'cache_size': -64 * 1024,
+                'temp_store': 'MEMORY',
+                'busy_timeout': 5000,
+            },
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Read replicas: aliases of DATABASES that serve the reads of
+# REPLICA_READ_MODELS. SQLite replicas are kept up to date with
+# `manage.py sync_replicas --interval N`. For example:
+#
+#     DATABASES['replica'] = {
+#         'ENGINE': 'core.db.backends.sqlite3',
+#         'NAME': BASE_DIR / 'db.replica.sqlite3',
+#         'TEST': {'MIRROR': 'default'},
+#     }
+#     DATABASE_REPLICAS = ['replica']
+
+# Shards: aliases of DATABASES holding the data of SHARDED_APPS, one
+# organization per shard as recorded in the organization directory. The
+# first one must be 'default'. Organizations are moved between shards with
+# `manage.py move_organization ORGANIZATION_ID ALIAS`. For example:
+#
+#     DATABASES['shard1'] = {
+#         'ENGINE': 'core.db.backends.sqlite3',
+#         'NAME': BASE_DIR / 'db.shard1.sqlite3',
+#         'OPTIONS': DATABASES['default']['OPTIONS'],
+#     }
+#     SHARD_DATABASES = ['default', 'shard1']
+#
+# and `manage.py migrate --database shard1`.
+
+SHARD_DATABASES = ['default']
+
+SHARDED_APPS = ['organizations', 'projects', 'tasks', 'webhooks', 'activity']
+
+# Seconds each process caches the shard of an organization. Moves wait this
+# long between their steps, so every process sees each step.
+SHARD_DIRECTORY_TIMEOUT = 5
+
+DATABASE_ROUTERS = [
+    'organizations.sharding.ShardRouter',
+    'core.db.routers.PrimaryReplicaRouter',
+]
+
+DATABASE_REPLICAS = []
+
+REPLICA_READ_MODELS = [
+    'tasks.tasks',
+    'tasks.columns',
+    'projects.projectmembership',
+    'organizations.membership',
+]
+
+# Seconds a user's reads stay on the primary after they wrote, and the cache
+# alias keeping that pin, which every process must see (see core.checks).
+READ_YOUR_WRITES_WINDOW = 5
+READ_YOUR_WRITES_CACHE_ALIAS = 'default'
+
+
+# Tenants
+
+# Requests for <domain>.TENANT_BASE_DOMAIN, or for the domain itself, are
+# for the organization with that domain (see organizations.tenants). Tenant
+# hosts must also be in ALLOWED_HOSTS, e.g. '.orchestrate.local'.
+TENANT_BASE_DOMAIN = 'orchestrate.local'
+
+# Seconds each process keeps its map of the organization domains. Changes
+# are seen right away by the processes sharing the default cache with the
+# one that made them, and by the others after this long.
+TENANT_DOMAIN_MAP_TIMEOUT = 5
+
+
+# Task archive
+
+# Tasks of these columns not updated for TASK_ARCHIVE_AFTER_DAYS are moved
+# to the archive by `manage.py archive_tasks`, meant to run periodically.
+TASK_ARCHIVE_COLUMNS = ['Done']
+
+TASK_ARCHIVE_AFTER_DAYS = 90
+
+
+# Background jobs
+
+# Jobs are run by `manage.py runworker`. Workers poll an empty queue every
+# JOB_POLL_INTERVAL seconds, and requeue the jobs of a worker that didn't
+# renew their lock for JOB_LOCK_TIMEOUT seconds.
+JOB_POLL_INTERVAL = 1
+JOB_LOCK_TIMEOUT = 5 * 60
+
+# Failed jobs are retried up to JOB_MAX_ATTEMPTS runs in all, after a random
+# delay of up to JOB_RETRY_BACKOFF * 2 ** (failures - 1) seconds, capped at
+# JOB_RETRY_BACKOFF_MAX.
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF = 10
+JOB_RETRY_BACKOFF_MAX = 60 * 60
+
+
+# Webhooks
+
+# Events are delivered from the outbox by `manage.py dispatch_webhooks`:
+# WEBHOOK_BATCH_SIZE events per request, at most WEBHOOK_CONCURRENCY requests
+# in flight over WEBHOOK_CONNECTIONS_PER_HOST keep-alive connections per host.
+WEBHOOK_BATCH_SIZE = 100
+WEBHOOK_CONCURRENCY = 20
+WEBHOOK_CONNECTIONS_PER_HOST = 4
+WEBHOOK_TIMEOUT = 10
+
+# Endpoints on loopback, private, link-local and other non-public addresses
+# are refused when saved and when delivered to (see webhooks.validators).
+# Only allow them for development.
+WEBHOOK_ALLOW_PRIVATE_ADDRESSES = False
+
+# Failed deliveries are retried after WEBHOOK_RETRY_BACKOFF * 2 ** (failures - 1)
+# seconds, at most WEBHOOK_RETRY_BACKOFF_MAX. Endpoints are disabled after
+# WEBHOOK_MAX_FAILURES failures in a row.
+WEBHOOK_RETRY_BACKOFF = 10
+WEBHOOK_RETRY_BACKOFF_MAX = 60 * 60
+WEBHOOK_MAX_FAILURES = 20
+
+# Days events stay in the outbox, delivered or not. The dispatcher deletes
+# the older ones when it starts, then every WEBHOOK_PRUNE_INTERVAL seconds.
+WEBHOOK_EVENT_RETENTION_DAYS = 7
+WEBHOOK_PRUNE_INTERVAL = 60 * 60
+
+
+# Activity log
+
+# The activity log is buffered per process and written once it holds
+# ACTIVITY_FLUSH_SIZE events or its oldest event waited ACTIVITY_FLUSH_INTERVAL
+# seconds. Events that fail to be written are kept for the next flush, up to
+# ACTIVITY_BUFFER_MAX_SIZE events in all.
+ACTIVITY_FLUSH_SIZE = 100
+ACTIVITY_FLUSH_INTERVAL = 5
+ACTIVITY_BUFFER_MAX_SIZE = 10000
+
+
+# Profiling and query budgets
+
+# Share of the requests, from 0 to 1, whose query count and timings are sent
+# back in a Server-Timing header and logged to the ``core.profiling`` logger.
+# 0 disables the profiling.
+PROFILING_SAMPLE_RATE = 0
+
+# Requests running more queries than the ``query_budget`` of their view are
+# logged to the ``core.budgets`` logger with the stacks of up to
+# QUERY_BUDGET_STACK_SAMPLES queries past the budget. QUERY_BUDGET_RAISE
+# raises QueryBudgetExceeded instead, which the test runner turns on.
+QUERY_BUDGET_STACK_SAMPLES = 3
+QUERY_BUDGET_RAISE = False
+
+TEST_RUNNER = 'core.test_runner.QueryBudgetTestRunner'
+
+
+# Traffic capture
+
+# Requests are appended, sanitized, to the TRAFFIC_CAPTURE_PATH file when it
+# is set, a TRAFFIC_CAPTURE_SAMPLE_RATE share of them, for replay by
+# `manage.py replay_traffic` (see core.capture).
+TRAFFIC_CAPTURE_PATH = None
+TRAFFIC_CAPTURE_SAMPLE_RATE = 1.0
+
+
+# Metrics
+
+# Directory where each process writes its metrics, summed by /metrics, for
+# servers running several worker processes. None keeps them in memory, per
+# process. It must be emptied when the server starts (see core.metrics).
+METRICS_MULTIPROCESS_DIR = None
+
+# /metrics is only served to the addresses or networks of METRICS_ALLOWED_IPS,
+# e.g. '10.0.0.0/8' for the scrapers of a private network, and to requests
+# with the header "Authorization: Bearer <METRICS_TOKEN>" when it is set.
+# Behind a reverse proxy every request comes from the proxy's address, so
+# only the token can tell the scrapers apart.
+METRICS_ALLOWED_IPS = []
+METRICS_TOKEN = None
+
+
+# Slow queries
+
+# Queries slower than SLOW_QUERY_THRESHOLD_MS milliseconds are logged to the
+# ``core.slowqueries`` logger, with their plan on SQLite, and counted in the
+# table shown by `manage.py slow_queries`. None disables the log. Each
+# process adds its counts to the table every SLOW_QUERY_FLUSH_INTERVAL
+# seconds at most.
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_FLUSH_INTERVAL = 60
+
+# With SQL_COMMENT_VIEW_TAGS, the queries of views end with a /* view=... */
+# comment naming the view (see core.slowqueries). Off by default: the same
+# statement then has a different text in each view, which splits the
+# statement cache of the sqlite3 module between them.
+SQL_COMMENT_VIEW_TAGS = False
+
+
+# Memory diagnostics
+
+# tracemalloc snapshots are taken around a MEMORY_PROFILING_SAMPLE_RATE
+# share of the requests (see core.memory), keeping
+# MEMORY_PROFILING_FRAMES frames per allocation. 0 disables them, which
+# should stay the default: once started, tracing slows down every request
+# of the process. Allocation sites whose memory grew over the last
+# MEMORY_LEAK_WINDOW snapshots by MEMORY_LEAK_MIN_GROWTH bytes are flagged.
+MEMORY_PROFILING_SAMPLE_RATE = 0
+MEMORY_PROFILING_FRAMES = 15
+MEMORY_LEAK_WINDOW = 5
+MEMORY_LEAK_MIN_GROWTH = 64 * 1024
+
+
+# Tracing
+
+# With TRACING_ENABLED, a TRACING_SAMPLE_RATE share of the requests is
+# traced, continuing the trace of their traceparent header. Traces are kept
+# in memory, appended to TRACING_FILE_PATH when set and sent to the OTLP/HTTP
+# endpoint TRACING_OTLP_ENDPOINT when set, e.g.
+# 'http://localhost:4318/v1/traces'.
+TRACING_ENABLED = False
+TRACING_SAMPLE_RATE = 0.01
+TRACING_FILE_PATH = None
+TRACING_OTLP_ENDPOINT = None
+TRACING_SERVICE_NAME = 'orchestrate'
+
+# Whether requests whose traceparent header is sampled are all traced. Only
+# turn it on behind a proxy or gateway setting the header, as clients could
+# otherwise have every request traced and written out.
+TRACING_TRUST_TRACEPARENT = False
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Number of processes serving the project, e.g. the gunicorn workers. With
+# more than one, the caches keeping invalidation state (the response cache
+# and query cache versions, the read-your-writes pins, ...) must be shared by
+# all of them, such as Redis or Memcached: the system checks refuse a
+# LocMemCache for them (see core.checks).
+SERVER_PROCESSES = 1
+
+# Cache alias and timeout (in seconds) of the versioned project response cache.
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 60 * 5
+
+# Seconds a request waits for a concurrent computation of the same response
+# before computing it itself.
+RESPONSE_CACHE_LOCK_TIMEOUT = 10
+
+# Seconds an expired response is still served to requests that find it being
+# recomputed by another request. Set to 0 to always wait instead.
+RESPONSE_CACHE_STALE_TIMEOUT = 30
+
+# Cache alias, default timeout (in seconds) and largest result, in rows, of
+# the queryset cache used by ``.cached()``.
+QUERY_CACHE_ALIAS = 'default'
+QUERY_CACHE_TIMEOUT = 60
+QUERY_CACHE_MAX_ROWS = 1000
+
+# Cache alias and timeout (in seconds) of the per-row serialized fragments.
+FRAGMENT_CACHE_ALIAS = 'default'
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -135,11 +424,47 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.tracing.TracedJWTAuthentication',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'core.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'core.budgets': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'core.slowqueries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'core.tracing': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 SPECTACULAR_SETTINGS = {
     'ENUM_NAME_OVERRIDES': {
         'OrganizationRoleEnum': 'organizations.models.Membership.ROLE_CHOICES',
@@ -23,6 +23,10 @@ urlpatterns = [
     path('api/', include('tasks.urls')),
     path('api/organizations/', include('organizations.urls')),
     path('api/users/', include('users.urls')),
+    path('api/jobs/', include('jobs.urls')),
+    path('api/activity/', include('activity.urls')),
+    path('api/organizations/<int:organization_pk>/webhooks/',
+         include('webhooks.urls')),
     path('api/projects/', include(('projects.urls',
          'projects'), namespace='projects')),
 ]
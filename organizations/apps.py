@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class OrganizationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'organizations'
+
+    def ready(self):
+        from organizations import signals  # noqa: F401
+        from organizations.sharding import reserve_id_ranges
+
+        post_migrate.connect(reserve_id_ranges)
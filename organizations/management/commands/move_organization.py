@@ -0,0 +1,122 @@
+"""
+Move an organization to another shard while it stays online.
+
+1. The rows of the organization are copied in batches while it keeps
+   serving reads and writes from its current shard.
+2. Writes are locked (answered with 503) for a short while, and the rows
+   written or deleted during the copy are brought over.
+3. The directory is flipped to the new shard and writes are unlocked.
+4. The rows are deleted from the old shard.
+
+Each step waits for ``SHARD_DIRECTORY_TIMEOUT`` seconds, the time it takes
+every process to see the new directory entry.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from organizations import sharding
+from organizations.models import Organization, OrganizationShard
+
+
+class Command(BaseCommand):
+    help = 'Move an organization and all of its data to another shard.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('organization_id', type=int)
+        parser.add_argument('alias', help='Shard to move the organization to.')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Rows copied or deleted per statement.')
+        parser.add_argument(
+            '--keep-source', action='store_true',
+            help='Leave the rows on the old shard instead of deleting them.')
+
+    def handle(self, *args, **options):
+        organization_id = options['organization_id']
+        target = options['alias']
+        batch_size = options['batch_size']
+
+        if target not in settings.SHARD_DATABASES:
+            raise CommandError(f'{target} is not in SHARD_DATABASES.')
+
+        source, status = sharding.get_directory_entry(organization_id)
+
+        if status != OrganizationShard.STATUS_ACTIVE:
+            raise CommandError(
+                f'Organization {organization_id} is already {status}.')
+
+        if source == target:
+            raise CommandError(
+                f'Organization {organization_id} is already on {target}.')
+
+        if not Organization._base_manager.using(source).filter(pk=organization_id).exists():
+            raise CommandError(f'Organization {organization_id} does not exist.')
+
+        models = sharding.sharded_models()
+        started = timezone.now()
+
+        sharding.set_directory_entry(
+            organization_id, source, OrganizationShard.STATUS_MOVING)
+
+        try:
+            for model in models:
+                copied = sharding.copy_rows(
+                    model, organization_id, source, target, batch_size=batch_size)
+                self.stdout.write(f'Copied {copied} {model._meta.label} rows.')
+
+            sharding.set_directory_entry(
+                organization_id, source, OrganizationShard.STATUS_LOCKED)
+            locked = time.monotonic()
+            self.wait_for_directory()
+
+            for model in models:
+                copied = sharding.copy_rows(
+                    model, organization_id, source, target,
+                    since=started, batch_size=batch_size)
+                self.stdout.write(
+                    f'Copied {copied} {model._meta.label} rows written during the copy.')
+
+            for model in reversed(models):
+                deleted = self.stale_pks(model, organization_id, source, target)
+                sharding.delete_rows(model, deleted, target, batch_size)
+        except BaseException:
+            sharding.set_directory_entry(
+                organization_id, source, OrganizationShard.STATUS_ACTIVE)
+            raise
+
+        sharding.set_directory_entry(
+            organization_id, target, OrganizationShard.STATUS_ACTIVE)
+        self.stdout.write(
+            f'Moved organization {organization_id} from {source} to {target}, '
+            f'writes were locked for {time.monotonic() - locked:.2f}s.')
+
+        if options['keep_source']:
+            return
+
+        # Processes that haven't seen the flip yet still read from the source.
+        self.wait_for_directory()
+
+        for model in reversed(models):
+            pks = list(sharding.organization_rows(
+                model, organization_id, source).values_list('pk', flat=True))
+            sharding.delete_rows(model, pks, source, batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted organization {organization_id} from {source}.'))
+
+    def wait_for_directory(self):
+        time.sleep(settings.SHARD_DIRECTORY_TIMEOUT)
+
+    def stale_pks(self, model, organization_id, source, target):
+        """
+        Rows copied to the target that were deleted from the source since.
+        """
+        def pks(alias):
+            return set(sharding.organization_rows(
+                model, organization_id, alias).values_list('pk', flat=True))
+
+        return pks(target) - pks(source)
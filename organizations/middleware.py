@@ -0,0 +1,130 @@
+"""
+Middleware resolving the organization of requests and binding them to its
+shard.
+"""
+
+import json
+
+from django.apps import apps
+from django.http import JsonResponse
+
+from organizations import sharding
+from organizations.tenants import resolve_organization
+from organizations.models import OrganizationShard
+
+# Fields of the query string or of the body naming the object a request is
+# about, when the URL doesn't.
+LOOKUP_FIELDS = (
+    ('organization', 'organizations.organization'),
+    ('project_id', 'projects.projects'),
+    ('project', 'projects.projects'),
+    ('column_id', 'tasks.columns'),
+    ('column', 'tasks.columns'),
+)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def request_fields(request):
+    """
+    Query string and body fields of a request, without parsing the body
+    for DRF: JSON bodies are decoded from ``request.body``, which stays
+    readable for the view.
+    """
+    fields = request.GET.dict()
+
+    if request.method in SAFE_METHODS:
+        return fields
+
+    if request.content_type == 'application/json':
+        try:
+            body = json.loads(request.body or b'{}')
+        except ValueError:
+            body = None
+
+        if isinstance(body, dict):
+            fields.update(body)
+    elif request.content_type in ('multipart/form-data',
+                                  'application/x-www-form-urlencoded'):
+        fields.update(request.POST.dict())
+
+    return fields
+
+
+class TenantMiddleware:
+    """
+    Sets ``request.organization`` to the organization named by the Host of
+    the request, or None.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.organization = resolve_organization(request.get_host())
+        return self.get_response(request)
+
+
+class ShardMiddleware:
+    """
+    Binds every request to the shard of the organization it is about,
+    resolved from the ``organization_pk`` URL kwarg, the ``pk`` kwarg of
+    views declaring a ``shard_model``, the ids in ``LOOKUP_FIELDS``, or
+    else the organization of the Host.
+
+    Writes to an organization are refused with 503 while it is locked for
+    the final step of a move to another shard.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = sharding.set_current_shard(None)
+
+        try:
+            return self.get_response(request)
+        finally:
+            sharding.reset_current_shard(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not sharding.is_multi_shard():
+            return None
+
+        organization_id = self.get_organization_id(request, view_func, view_kwargs)
+
+        if organization_id is None:
+            return None
+
+        alias, status = sharding.get_directory_entry(organization_id)
+
+        if status == OrganizationShard.STATUS_LOCKED and request.method not in SAFE_METHODS:
+            response = JsonResponse(
+                {'error': 'The organization is being moved, retry shortly.'},
+                status=503)
+            response['Retry-After'] = '5'
+            return response
+
+        sharding.set_current_shard(alias)
+        return None
+
+    def get_organization_id(self, request, view_func, view_kwargs):
+        if view_kwargs.get('organization_pk') is not None:
+            return int(view_kwargs['organization_pk'])
+
+        shard_model = getattr(getattr(view_func, 'view_class', None), 'shard_model', None)
+
+        if shard_model is not None and view_kwargs.get('pk') is not None:
+            return sharding.get_organization_id(shard_model, view_kwargs['pk'])
+
+        fields = request_fields(request)
+
+        for name, label in LOOKUP_FIELDS:
+            value = fields.get(name)
+
+            if isinstance(value, int) or (isinstance(value, str) and value.isdigit()):
+                return sharding.get_organization_id(apps.get_model(label), value)
+
+        organization = getattr(request, 'organization', None)
+
+        return organization.id if organization is not None else None
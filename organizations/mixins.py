@@ -3,20 +3,38 @@ from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.response import Response
 
+from core.metrics import permission_checks
+from core.tracing import traced
 from organizations.models import Organization, Membership
 
 
 class OrganizationPermissionMixin:
+    def get_organization(self, organization_id):
+        """
+        Organization with ``organization_id``, taken from the request when
+        its Host already resolved to it.
+        """
+        organization = getattr(self.request, 'organization', None)
+
+        if organization is not None and str(organization.id) == str(organization_id):
+            return organization
+
+        return get_object_or_404(Organization, pk=organization_id)
+
+    @traced
+    @permission_checks.time(check='organization_owner')
     def check_permissions_owner(self, organization_id, user):
-        organization = get_object_or_404(Organization, pk=organization_id)
+        organization = self.get_organization(organization_id)
 
         if not self.is_organization_owner(organization, user):
             return Response({"message": "You don't have a permission to do this action"}, status=status.HTTP_403_FORBIDDEN)
 
         return None
 
+    @traced
+    @permission_checks.time(check='organization_member')
     def check_permissions_member(self, organization_id, user):
-        organization = get_object_or_404(Organization, pk=organization_id)
+        organization = self.get_organization(organization_id)
 
         if not self.is_organization_member(organization, user):
             return Response({"message": "You are not a member of this organization"}, status=status.HTTP_403_FORBIDDEN)
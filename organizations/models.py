@@ -1,11 +1,21 @@
 from django.db import models
 from django.contrib.auth import get_user_model
-from core.models import BaseModel
+from core.models import SoftDeleteModel
+from core.querycache import CachedQuerySet
 
 
-class Organization(BaseModel):
+class Organization(SoftDeleteModel):
     name = models.CharField(max_length=255)
-    domain = models.CharField(max_length=255, unique=True, db_index=True)
+    domain = models.CharField(max_length=255, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['domain'],
+                condition=models.Q(deleted_at__isnull=True),
+                name='unique_live_organization_domain',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -22,16 +32,47 @@ class Membership(models.Model):
         (ROLE_MEMBER, 'Member'),
     ]
 
+    # Users stay on the default database when this table is on a shard.
     user = models.ForeignKey(
-        get_user_model(), on_delete=models.CASCADE, related_name='organizations')
+        get_user_model(), on_delete=models.CASCADE, related_name='organizations',
+        db_constraint=False)
     organization = models.ForeignKey(
         Organization, on_delete=models.CASCADE, related_name='members')
     date_joined = models.DateTimeField(auto_now_add=True)
     role = models.CharField(
         max_length=255, choices=ROLE_CHOICES, default=ROLE_MEMBER)
 
+    objects = CachedQuerySet.as_manager()
+
     class Meta:
         unique_together = ('user', 'organization')
 
     def __str__(self):
         return f"{self.user} in {self.organization}"
+
+
+class OrganizationShard(models.Model):
+    """
+    Directory entry recording the database alias holding the data of an
+    organization. Lives on the default database, see
+    ``organizations.sharding``.
+    """
+    STATUS_ACTIVE = 'active'
+    STATUS_MOVING = 'moving'
+    STATUS_LOCKED = 'locked'
+
+    STATUS_CHOICES = [
+        (STATUS_ACTIVE, 'Active'),
+        (STATUS_MOVING, 'Moving'),
+        (STATUS_LOCKED, 'Locked'),
+    ]
+
+    # Not a foreign key: the organization may live on another database.
+    organization_id = models.BigIntegerField(primary_key=True)
+    alias = models.CharField(max_length=100, db_index=True)
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Organization {self.organization_id} on {self.alias}"
@@ -5,6 +5,7 @@ Serializers for the organizations app.
 from rest_framework import serializers
 
 from organizations.models import Organization, Membership
+from organizations import sharding
 
 
 class OrganizationSerializer(serializers.ModelSerializer):
@@ -14,6 +15,24 @@ class OrganizationSerializer(serializers.ModelSerializer):
         model = Organization
         fields = ('id', 'name', 'domain')
 
+    def validate_domain(self, value):
+        """
+        The unique constraint only covers one shard, check the others too.
+        """
+        if not sharding.is_multi_shard():
+            return value
+
+        queryset = Organization.objects.filter(domain=value)
+
+        if self.instance is not None:
+            queryset = queryset.exclude(pk=self.instance.pk)
+
+        if sharding.exists_on_any_shard(queryset):
+            raise serializers.ValidationError(
+                'organization with this domain already exists.')
+
+        return value
+
 
 class MembersSerializer(serializers.ModelSerializer):
     """Serializer for organization members"""
@@ -0,0 +1,437 @@
+"""
+Organization-level sharding.
+
+The data of an organization (its memberships, projects, columns, tasks and
+everything else in ``settings.SHARDED_APPS``) lives on one alias of
+``settings.SHARD_DATABASES``. Which one is recorded by ``OrganizationShard``
+in the directory, on the default database with the users and every other
+global table. Organizations without a directory entry live on the default
+database.
+
+Requests are bound to a shard by ``ShardMiddleware`` and code outside of
+requests binds one with ``shard_context()``. ``ShardRouter`` then sends the
+queries of sharded models to the bound shard. With a single shard none of
+this does any work.
+"""
+
+import graphlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import chain
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count
+
+# Models of SHARDED_APPS that stay on the default database.
+GLOBAL_MODELS = {'organizations.organizationshard'}
+
+# Size of the id range of each shard: the n-th shard allocates its ids from
+# n * ID_RANGE_SIZE, so rows keep their pk when they move between shards.
+ID_RANGE_SIZE = 2 ** 40
+
+_current_shard = ContextVar('current_shard', default=None)
+
+
+def is_multi_shard():
+    return len(settings.SHARD_DATABASES) > 1
+
+
+def is_sharded(model):
+    return (
+        model._meta.app_label in settings.SHARDED_APPS
+        and model._meta.label_lower not in GLOBAL_MODELS
+    )
+
+
+def get_current_shard():
+    return _current_shard.get()
+
+
+def set_current_shard(alias):
+    """
+    Bind the current context to ``alias``. Returns a token for
+    ``reset_current_shard``.
+    """
+    return _current_shard.set(alias)
+
+
+def reset_current_shard(token):
+    _current_shard.reset(token)
+
+
+@contextmanager
+def shard_context(alias):
+    """
+    Send the queries of sharded models to ``alias`` while active.
+    """
+    token = _current_shard.set(alias)
+
+    try:
+        yield alias
+    finally:
+        _current_shard.reset(token)
+
+
+def directory_key(organization_id):
+    return f'shard:directory:{organization_id}'
+
+
+def get_directory_entry(organization_id):
+    """
+    ``(alias, status)`` of an organization, from the cache or the directory.
+    """
+    from organizations.models import OrganizationShard
+
+    key = directory_key(organization_id)
+    entry = cache.get(key)
+
+    if entry is None:
+        entry = OrganizationShard.objects.using(DEFAULT_DB_ALIAS).filter(
+            organization_id=organization_id).values_list('alias', 'status').first()
+        entry = entry or (DEFAULT_DB_ALIAS, OrganizationShard.STATUS_ACTIVE)
+        cache.set(key, entry, settings.SHARD_DIRECTORY_TIMEOUT)
+
+    return entry
+
+
+def get_shard(organization_id):
+    if not is_multi_shard():
+        return DEFAULT_DB_ALIAS
+
+    return get_directory_entry(organization_id)[0]
+
+
+def set_directory_entry(organization_id, alias, status):
+    from organizations.models import OrganizationShard
+
+    OrganizationShard.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        organization_id=organization_id,
+        defaults={'alias': alias, 'status': status},
+    )
+    cache.delete(directory_key(organization_id))
+
+
+def choose_shard():
+    """
+    Shard for a new organization: the one holding the fewest.
+    """
+    from organizations.models import OrganizationShard
+
+    if not is_multi_shard():
+        return DEFAULT_DB_ALIAS
+
+    counts = dict(
+        OrganizationShard.objects.using(DEFAULT_DB_ALIAS)
+        .values_list('alias')
+        .annotate(count=Count('organization_id'))
+    )
+
+    return min(settings.SHARD_DATABASES, key=lambda alias: counts.get(alias, 0))
+
+
+def organization_path(model):
+    """
+    Lookup from ``model`` to the id of the organization owning its rows,
+    following foreign keys between sharded models.
+    """
+    organization = apps.get_model('organizations', 'Organization')
+
+    if model is organization:
+        return 'pk'
+
+    paths = [(model, [])]
+    seen = {model}
+
+    while paths:
+        current, path = paths.pop(0)
+
+        for field in current._meta.concrete_fields:
+            related = field.related_model
+
+            if related is None or not (field.many_to_one or field.one_to_one):
+                continue
+
+            if related is organization:
+                return '__'.join([*path, field.attname])
+
+            if related not in seen and is_sharded(related):
+                seen.add(related)
+                paths.append((related, [*path, field.name]))
+
+    raise LookupError(f'{model._meta.label} has no path to an organization.')
+
+
+def sharded_models():
+    """
+    Sharded models in an order where every model comes after the models it
+    references.
+    """
+    sorter = graphlib.TopologicalSorter()
+
+    for model in apps.get_models():
+        if not is_sharded(model):
+            continue
+
+        sorter.add(model, *(
+            field.related_model
+            for field in model._meta.concrete_fields
+            if field.is_relation
+            and field.related_model is not model
+            and is_sharded(field.related_model)
+        ))
+
+    return list(sorter.static_order())
+
+
+def locate_key(model, pk):
+    return f'shard:locate:{model._meta.label_lower}:{pk}'
+
+
+def get_organization_id(model, pk):
+    """
+    Id of the organization owning the row ``pk`` of a sharded model,
+    looked up on every shard on the first call.
+
+    Rows never change organization, so the answer is cached for good and
+    stays right when the organization moves to another shard.
+    """
+    if model is apps.get_model('organizations', 'Organization'):
+        return int(pk)
+
+    key = locate_key(model, pk)
+    organization_id = cache.get(key)
+
+    if organization_id is None:
+        path = organization_path(model)
+
+        for alias in settings.SHARD_DATABASES:
+            organization_id = model._base_manager.using(alias).filter(
+                pk=pk).values_list(path, flat=True).first()
+
+            if organization_id is not None:
+                cache.set(key, organization_id, None)
+                break
+
+    return organization_id
+
+
+def fan_out(queryset):
+    """
+    Results of ``queryset`` on every shard, for the few queries that aren't
+    scoped to one organization.
+    """
+    if not is_multi_shard():
+        return queryset
+
+    return sorted(
+        chain.from_iterable(
+            queryset.using(alias) for alias in settings.SHARD_DATABASES),
+        key=lambda instance: instance.pk,
+    )
+
+
+def select_global_related(queryset, *fields):
+    """
+    ``select_related()`` for relations to global models such as users.
+    Shards don't have the global tables to join with, so when there are
+    several the related rows are prefetched from the default database.
+    """
+    if is_multi_shard():
+        return queryset.prefetch_related(*fields)
+
+    return queryset.select_related(*fields)
+
+
+def exists_on_any_shard(queryset):
+    if not is_multi_shard():
+        return queryset.exists()
+
+    return any(queryset.using(alias).exists()
+               for alias in settings.SHARD_DATABASES)
+
+
+def reserve_id_ranges(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    ``post_migrate`` receiver moving the id sequences of the sharded tables
+    of a shard to the start of its id range.
+    """
+    shards = settings.SHARD_DATABASES
+
+    if using not in shards or shards.index(using) == 0:
+        return
+
+    connection = connections[using]
+
+    if connection.vendor != 'sqlite':
+        return
+
+    start = shards.index(using) * ID_RANGE_SIZE
+
+    with connection.cursor() as cursor:
+        for model in sender.get_models():
+            if not is_sharded(model):
+                continue
+
+            table = model._meta.db_table
+            cursor.execute(
+                'UPDATE sqlite_sequence SET seq = MAX(seq, %s) WHERE name = %s',
+                [start, table])
+
+            if not cursor.rowcount:
+                cursor.execute(
+                    'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                    [table, start])
+
+
+class ShardRouter:
+    """
+    Sends sharded models to the shard bound to the current context, or to
+    the shard of the instance they are read through.
+
+    Goes before ``PrimaryReplicaRouter``, and leaves the default shard to
+    it so its reads can still go to the replicas.
+    """
+
+    def db_for_read(self, model, **hints):
+        return self.route(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        return self.route(model, hints.get('instance'))
+
+    def route(self, model, instance):
+        if not is_multi_shard():
+            return None
+
+        instance_db = instance._state.db if instance is not None else None
+
+        if not is_sharded(model):
+            # Users and other global rows read through a sharded row.
+            if instance_db is not None and instance_db != DEFAULT_DB_ALIAS \
+                    and instance_db in settings.SHARD_DATABASES:
+                return DEFAULT_DB_ALIAS
+
+            return None
+
+        if instance_db is not None and is_sharded(type(instance)):
+            alias = instance_db
+        else:
+            alias = get_current_shard()
+
+        return alias if alias != DEFAULT_DB_ALIAS else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not is_multi_shard():
+            return None
+
+        # Sharded rows reference global ones across databases.
+        if is_sharded(type(obj1)) != is_sharded(type(obj2)):
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS or db not in settings.SHARD_DATABASES:
+            return None
+
+        if app_label not in settings.SHARDED_APPS:
+            return False
+
+        if model_name is not None:
+            return f'{app_label}.{model_name}' not in GLOBAL_MODELS
+
+        return None
+
+
+def organization_rows(model, organization_id, alias):
+    return model._base_manager.using(alias).filter(
+        **{organization_path(model): organization_id})
+
+
+def upsert_rows(model, rows, alias):
+    """
+    Insert the ``rows`` (tuples of every concrete field, pk first) into
+    ``alias``, overwriting the rows that already exist.
+
+    Plain SQL rather than ``bulk_create()``, which would reset the
+    ``auto_now`` timestamps of the copies.
+    """
+    if not rows:
+        return
+
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+    fields = [model._meta.pk, *(
+        field for field in model._meta.concrete_fields if not field.primary_key)]
+    columns = [quote(field.column) for field in fields]
+    sql = (
+        f'INSERT INTO {quote(model._meta.db_table)} ({", ".join(columns)}) '
+        f'VALUES ({", ".join(["%s"] * len(columns))}) '
+        f'ON CONFLICT ({columns[0]}) DO UPDATE SET '
+        + ', '.join(f'{column} = excluded.{column}' for column in columns[1:])
+    )
+    params = [
+        [field.get_db_prep_save(value, connection)
+         for field, value in zip(fields, row)]
+        for row in rows
+    ]
+
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def copy_rows(model, organization_id, source, target, since=None, batch_size=500):
+    """
+    Copy the rows of an organization from ``source`` to ``target`` in
+    batches, only those updated after ``since`` when given and ``model``
+    has an ``updated_at``. Returns the number of rows copied.
+    """
+    queryset = organization_rows(model, organization_id, source)
+
+    if since is not None and any(
+            field.name == 'updated_at' for field in model._meta.concrete_fields):
+        queryset = queryset.filter(updated_at__gte=since)
+
+    names = [model._meta.pk.name, *(
+        field.name for field in model._meta.concrete_fields if not field.primary_key)]
+    copied = 0
+    last_pk = None
+
+    while True:
+        batch = queryset.order_by('pk')
+
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+
+        rows = list(batch.values_list(*names)[:batch_size])
+
+        if not rows:
+            return copied
+
+        with transaction.atomic(using=target):
+            upsert_rows(model, rows, target)
+
+        copied += len(rows)
+        last_pk = rows[-1][0]
+
+
+def delete_rows(model, pks, alias, batch_size=500):
+    """
+    Delete rows by pk in batches, without cascading: callers delete the
+    rows referencing them first.
+    """
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+    pks = sorted(pks)
+
+    for start in range(0, len(pks), batch_size):
+        batch = pks[start:start + batch_size]
+
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {quote(model._meta.db_table)} '
+                f'WHERE {quote(model._meta.pk.column)} IN '
+                f'({", ".join(["%s"] * len(batch))})',
+                batch)
@@ -0,0 +1,15 @@
+"""
+Signal handlers for the organizations app.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from organizations.models import Organization
+from organizations.tenants import invalidate_domain_map
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def invalidate_organization_domains(sender, instance, **kwargs):
+    invalidate_domain_map()
@@ -0,0 +1,130 @@
+"""
+Resolution of the organization of a request from its Host.
+
+A request is for an organization when its host is the organization's
+``domain`` (``acme.com``), or that domain under ``settings.TENANT_BASE_DOMAIN``
+(``acme.orchestrate.local`` for the domain ``acme``).
+
+Every process keeps a map of all the domains in memory. It is loaded on
+first use and reloaded after an organization was saved or deleted, which
+bumps a version kept in the cache, and at the latest
+``settings.TENANT_DOMAIN_MAP_TIMEOUT`` seconds after it was loaded: the
+version only reaches the processes sharing the cache, and a process-local
+cache is only seen by the process that made the change. In between,
+resolving a host doesn't touch the database.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from organizations import sharding
+from organizations.models import Organization
+
+VERSION_KEY = 'organizations:domain-map:version'
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+
+    if version is None:
+        version = time.time_ns()
+
+        if not cache.add(VERSION_KEY, version, timeout=None):
+            version = cache.get(VERSION_KEY, version)
+
+    return version
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+class DomainMap:
+    def __init__(self):
+        self._organizations = None
+        self._version = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def get(self, domain):
+        """
+        Field values of the organization with ``domain``, or None.
+        """
+        version = get_version()
+
+        if self.is_stale(version):
+            with self._lock:
+                if self.is_stale(version):
+                    self._organizations = self.load()
+                    self._version = version
+                    self._loaded_at = time.monotonic()
+
+        return self._organizations.get(domain)
+
+    def is_stale(self, version):
+        return (
+            self._organizations is None
+            or self._version != version
+            or time.monotonic() - self._loaded_at >= settings.TENANT_DOMAIN_MAP_TIMEOUT
+        )
+
+    def load(self):
+        fields = [field.attname for field in Organization._meta.concrete_fields]
+        organizations = {}
+
+        for alias in settings.SHARD_DATABASES:
+            for values in Organization.objects.using(alias).values_list(*fields):
+                organization = dict(zip(fields, values))
+                organizations[organization['domain'].lower()] = organization
+
+        return organizations
+
+    def clear(self):
+        with self._lock:
+            self._organizations = None
+
+
+domain_map = DomainMap()
+
+
+def invalidate_domain_map():
+    """
+    Reload the domain map of every process, now and once the surrounding
+    transaction commits.
+    """
+    domain_map.clear()
+    bump_version()
+    transaction.on_commit(bump_version)
+
+
+def get_domain(host):
+    """
+    Organization domain named by a host, without its port.
+    """
+    domain = host.rsplit(':', 1)[0].lower().rstrip('.')
+    base = settings.TENANT_BASE_DOMAIN
+
+    if base and domain.endswith(f'.{base}'):
+        domain = domain[:-len(base) - 1]
+
+    return domain
+
+
+def resolve_organization(host):
+    """
+    Organization of the request for ``host``, built from the domain map.
+    """
+    values = domain_map.get(get_domain(host))
+
+    if values is None:
+        return None
+
+    return Organization.from_db(
+        sharding.get_shard(values['id']), list(values), list(values.values()))
@@ -2,14 +2,24 @@
 Test cases for the organizations app.
 """
 
-from django.test import TestCase
+import multiprocessing
+
+from django.core.cache import cache
+from django.db import connection, router
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
-from organizations.models import Organization, Membership
+from organizations import sharding
+from organizations.models import Organization, Membership, OrganizationShard
 from organizations.serializers import OrganizationSerializer
+from organizations.tenants import invalidate_domain_map, resolve_organization
+from projects.models import Projects
+from tasks.models import ColumnTaskCount, Columns, Tasks
+from users.models import User
 from users.tests import create_user
 
 LIST_CREATE_ORGANIZATION_URL = reverse('organizations:list_create')
@@ -388,3 +398,153 @@ class PrivateOrganizationApiTests(TestCase):
         res = new_client.delete(REMOVE_MEMBER_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ShardingTests(TestCase):
+    def setUp(self):
+        self.user = create_user(
+            email='test@example.com',
+            first_name='John',
+            last_name='Doe',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        cache.clear()
+
+    def test_organization_path(self):
+        self.assertEqual(sharding.organization_path(Organization), 'pk')
+        self.assertEqual(sharding.organization_path(Membership), 'organization_id')
+        self.assertEqual(sharding.organization_path(Tasks), 'project__organization_id')
+        self.assertEqual(
+            sharding.organization_path(ColumnTaskCount), 'project__organization_id')
+
+    def test_sharded_models_come_after_their_references(self):
+        models = sharding.sharded_models()
+
+        self.assertNotIn(User, models)
+        self.assertNotIn(OrganizationShard, models)
+        self.assertLess(models.index(Organization), models.index(Projects))
+        self.assertLess(models.index(Projects), models.index(Columns))
+        self.assertLess(models.index(Columns), models.index(Tasks))
+        self.assertLess(models.index(Columns), models.index(ColumnTaskCount))
+
+    @override_settings(SHARD_DATABASES=['default', 'shard1'])
+    def test_router_sends_sharded_models_to_the_bound_shard(self):
+        self.assertEqual(router.db_for_read(Tasks), 'default')
+
+        with sharding.shard_context('shard1'):
+            self.assertEqual(router.db_for_read(Tasks), 'shard1')
+            self.assertEqual(router.db_for_write(Organization), 'shard1')
+            self.assertEqual(router.db_for_read(OrganizationShard), 'default')
+            self.assertEqual(router.db_for_read(User), 'default')
+
+        task = Tasks()
+        task._state.db = 'shard1'
+
+        self.assertEqual(router.db_for_read(Columns, instance=task), 'shard1')
+        self.assertEqual(router.db_for_read(User, instance=task), 'default')
+        self.assertTrue(router.allow_relation(task, self.user))
+
+    @override_settings(SHARD_DATABASES=['default', 'shard1'])
+    def test_global_tables_are_not_migrated_on_shards(self):
+        self.assertTrue(router.allow_migrate_model('shard1', Tasks))
+        self.assertFalse(router.allow_migrate_model('shard1', User))
+        self.assertFalse(router.allow_migrate_model('shard1', OrganizationShard))
+        self.assertTrue(router.allow_migrate_model('default', User))
+
+    def test_create_organization_records_its_shard(self):
+        res = self.client.post(LIST_CREATE_ORGANIZATION_URL, {
+            'name': 'Test Organization',
+            'domain': 'test.com'
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sharding.get_directory_entry(res.data['id']),
+            ('default', OrganizationShard.STATUS_ACTIVE))
+
+    def test_locked_organization_refuses_writes(self):
+        organization = create_organization(name='Test Organization', domain='test.com')
+        create_membership(
+            user=self.user, organization=organization, role=Membership.ROLE_OWNER)
+        sharding.set_directory_entry(
+            organization.id, 'default', OrganizationShard.STATUS_LOCKED)
+        # Load the domain map while 'default' is the only database to read.
+        resolve_organization('test.com')
+
+        with self.settings(SHARD_DATABASES=['default', 'shard1']):
+            res = self.client.post(
+                reverse('organizations:add_member', kwargs={'pk': organization.id}),
+                {'user': self.user.id})
+
+            self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+            res = self.client.get(
+                reverse('organizations:detail', kwargs={'pk': organization.id}))
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+@override_settings(ALLOWED_HOSTS=['.orchestrate.local', 'acme.com'])
+class TenantResolutionTests(TestCase):
+    def setUp(self):
+        self.user = create_user(
+            email='test@example.com',
+            first_name='John',
+            last_name='Doe',
+            password='testpass123'
+        )
+        self.organization = create_organization(name='Acme', domain='acme.com')
+        create_membership(
+            user=self.user,
+            organization=self.organization,
+            role=Membership.ROLE_OWNER
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        cache.clear()
+
+    def test_resolve_organization_from_host(self):
+        for host in ('acme.com', 'ACME.com:8000', 'acme.com.orchestrate.local'):
+            self.assertEqual(resolve_organization(host), self.organization)
+
+        self.assertIsNone(resolve_organization('other.orchestrate.local'))
+
+    def test_domain_map_follows_organization_changes(self):
+        resolve_organization('acme.com')
+
+        self.organization.domain = 'acme.io'
+        self.organization.save()
+
+        self.assertIsNone(resolve_organization('acme.com'))
+        self.assertEqual(resolve_organization('acme.io'), self.organization)
+
+    def test_domain_map_follows_changes_of_other_processes(self):
+        resolve_organization('acme.com')
+
+        # Renamed by another process, without the invalidation of this one,
+        # which bumps the version in a cache of its own.
+        Organization.objects.filter(pk=self.organization.pk).update(domain='acme.io')
+        child = multiprocessing.get_context('fork').Process(target=invalidate_domain_map)
+        child.start()
+        child.join()
+
+        self.assertEqual(child.exitcode, 0)
+        self.assertEqual(resolve_organization('acme.com'), self.organization)
+
+        with self.settings(TENANT_DOMAIN_MAP_TIMEOUT=0):
+            self.assertIsNone(resolve_organization('acme.com'))
+            self.assertEqual(resolve_organization('acme.io'), self.organization)
+
+    def test_org_scoped_views_use_the_resolved_organization(self):
+        url = reverse('organizations:detail', kwargs={'pk': self.organization.id})
+        self.client.get(url, HTTP_HOST='acme.com')
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, HTTP_HOST='acme.com')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['domain'], 'acme.com')
+        self.assertFalse(any(
+            'FROM "organizations_organization"' in query['sql']
+            for query in queries.captured_queries))
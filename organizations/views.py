@@ -8,9 +8,11 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
+from core.profiling import serializer_data
 from organizations.serializers import MembersSerializer, MembershipSerializer, OrganizationSerializer
-from organizations.models import Organization, Membership
+from organizations.models import Organization, Membership, OrganizationShard
 from organizations.mixins import OrganizationPermissionMixin
+from organizations import sharding
 
 
 class OrganizationListCreateView(generics.ListCreateAPIView):
@@ -19,19 +21,27 @@ class OrganizationListCreateView(generics.ListCreateAPIView):
     """
 
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 1, 'POST': 9}
     serializer_class = OrganizationSerializer
 
     def get_queryset(self):
-        return Organization.objects.filter(members__user=self.request.user)
+        return sharding.fan_out(
+            Organization.objects.filter(members__user=self.request.user))
 
     def perform_create(self, serializer):
-        organization = serializer.save()
+        alias = sharding.choose_shard()
 
-        Membership.objects.create(
-            organization=organization,
-            user=self.request.user,
-            role=Membership.ROLE_OWNER
-        )
+        with sharding.shard_context(alias):
+            organization = serializer.save()
+
+            Membership.objects.create(
+                organization=organization,
+                user=self.request.user,
+                role=Membership.ROLE_OWNER
+            )
+
+        sharding.set_directory_entry(
+            organization.id, alias, OrganizationShard.STATUS_ACTIVE)
 
 
 class OrganizationRetrieveUpdateView(generics.RetrieveUpdateAPIView, OrganizationPermissionMixin):
@@ -40,11 +50,13 @@ class OrganizationRetrieveUpdateView(generics.RetrieveUpdateAPIView, Organizatio
     """
 
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 3, 'PATCH': 6, 'PUT': 6}
     serializer_class = OrganizationSerializer
+    shard_model = Organization
 
     def get_object(self):
         pk = self.kwargs['pk']
-        return get_object_or_404(Organization, id=pk)
+        return self.get_organization(pk)
 
     def retrieve(self, request, *args, **kwargs):
         organization = self.get_object()
@@ -56,7 +68,7 @@ class OrganizationRetrieveUpdateView(generics.RetrieveUpdateAPIView, Organizatio
             return permission_error
 
         serializer = self.get_serializer(organization)
-        return Response(serializer.data)
+        return Response(serializer_data(serializer))
 
     def patch(self, request, *args, **kwargs):
         organization = self.get_object()
@@ -72,10 +84,12 @@ class OrganizationRetrieveUpdateView(generics.RetrieveUpdateAPIView, Organizatio
 
 class MembersListView(generics.ListAPIView, OrganizationPermissionMixin):
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 4}
     serializer_class = MembersSerializer
+    shard_model = Organization
 
     def list(self, request, *args, **kwargs):
-        organization = get_object_or_404(Organization, id=kwargs['pk'])
+        organization = self.get_organization(kwargs['pk'])
 
         permission_error = self.check_permissions_member(
             organization.id, request.user)
@@ -83,24 +97,27 @@ class MembersListView(generics.ListAPIView, OrganizationPermissionMixin):
         if permission_error:
             return permission_error
 
-        queryset = Membership.objects.filter(organization=organization)
+        queryset = sharding.select_global_related(
+            Membership.objects.filter(organization=organization), 'user')
 
         page = self.paginate_queryset(queryset)
 
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(serializer_data(serializer))
 
         serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(serializer_data(serializer))
 
 
 class AddMemberView(generics.CreateAPIView, OrganizationPermissionMixin):
     permission_classes = [IsAuthenticated]
+    query_budget = {'POST': 7}
     serializer_class = MembershipSerializer
+    shard_model = Organization
 
     def create(self, request, *args, **kwargs):
-        organization = get_object_or_404(Organization, id=kwargs['pk'])
+        organization = self.get_organization(kwargs['pk'])
 
         permission_error = self.check_permissions_owner(
             organization.id, request.user)
@@ -117,13 +134,15 @@ class AddMemberView(generics.CreateAPIView, OrganizationPermissionMixin):
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
+        headers = self.get_success_headers(serializer_data(serializer))
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
 class RemoveMemberView(generics.DestroyAPIView, OrganizationPermissionMixin):
     permission_classes = [IsAuthenticated]
+    query_budget = {'DELETE': 6}
     serializer_class = MembershipSerializer
+    shard_model = Organization
 
     def delete(self, request, *args, **kwargs):
         user = request.data.get('user', None)
@@ -134,7 +153,7 @@ class RemoveMemberView(generics.DestroyAPIView, OrganizationPermissionMixin):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        organization = get_object_or_404(Organization, id=kwargs['pk'])
+        organization = self.get_organization(kwargs['pk'])
 
         permission_error = self.check_permissions_owner(
             organization.id, request.user)
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 08:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_drop_user_constraint_for_sharding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projects',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
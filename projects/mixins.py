@@ -1,12 +1,19 @@
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 
 from rest_framework import status
 from rest_framework.response import Response
 
+from core.cache import response_cache_key, single_flight
+from core.db.routers import reads_use_primary
+from core.metrics import permission_checks
+from core.tracing import traced
 from projects.models import Projects, ProjectMembership
 
 
 class ProjectPermissionMixin:
+    @traced
+    @permission_checks.time(check='project_manager')
     def check_permissions_manager(self, project_id, user):
         project = get_object_or_404(Projects, pk=project_id)
 
@@ -15,6 +22,8 @@ class ProjectPermissionMixin:
 
         return None
 
+    @traced
+    @permission_checks.time(check='project_member')
     def check_permissions_member(self, project_id, user):
         project = get_object_or_404(Projects, pk=project_id)
 
@@ -28,3 +37,52 @@ class ProjectPermissionMixin:
 
     def is_project_manager(self, project, user):
         return project.members.filter(user=user, role=ProjectMembership.PROJECT_MANAGER).exists()
+
+
+class ProjectResponseCacheMixin:
+    """
+    Caches the serialized body of successful responses per project.
+
+    Permission checks must run before calling ``cached_response``: the body
+    is shared by every user who is allowed to see it.
+
+    Misses are computed from the replicas like any other read, so an entry
+    can miss writes the replicas hadn't received yet. Users whose reads are
+    pinned to the primary after a write skip the cache to see their own
+    changes.
+    """
+
+    def cached_response(self, project_id, get_response):
+        if project_id is None:
+            return get_response()
+
+        if reads_use_primary():
+            response = get_response()
+            response['X-Cache'] = 'BYPASS'
+            return response
+
+        key = response_cache_key(
+            self.request.resolver_match.view_name, project_id, self.request.GET)
+        computed = []
+
+        def compute():
+            response = get_response()
+            computed.append(response)
+            return response.status_code, response.data
+
+        status_code, data = single_flight(
+            key,
+            compute,
+            settings.RESPONSE_CACHE_TIMEOUT,
+            name='response',
+            lock_timeout=settings.RESPONSE_CACHE_LOCK_TIMEOUT,
+            stale_timeout=settings.RESPONSE_CACHE_STALE_TIMEOUT,
+            cacheable=lambda value: value[0] == status.HTTP_200_OK,
+        )
+
+        if computed:
+            response = computed[0]
+            response['X-Cache'] = 'MISS'
+            return response
+
+        return Response(data, status=status_code, headers={'X-Cache': 'HIT'})
@@ -1,11 +1,12 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
-from core.models import BaseModel
+from core.models import SoftDeleteModel
+from core.querycache import CachedQuerySet
 from organizations.models import Organization
 
 
-class Projects(BaseModel):
+class Projects(SoftDeleteModel):
     name = models.CharField(max_length=255)
     description = models.TextField()
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE)
@@ -25,11 +26,15 @@ class ProjectMembership(models.Model):
 
     project = models.ForeignKey(
         Projects, on_delete=models.CASCADE, related_name='members')
+    # Users stay on the default database when this table is on a shard.
     user = models.ForeignKey(
-        get_user_model(), on_delete=models.CASCADE, related_name='projects')
+        get_user_model(), on_delete=models.CASCADE, related_name='projects',
+        db_constraint=False)
     role = models.CharField(
         max_length=10, choices=ROLE_CHOICES, default=PROJECT_MEMBER)
 
+    objects = CachedQuerySet.as_manager()
+
     class Meta:
         unique_together = ('project', 'user')
 
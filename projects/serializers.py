@@ -10,7 +10,7 @@ from projects.models import Projects, ProjectMembership
 class ProjectSerializer(serializers.ModelSerializer):
     class Meta:
         model = Projects
-        fields = '__all__'
+        exclude = ['deleted_at']
 
 
 class ProjectMembersSerializer(serializers.ModelSerializer):
@@ -0,0 +1,34 @@
+"""
+Signal handlers for the projects app.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import invalidate_project, invalidate_projects
+from projects.models import Projects, ProjectMembership
+
+
+@receiver(post_save, sender=Projects)
+@receiver(post_delete, sender=Projects)
+def invalidate_project_cache(sender, instance, **kwargs):
+    invalidate_project(instance.pk)
+
+
+@receiver(post_save, sender=ProjectMembership)
+@receiver(post_delete, sender=ProjectMembership)
+def invalidate_membership_cache(sender, instance, **kwargs):
+    invalidate_project(instance.project_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_member_projects_cache(sender, instance, created, **kwargs):
+    """
+    Member and assignee names are part of the cached project responses.
+    """
+    if created:
+        return
+
+    invalidate_projects(ProjectMembership.objects.filter(
+        user=instance).values_list('project_id', flat=True))
@@ -1,4 +1,7 @@
-from django.test import TestCase
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
 
 from rest_framework.test import APIClient
@@ -494,3 +497,26 @@ class PrivateProjectApiTests(TestCase):
         res = self.owner3.delete(REMOVE_MEMBER_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+
+class ProjectPermissionTests(TransactionTestCase):
+    def test_member_removed_by_another_process_loses_access(self):
+        user = create_user(email='test@example.com', password='testpass123')
+        organization = create_organization(name='Test Organization', domain='test.com')
+        project = create_projects(name='Test Project', organization=organization)
+        membership = create_project_membership(
+            project=project, user=user, role=ProjectMembership.PROJECT_MEMBER)
+        url = reverse('projects:members', kwargs={'pk': project.id})
+
+        client = APIClient()
+        client.force_authenticate(user)
+
+        self.assertEqual(client.get(url).status_code, status.HTTP_200_OK)
+
+        # Without the write tracking of this process, as another process
+        # would remove it.
+        with mock.patch.object(connection, 'execute_wrappers', []):
+            ProjectMembership.objects.filter(pk=membership.pk).delete()
+
+        self.assertEqual(client.get(url).status_code, status.HTTP_403_FORBIDDEN)
@@ -9,9 +9,11 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
+from core.profiling import serializer_data
 from organizations.mixins import OrganizationPermissionMixin
 from organizations.models import Membership
-from projects.mixins import ProjectPermissionMixin
+from organizations import sharding
+from projects.mixins import ProjectPermissionMixin, ProjectResponseCacheMixin
 from projects.serializers import ProjectMembersSerializer, ProjectSerializer, ProjectMembershipSerializer
 from projects.models import Projects, ProjectMembership
 
@@ -22,6 +24,7 @@ class ProjectListCreateView(generics.ListCreateAPIView):
     """
 
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 1, 'POST': 4}
     serializer_class = ProjectSerializer
 
     def list(self, request, *args, **kwargs):
@@ -31,17 +34,17 @@ class ProjectListCreateView(generics.ListCreateAPIView):
         if organization_id:
             queryset = Projects.objects.filter(organization=organization_id)
         else:
-            queryset = Projects.objects.filter(
-                members__user=request.user)
+            queryset = sharding.fan_out(Projects.objects.filter(
+                members__user=request.user))
 
         page = self.paginate_queryset(queryset)
 
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(serializer_data(serializer))
 
         serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(serializer_data(serializer))
 
     def perform_create(self, serializer):
         project = serializer.save()
@@ -81,17 +84,19 @@ class ProjectListCreateView(generics.ListCreateAPIView):
             )
 
         self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
+        headers = self.get_success_headers(serializer_data(serializer))
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
-class ProjectRetrieveUpdateView(generics.RetrieveUpdateAPIView, ProjectPermissionMixin):
+class ProjectRetrieveUpdateView(generics.RetrieveUpdateAPIView, ProjectPermissionMixin, ProjectResponseCacheMixin):
     """
     Retrieve or update a project.
     """
 
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 3, 'PATCH': 4, 'PUT': 4}
     serializer_class = ProjectSerializer
+    shard_model = Projects
 
     def get_object(self):
         pk = self.kwargs['pk']
@@ -106,8 +111,8 @@ class ProjectRetrieveUpdateView(generics.RetrieveUpdateAPIView, ProjectPermissio
         if permission_error:
             return permission_error
 
-        serializer = self.get_serializer(project)
-        return Response(serializer.data)
+        return self.cached_response(
+            project.id, lambda: Response(serializer_data(self.get_serializer(project))))
 
     def patch(self, request, *args, **kwargs):
         project = self.get_object()
@@ -123,16 +128,18 @@ class ProjectRetrieveUpdateView(generics.RetrieveUpdateAPIView, ProjectPermissio
         serializer.is_valid(raise_exception=True)
         serializer.save()
 
-        return Response(serializer.data)
+        return Response(serializer_data(serializer))
 
 
-class ProjectMembersListView(generics.ListAPIView, ProjectPermissionMixin):
+class ProjectMembersListView(generics.ListAPIView, ProjectPermissionMixin, ProjectResponseCacheMixin):
     """
     List all members of a project.
     """
 
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 5}
     serializer_class = ProjectMembersSerializer
+    shard_model = Projects
 
     def list(self, request, *args, **kwargs):
         project = get_object_or_404(Projects, id=kwargs['pk'])
@@ -143,16 +150,20 @@ class ProjectMembersListView(generics.ListAPIView, ProjectPermissionMixin):
         if permission_error:
             return permission_error
 
-        queryset = ProjectMembership.objects.filter(project=project)
+        return self.cached_response(project.id, lambda: self.list_members(project))
+
+    def list_members(self, project):
+        queryset = sharding.select_global_related(
+            ProjectMembership.objects.filter(project=project), 'user')
 
         page = self.paginate_queryset(queryset)
 
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(serializer_data(serializer))
 
         serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(serializer_data(serializer))
 
 
 class ProjectAddMemberView(generics.CreateAPIView, ProjectPermissionMixin, OrganizationPermissionMixin):
@@ -161,7 +172,9 @@ class ProjectAddMemberView(generics.CreateAPIView, ProjectPermissionMixin, Organ
     """
 
     permission_classes = [IsAuthenticated]
+    query_budget = {'POST': 9}
     serializer_class = ProjectMembershipSerializer
+    shard_model = Projects
 
     def create(self, request, *args, **kwargs):
         project = get_object_or_404(Projects, id=kwargs['pk'])
@@ -191,7 +204,7 @@ class ProjectAddMemberView(generics.CreateAPIView, ProjectPermissionMixin, Organ
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
+        headers = self.get_success_headers(serializer_data(serializer))
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
@@ -201,7 +214,9 @@ class ProjectRemoveMemberView(generics.DestroyAPIView, ProjectPermissionMixin):
     """
 
     permission_classes = [IsAuthenticated]
+    query_budget = {'DELETE': 6}
     serializer_class = ProjectMembershipSerializer
+    shard_model = Projects
 
     def delete(self, request, *args, **kwargs):
         user_id = request.data.get('user', None)
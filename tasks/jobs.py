@@ -0,0 +1,60 @@
+"""
+Background jobs of the tasks app.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from jobs.queue import job, report_progress
+from organizations.sharding import shard_context
+from tasks.models import AssigneeTaskCount, ColumnTaskCount, Tasks
+
+
+@job('tasks.reconcile_task_counters')
+def reconcile_task_counters(projects=None):
+    """
+    Recompute the task counters, of the given project ids or of all, on
+    every shard.
+    """
+    counts = {'columns': 0, 'assignees': 0}
+
+    for alias in settings.SHARD_DATABASES:
+        with shard_context(alias):
+            counts['columns'] += ColumnTaskCount.rebuild(projects, using=alias)
+            counts['assignees'] += AssigneeTaskCount.rebuild(projects, using=alias)
+
+    return counts
+
+
+@job('tasks.archive_tasks')
+def archive_tasks(days=None, columns=None, projects=None, batch_size=500,
+                  dry_run=False):
+    """
+    Archive the tasks of archivable columns not updated for ``days``, on
+    every shard. Returns the number of tasks archived, or that would be
+    with ``dry_run``.
+    """
+    if days is None:
+        days = settings.TASK_ARCHIVE_AFTER_DAYS
+
+    columns = columns or settings.TASK_ARCHIVE_COLUMNS
+    cutoff = timezone.now() - timedelta(days=days)
+    total = 0
+
+    for alias in settings.SHARD_DATABASES:
+        with shard_context(alias):
+            tasks = Tasks.objects.using(alias).filter(
+                column__name__in=columns, updated_at__lt=cutoff)
+
+            if projects:
+                tasks = tasks.filter(project__in=projects)
+
+            if dry_run:
+                total += tasks.count()
+            else:
+                total += tasks.archive(batch_size)
+                report_progress(archived=total)
+
+    return total
@@ -0,0 +1,42 @@
+"""
+Move old tasks of done columns to the task archive.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.jobs import archive_tasks
+
+
+class Command(BaseCommand):
+    help = 'Archive the tasks of archivable columns that were not updated for a while.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.TASK_ARCHIVE_AFTER_DAYS,
+            help='Archive tasks not updated for this many days.')
+        parser.add_argument(
+            '--column', action='append', dest='columns',
+            help='Name of a column whose tasks are archived. Can be repeated. '
+                 'Defaults to TASK_ARCHIVE_COLUMNS.')
+        parser.add_argument(
+            '--project', type=int, action='append', dest='projects',
+            help='Only archive the tasks of the given project id. Can be repeated.')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Tasks moved per transaction.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only count the tasks that would be archived.')
+
+    def handle(self, *args, **options):
+        total = archive_tasks(
+            days=options['days'],
+            columns=options['columns'],
+            projects=options['projects'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {total} tasks.'))
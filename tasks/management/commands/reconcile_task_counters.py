@@ -0,0 +1,23 @@
+"""
+Recompute the denormalized per-column and per-assignee task counters.
+"""
+
+from django.core.management.base import BaseCommand
+
+from tasks.jobs import reconcile_task_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute task counters from the tasks table in a single GROUP BY pass.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--project', type=int, action='append', dest='projects',
+            help='Only reconcile the given project id. Can be repeated.')
+
+    def handle(self, *args, **options):
+        counts = reconcile_task_counters(options['projects'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled {counts["columns"]} column counters and '
+            f'{counts["assignees"]} assignee counters.'))
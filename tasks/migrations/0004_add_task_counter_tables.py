@@ -0,0 +1,60 @@
+# Generated by Django 5.0.14 on 2026-10-19 07:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_task_counters(apps, schema_editor):
+    Tasks = apps.get_model('tasks', 'Tasks')
+    ColumnTaskCount = apps.get_model('tasks', 'ColumnTaskCount')
+    AssigneeTaskCount = apps.get_model('tasks', 'AssigneeTaskCount')
+    db_alias = schema_editor.connection.alias
+
+    for model, fields in (
+        (ColumnTaskCount, ('project_id', 'column_id')),
+        (AssigneeTaskCount, ('project_id', 'assignee_id')),
+    ):
+        rows = Tasks.objects.using(db_alias).order_by().values(
+            *fields).annotate(total=Count('pk'))
+        model.objects.using(db_alias).bulk_create([
+            model(count=row.pop('total'), **row) for row in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_add_project_and_project_membership_table'),
+        ('tasks', '0003_rename_task_table_to_tasks'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ColumnTaskCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0)),
+                ('column', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='task_count', to='tasks.columns')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.projects')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AssigneeTaskCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0)),
+                ('assignee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_counts', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.projects')),
+            ],
+            options={
+                'unique_together': {('project', 'assignee')},
+            },
+        ),
+        migrations.RunPython(populate_task_counters, migrations.RunPython.noop),
+    ]
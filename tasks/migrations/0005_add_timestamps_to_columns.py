@@ -0,0 +1,25 @@
+# Generated by Django 5.0.14 on 2026-10-19 08:03
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_add_task_counter_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='columns',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='columns',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.14 on 2026-10-19 08:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_add_soft_delete_to_projects'),
+        ('tasks', '0007_add_archived_task_table'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='columns',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='columns',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='columns',
+            constraint=models.UniqueConstraint(condition=models.Q(('deleted_at__isnull', True)), fields=('project', 'name'), name='unique_live_column_name'),
+        ),
+    ]
@@ -1,24 +1,255 @@
-from django.db import models
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import Count, F
 from django.contrib.auth import get_user_model
 
-from core.models import BaseModel
+from core.cache import invalidate_projects
+from core.models import BaseModel, BaseQuerySet, SoftDeleteModel
 
 from projects.models import Projects
 
 
-class Columns(models.Model):
+# Fields of a task that decide which counter rows it is counted in.
+COUNTER_STATE_FIELDS = ('project_id', 'column_id', 'assignee_id')
+
+# Maps the names accepted by ``QuerySet.update()`` to counter state fields.
+COUNTER_UPDATE_FIELDS = {
+    'project': 'project_id',
+    'project_id': 'project_id',
+    'column': 'column_id',
+    'column_id': 'column_id',
+    'assignee': 'assignee_id',
+    'assignee_id': 'assignee_id',
+}
+
+_counter_signals_suspended = ContextVar(
+    'counter_signals_suspended', default=False)
+
+
+@contextmanager
+def suspend_counter_signals():
+    """
+    Skip the per-instance counter signal handlers, used by bulk paths that
+    apply their counter changes in one aggregated pass instead.
+    """
+    token = _counter_signals_suspended.set(True)
+    try:
+        yield
+    finally:
+        _counter_signals_suspended.reset(token)
+
+
+def counter_signals_suspended():
+    return _counter_signals_suspended.get()
+
+
+def update_task_counters(changes, using=None):
+    """
+    Apply counter changes. ``changes`` maps a task counter state
+    ``(project_id, column_id, assignee_id)`` to the number of tasks that
+    entered (positive) or left (negative) that state. The counters are
+    written to the ``using`` database, the routed one by default.
+    """
+    column_deltas = Counter()
+
+    for (project_id, column_id, assignee_id), delta in changes.items():
+        column_deltas[(project_id, column_id)] += delta
+
+    ColumnTaskCount.apply_deltas(column_deltas, using=using)
+    AssigneeTaskCount.apply_deltas(assignee_deltas(changes), using=using)
+
+
+def assignee_deltas(changes):
+    deltas = Counter()
+
+    for (project_id, column_id, assignee_id), delta in changes.items():
+        deltas[(project_id, assignee_id)] += delta
+
+    return deltas
+
+
+class Columns(SoftDeleteModel):
     project = models.ForeignKey(
         Projects, on_delete=models.CASCADE, related_name='columns')
     name = models.CharField(max_length=50)
     position = models.PositiveIntegerField()
 
     class Meta:
-        unique_together = ('project', 'name')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['project', 'name'],
+                condition=models.Q(deleted_at__isnull=True),
+                name='unique_live_column_name',
+            ),
+        ]
         ordering = ['position']
 
     def __str__(self):
         return self.name
 
+    def delete(self, using=None, keep_parents=False):
+        """
+        Soft-delete the column. Its tasks stay counted per column until they
+        are purged, but leave the assignee counters now, the way they leave
+        the task list.
+        """
+        using = using or router.db_for_write(type(self), instance=self)
+
+        with transaction.atomic(using=using, savepoint=False):
+            if self.deleted_at is None:
+                changes = Counter()
+                changes.subtract(Tasks.objects.using(using).filter(
+                    column=self).counter_states())
+                AssigneeTaskCount.apply_deltas(assignee_deltas(changes), using=using)
+
+            return super().delete(using=using, keep_parents=keep_parents)
+
+    delete.alters_data = True
+
+
+class TasksQuerySet(BaseQuerySet):
+    """
+    Keeps the task counters and the response cache in sync on the bulk paths
+    that bypass model signals.
+    """
+
+    def counter_states(self):
+        rows = self.order_by().values(*COUNTER_STATE_FIELDS).annotate(
+            total=Count('pk'))
+
+        return Counter({
+            tuple(row[field] for field in COUNTER_STATE_FIELDS): row['total']
+            for row in rows
+        })
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db, savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+
+            if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+                # Conflicting rows are skipped or updated in place, so the
+                # objects don't tell which tasks are new; recount instead.
+                project_ids = {obj.project_id for obj in objs}
+                ColumnTaskCount.rebuild(project_ids, using=self.db)
+                AssigneeTaskCount.rebuild(project_ids, using=self.db)
+            else:
+                update_task_counters(
+                    Counter(obj.counter_state for obj in objs), using=self.db)
+
+        invalidate_projects(obj.project_id for obj in objs)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        counted = {COUNTER_UPDATE_FIELDS.get(field) for field in fields}
+
+        if not counted.intersection(COUNTER_STATE_FIELDS):
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+            invalidate_projects(obj.project_id for obj in objs)
+            return rows
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            changes = Counter(obj.counter_state for obj in objs)
+            changes.subtract(self.model._base_manager.using(self.db).filter(
+                pk__in=[obj.pk for obj in objs]).counter_states())
+
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+            update_task_counters(changes, using=self.db)
+
+        invalidate_projects(project_id for project_id, _, _ in changes)
+        return rows
+
+    def update(self, **kwargs):
+        changed = {
+            COUNTER_UPDATE_FIELDS[name]: value
+            for name, value in kwargs.items() if name in COUNTER_UPDATE_FIELDS
+        }
+
+        if not changed:
+            project_ids = list(self.order_by().values_list(
+                'project_id', flat=True).distinct())
+            rows = super().update(**kwargs)
+            invalidate_projects(project_ids)
+            return rows
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            if any(hasattr(value, 'resolve_expression') for value in changed.values()):
+                # The new values are only known to the database, so regroup
+                # the same rows after the update.
+                pks = list(self.values_list('pk', flat=True))
+                changes = Counter()
+                changes.subtract(self.counter_states())
+                rows = super().update(**kwargs)
+                changes.update(self.model._base_manager.using(
+                    self.db).filter(pk__in=pks).counter_states())
+            else:
+                before = self.counter_states()
+                rows = super().update(**kwargs)
+                changes = Counter()
+
+                for state, total in before.items():
+                    values = dict(zip(COUNTER_STATE_FIELDS, state))
+                    values.update({
+                        field: getattr(value, 'pk', value)
+                        for field, value in changed.items()
+                    })
+                    changes[tuple(values[field]
+                                  for field in COUNTER_STATE_FIELDS)] += total
+                    changes[state] -= total
+
+            update_task_counters(changes, using=self.db)
+
+        invalidate_projects(project_id for project_id, _, _ in changes)
+        return rows
+
+    def delete(self):
+        with transaction.atomic(using=self.db, savepoint=False):
+            changes = Counter()
+            changes.subtract(self.counter_states())
+            # Tasks of deleted columns, as purged, already left the assignee
+            # counters along with their column.
+            uncounted = self.filter(column__deleted_at__isnull=False).counter_states()
+
+            with suspend_counter_signals():
+                result = super().delete()
+
+            update_task_counters(changes, using=self.db)
+            AssigneeTaskCount.apply_deltas(assignee_deltas(uncounted), using=self.db)
+
+        invalidate_projects(project_id for project_id, _, _ in changes)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def archive(self, batch_size=500):
+        """
+        Move the tasks of this queryset to ``ArchivedTask``, ``batch_size``
+        at a time and one transaction per batch. Returns the number of
+        tasks archived.
+        """
+        fields = [field.attname for field in self.model._meta.concrete_fields]
+        archived = 0
+
+        while True:
+            with transaction.atomic(using=self.db):
+                rows = list(self.order_by('pk').values(*fields)[:batch_size])
+
+                if not rows:
+                    return archived
+
+                ArchivedTask.objects.using(self.db).bulk_create(
+                    [ArchivedTask(**row) for row in rows])
+                self.model.objects.using(self.db).filter(
+                    pk__in=[row['id'] for row in rows]).delete()
+
+            archived += len(rows)
+
+    archive.alters_data = True
+    archive.queryset_only = True
+
 
 class Tasks(BaseModel):
     title = models.CharField(max_length=255, db_index=True)
@@ -31,8 +262,199 @@ class Tasks(BaseModel):
     project = models.ForeignKey(
         Projects, on_delete=models.CASCADE, related_name='tasks')
 
+    # Users stay on the default database when this table is on a shard.
+    assignee = models.ForeignKey(
+        get_user_model(), on_delete=models.CASCADE, related_name='tasks',
+        db_constraint=False)
+
+    objects = TasksQuerySet.as_manager()
+
+    def __str__(self):
+        return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+
+        if set(COUNTER_STATE_FIELDS).issubset(field_names):
+            instance._counter_state = instance.counter_state
+
+        return instance
+
+    @property
+    def counter_state(self):
+        return tuple(getattr(self, field) for field in COUNTER_STATE_FIELDS)
+
+    def save(self, *args, **kwargs):
+        # Counter updates run in the save signals; keep them in the same
+        # transaction as the row itself.
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self)
+
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self)
+
+        with transaction.atomic(using=using, savepoint=False):
+            return super().delete(*args, **kwargs)
+
+
+class ArchivedTaskQuerySet(models.QuerySet):
+    def restore(self, batch_size=500):
+        """
+        Move the archived tasks of this queryset back to ``Tasks`` with
+        their original pk. Returns the restored tasks.
+        """
+        fields = [field.attname for field in Tasks._meta.concrete_fields]
+        restored = []
+
+        while True:
+            with transaction.atomic(using=self.db):
+                rows = list(self.order_by('pk').values(*fields)[:batch_size])
+
+                if not rows:
+                    return restored
+
+                tasks = [Tasks(**row) for row in rows]
+                Tasks.objects.using(self.db).bulk_create(tasks)
+
+                # bulk_create() stamped the tasks with the current time.
+                for task, row in zip(tasks, rows):
+                    task.created_at = row['created_at']
+
+                Tasks.objects.using(self.db).bulk_update(tasks, ['created_at'])
+                self.model.objects.using(self.db).filter(
+                    pk__in=[row['id'] for row in rows]).delete()
+
+            restored.extend(tasks)
+
+    restore.alters_data = True
+
+
+class ArchivedTask(models.Model):
+    """
+    Cold partition of ``Tasks``. ``archive_tasks`` moves old tasks of done
+    columns here, out of the table and indexes every task list reads.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    due_date = models.DateTimeField()
+
+    column = models.ForeignKey(
+        Columns, on_delete=models.CASCADE, related_name='archived_tasks')
+
+    project = models.ForeignKey(
+        Projects, on_delete=models.CASCADE, related_name='archived_tasks')
+
     assignee = models.ForeignKey(
-        get_user_model(), on_delete=models.CASCADE, related_name='tasks')
+        get_user_model(), on_delete=models.CASCADE, related_name='archived_tasks',
+        db_constraint=False)
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ArchivedTaskQuerySet.as_manager()
 
     def __str__(self):
         return self.title
+
+
+class TaskCount(models.Model):
+    """
+    Denormalized number of tasks per group, maintained incrementally by
+    ``update_task_counters`` and recomputed by ``rebuild``.
+    """
+
+    project = models.ForeignKey(
+        Projects, on_delete=models.CASCADE, related_name='+')
+    count = models.IntegerField(default=0)
+
+    # Task fields identifying the group, in the order of the delta keys.
+    group_fields = ()
+
+    # Lookups of the tasks counted.
+    counted_tasks = {}
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def apply_deltas(cls, deltas, using=None):
+        counters = cls.objects.using(using)
+
+        for key, delta in deltas.items():
+            if not delta:
+                continue
+
+            lookup = dict(zip(cls.group_fields, key))
+
+            if counters.filter(**lookup).update(count=F('count') + delta):
+                continue
+
+            if delta < 0:
+                # Nothing was counted for this group yet; the reconcile
+                # command fixes up counters that were never initialized.
+                continue
+
+            try:
+                with transaction.atomic(using=counters.db):
+                    counters.create(count=delta, **lookup)
+            except IntegrityError:
+                counters.filter(**lookup).update(
+                    count=F('count') + delta)
+
+    @classmethod
+    def rebuild(cls, project_ids=None, using=None):
+        """
+        Recompute the counters from the tasks table in a single GROUP BY
+        pass, for all projects or only the given ``project_ids``.
+        """
+        counters = cls.objects.using(using)
+        tasks = Tasks._base_manager.using(using).filter(**cls.counted_tasks)
+
+        if project_ids is not None:
+            counters = counters.filter(project_id__in=project_ids)
+            tasks = tasks.filter(project_id__in=project_ids)
+
+        rows = tasks.order_by().values(*cls.group_fields).annotate(
+            total=Count('pk'))
+
+        with transaction.atomic(using=using, savepoint=False):
+            counters.delete()
+            created = cls.objects.using(using).bulk_create([
+                cls(count=row.pop('total'), **row) for row in rows
+            ], batch_size=1000)
+
+        return len(created)
+
+
+class ColumnTaskCount(TaskCount):
+    column = models.OneToOneField(
+        Columns, on_delete=models.CASCADE, related_name='task_count')
+
+    group_fields = ('project_id', 'column_id')
+
+    def __str__(self):
+        return f'{self.column_id}: {self.count}'
+
+
+class AssigneeTaskCount(TaskCount):
+    assignee = models.ForeignKey(
+        get_user_model(), on_delete=models.CASCADE, related_name='task_counts',
+        db_constraint=False)
+
+    group_fields = ('project_id', 'assignee_id')
+
+    # Like the task list, leave out the tasks of deleted columns.
+    counted_tasks = {'column__deleted_at__isnull': True}
+
+    class Meta:
+        unique_together = ('project', 'assignee')
+
+    def __str__(self):
+        return f'{self.project_id} - {self.assignee_id}: {self.count}'
@@ -0,0 +1,60 @@
+"""
+Keyset pagination of the task lists that include the archive.
+
+The live tasks and the archived tasks are two tables ordered by the same
+pk. Each page reads the next tasks after the cursor from both along their
+primary keys and keeps the lowest, so a page costs two index range scans
+however deep it is, and neither table is ever read whole.
+"""
+
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class ArchiveMergePagination:
+    page_size = 100
+    max_page_size = 500
+
+    def paginate(self, querysets, request):
+        """
+        Next page of the tasks of ``querysets``, merged by pk.
+        """
+        self.request = request
+        self.limit = self.get_limit(request)
+        cursor = request.query_params.get('cursor')
+
+        if cursor:
+            try:
+                after = int(cursor)
+            except ValueError:
+                raise NotFound('Invalid cursor.') from None
+
+            querysets = [queryset.filter(pk__gt=after) for queryset in querysets]
+
+        tasks = sorted(
+            (task for queryset in querysets
+             for task in queryset.order_by('pk')[:self.limit + 1]),
+            key=lambda task: task.pk,
+        )
+        self.has_next = len(tasks) > self.limit
+        self.page = tasks[:self.limit]
+        return self.page
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.page_size))
+        except ValueError:
+            return self.page_size
+
+        return max(1, min(limit, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, 'cursor', self.page[-1].pk)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
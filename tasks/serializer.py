@@ -4,13 +4,15 @@ Serializers for the tasks app
 
 from rest_framework import serializers
 
-from tasks.models import Columns, Tasks
+from core.fragments import FragmentCacheMixin, FragmentCachedListSerializer
+from tasks.models import AssigneeTaskCount, Columns, Tasks
 
 
-class ColumnSerializer(serializers.ModelSerializer):
+class ColumnSerializer(FragmentCacheMixin, serializers.ModelSerializer):
     class Meta:
         model = Columns
-        fields = '__all__'
+        exclude = ['deleted_at']
+        list_serializer_class = FragmentCachedListSerializer
 
 
 class TaskSerializer(serializers.ModelSerializer):
@@ -19,10 +21,39 @@ class TaskSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class TaskListSerializer(serializers.ModelSerializer):
+class TaskListSerializer(FragmentCacheMixin, serializers.ModelSerializer):
     assignee_name: dict = serializers.ReadOnlyField(
         source='assignee.full_name')
 
     class Meta:
         model = Tasks
         fields = '__all__'
+        list_serializer_class = FragmentCachedListSerializer
+
+    def get_fragment_version(self, instance):
+        return (
+            instance.updated_at.isoformat(),
+            instance.assignee.updated_at.isoformat(),
+        )
+
+
+class ColumnTaskCountSerializer(serializers.ModelSerializer):
+    column: int = serializers.ReadOnlyField(source='id')
+    count: int = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Columns
+        fields = ['column', 'name', 'count']
+
+    def get_count(self, column) -> int:
+        task_count = getattr(column, 'task_count', None)
+        return task_count.count if task_count else 0
+
+
+class AssigneeTaskCountSerializer(serializers.ModelSerializer):
+    assignee_name: str = serializers.ReadOnlyField(
+        source='assignee.full_name')
+
+    class Meta:
+        model = AssigneeTaskCount
+        fields = ['assignee', 'assignee_name', 'count']
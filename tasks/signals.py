@@ -0,0 +1,70 @@
+"""
+Signal handlers for the tasks app.
+"""
+
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.cache import invalidate_project
+from tasks.models import Columns, Tasks, counter_signals_suspended, update_task_counters
+
+
+@receiver(pre_save, sender=Tasks)
+def remember_task_counter_state(sender, instance, raw, using, **kwargs):
+    """
+    Instances that weren't loaded from the database (e.g. built with an
+    explicit pk) don't know which counters they were counted in yet.
+    """
+    if raw or instance.pk is None or hasattr(instance, '_counter_state'):
+        return
+
+    instance._counter_state = Tasks._base_manager.using(using).filter(
+        pk=instance.pk).values_list('project_id', 'column_id', 'assignee_id').first()
+
+
+@receiver(post_save, sender=Tasks)
+def invalidate_task_project_cache_on_save(sender, instance, **kwargs):
+    before = getattr(instance, '_counter_state', None)
+
+    # The counter state still holds the previous project at this point.
+    if before is not None and before[0] != instance.project_id:
+        invalidate_project(before[0])
+
+    invalidate_project(instance.project_id)
+
+
+@receiver(post_delete, sender=Tasks)
+@receiver(post_save, sender=Columns)
+@receiver(post_delete, sender=Columns)
+def invalidate_project_cache(sender, instance, **kwargs):
+    invalidate_project(instance.project_id)
+
+
+@receiver(post_save, sender=Tasks)
+def update_counters_on_save(sender, instance, raw, using, **kwargs):
+    if raw or counter_signals_suspended():
+        return
+
+    before = getattr(instance, '_counter_state', None)
+    after = instance.counter_state
+
+    if before != after:
+        changes = Counter({after: 1})
+
+        if before is not None:
+            changes[before] -= 1
+
+        update_task_counters(changes, using=using)
+
+    instance._counter_state = after
+
+
+@receiver(post_delete, sender=Tasks)
+def update_counters_on_delete(sender, instance, using, **kwargs):
+    if counter_signals_suspended():
+        return
+
+    state = getattr(instance, '_counter_state', None) or instance.counter_state
+    update_task_counters(Counter({state: -1}), using=using)
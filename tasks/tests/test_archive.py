@@ -0,0 +1,159 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from organizations.models import Membership
+from organizations.tests import create_organization, create_membership
+
+from projects.models import ProjectMembership
+from projects.tests import create_projects, create_project_membership
+
+from tasks.models import ArchivedTask, ColumnTaskCount, Tasks
+from tasks.tests.test_columns import create_column
+from tasks.tests.test_tasks import create_task
+
+from users.tests import create_user
+
+LIST_CREATE_TASKS_URL = reverse('tasks:tasks_list_create')
+
+
+class TaskArchiveTest(TestCase):
+    def setUp(self) -> None:
+        self.user = create_user(
+            email='test@example.com',
+            password='testpass123',
+            first_name='John',
+            last_name='Doe'
+        )
+
+        self.organization = create_organization(
+            name='Test Organization',
+            domain='testorg.com',
+        )
+
+        create_membership(
+            organization=self.organization,
+            user=self.user,
+            role=Membership.ROLE_OWNER
+        )
+
+        self.project = create_projects(
+            name='Test Project',
+            description='Test Description',
+            organization=self.organization
+        )
+
+        create_project_membership(
+            project=self.project,
+            user=self.user,
+            role=ProjectMembership.PROJECT_MANAGER
+        )
+
+        self.todo = create_column(project=self.project, name='To Do', position=1)
+        self.done = create_column(project=self.project, name='Done', position=2)
+
+        self.old_done = self.create_task(self.done, days_ago=120)
+        self.recent_done = self.create_task(self.done, days_ago=10)
+        self.old_todo = self.create_task(self.todo, days_ago=120)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_task(self, column, days_ago):
+        task = create_task(
+            title='Test Task',
+            description='Test Description',
+            due_date='2021-12-12 12:00:00',
+            column=column,
+            project=self.project,
+            assignee=self.user
+        )
+        Tasks.objects.filter(pk=task.pk).update(
+            updated_at=timezone.now() - timedelta(days=days_ago))
+
+        return task
+
+    def test_archive_command_moves_old_tasks_of_done_columns(self):
+        call_command('archive_tasks', stdout=StringIO())
+
+        self.assertEqual(
+            set(Tasks.objects.values_list('pk', flat=True)),
+            {self.recent_done.pk, self.old_todo.pk})
+        self.assertEqual(
+            list(ArchivedTask.objects.values_list('pk', flat=True)),
+            [self.old_done.pk])
+        self.assertEqual(ColumnTaskCount.objects.get(column=self.done).count, 1)
+
+    def test_dry_run_archives_nothing(self):
+        out = StringIO()
+        call_command('archive_tasks', '--dry-run', stdout=out)
+
+        self.assertIn('Would archive 1 tasks.', out.getvalue())
+        self.assertFalse(ArchivedTask.objects.exists())
+
+    def test_list_reads_the_archive_only_when_asked(self):
+        call_command('archive_tasks', stdout=StringIO())
+
+        res = self.client.get(LIST_CREATE_TASKS_URL, {'project_id': self.project.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn(self.old_done.pk, [task['id'] for task in res.data])
+
+        res = self.client.get(LIST_CREATE_TASKS_URL, {
+            'project_id': self.project.id, 'include_archived': 1})
+
+        self.assertEqual(
+            [task['id'] for task in res.data['results']],
+            [self.old_done.pk, self.recent_done.pk, self.old_todo.pk])
+        self.assertIsNone(res.data['next'])
+
+    def test_list_pages_through_the_archive(self):
+        call_command('archive_tasks', stdout=StringIO())
+        params = {'project_id': self.project.id, 'include_archived': 1, 'limit': 2}
+
+        res = self.client.get(LIST_CREATE_TASKS_URL, params)
+
+        self.assertEqual(
+            [task['id'] for task in res.data['results']],
+            [self.old_done.pk, self.recent_done.pk])
+
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(
+            [task['id'] for task in res.data['results']], [self.old_todo.pk])
+        self.assertIsNone(res.data['next'])
+
+    def test_list_reads_one_page_of_each_table(self):
+        call_command('archive_tasks', stdout=StringIO())
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(LIST_CREATE_TASKS_URL, {
+                'project_id': self.project.id, 'include_archived': 1, 'limit': 2})
+
+        reads = [query['sql'] for query in queries
+                 if 'tasks_tasks' in query['sql'] or 'tasks_archivedtask' in query['sql']]
+        self.assertEqual(len(reads), 2)
+        self.assertTrue(all('LIMIT 3' in sql for sql in reads))
+
+    def test_restore_archived_task(self):
+        call_command('archive_tasks', stdout=StringIO())
+        url = reverse('tasks:archived_task_restore', kwargs={'pk': self.old_done.pk})
+
+        res = self.client.post(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], self.old_done.pk)
+        self.assertFalse(ArchivedTask.objects.exists())
+        self.assertEqual(
+            Tasks.objects.get(pk=self.old_done.pk).created_at,
+            self.old_done.created_at)
+        self.assertEqual(ColumnTaskCount.objects.get(column=self.done).count, 2)
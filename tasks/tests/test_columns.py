@@ -5,6 +5,8 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from jobs import queue
+
 from organizations.models import Membership
 from organizations.tests import create_organization, create_membership
 
@@ -318,6 +320,21 @@ class PrivateTaskApiTest(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
 
+    def test_deleted_column_is_hidden_until_purged(self):
+        column = create_column(project=self.project, name='To Do', position=1)
+
+        self.manager.delete(reverse('tasks:column_detail', kwargs={'pk': column.id}))
+
+        res = self.manager.get(LIST_CREATE_COLUMNS_URL, {'project_id': self.project.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+        self.assertIsNotNone(Columns.all_objects.get(pk=column.id).deleted_at)
+
+        queue.execute(queue.claim('test'))
+
+        self.assertFalse(Columns.all_objects.filter(pk=column.id).exists())
+
     def test_delete_column_unauthorized(self):
         """ Only project managers can delete columns """
         data = {
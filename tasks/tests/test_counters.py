@@ -0,0 +1,257 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import router
+from django.test import TestCase, override_settings
+
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.purge import purge_deleted
+from organizations import sharding
+from organizations.models import Membership
+from organizations.tests import create_organization, create_membership
+
+from projects.models import ProjectMembership
+from projects.tests import create_projects, create_project_membership
+
+from tasks.models import AssigneeTaskCount, ColumnTaskCount, Tasks
+from tasks.tests.test_columns import create_column
+from tasks.tests.test_tasks import create_task
+
+from users.tests import create_user
+
+TASK_COUNTS_URL = reverse('tasks:task_counts')
+
+
+class TaskCountersTest(TestCase):
+    def setUp(self) -> None:
+        self.user = create_user(
+            email='test@example.com',
+            password='testpass123',
+            first_name='John',
+            last_name='Doe'
+        )
+
+        self.user2 = create_user(
+            email='test2@example.com',
+            password='testpass123',
+            first_name='Jane',
+            last_name='Doe'
+        )
+
+        self.organization = create_organization(
+            name='Test Organization',
+            domain='testorg.com',
+        )
+
+        create_membership(
+            organization=self.organization,
+            user=self.user,
+            role=Membership.ROLE_OWNER
+        )
+
+        self.project = create_projects(
+            name='Test Project',
+            description='Test Description',
+            organization=self.organization
+        )
+
+        create_project_membership(
+            project=self.project,
+            user=self.user,
+            role=ProjectMembership.PROJECT_MANAGER
+        )
+
+        self.todo = create_column(project=self.project, name='To Do', position=1)
+        self.done = create_column(project=self.project, name='Done', position=2)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def new_task(self, **params):
+        return Tasks(
+            title='Test Task',
+            description='Test Description',
+            due_date='2021-12-12 12:00:00',
+            project=self.project,
+            **params
+        )
+
+    def column_counts(self):
+        return {
+            counter.column_id: counter.count
+            for counter in ColumnTaskCount.objects.all()
+        }
+
+    def assignee_counts(self):
+        return {
+            counter.assignee_id: counter.count
+            for counter in AssigneeTaskCount.objects.all()
+        }
+
+    def test_counters_follow_task_lifecycle(self):
+        task = create_task(
+            title='Test Task',
+            description='Test Description',
+            due_date='2021-12-12 12:00:00',
+            column=self.todo,
+            project=self.project,
+            assignee=self.user
+        )
+
+        self.assertEqual(self.column_counts(), {self.todo.id: 1})
+        self.assertEqual(self.assignee_counts(), {self.user.id: 1})
+
+        task = Tasks.objects.get(pk=task.pk)
+        task.column = self.done
+        task.assignee = self.user2
+        task.save()
+
+        self.assertEqual(self.column_counts(), {
+                         self.todo.id: 0, self.done.id: 1})
+        self.assertEqual(self.assignee_counts(), {
+                         self.user.id: 0, self.user2.id: 1})
+
+        task.delete()
+
+        self.assertEqual(self.column_counts(), {
+                         self.todo.id: 0, self.done.id: 0})
+
+    def test_counters_follow_bulk_paths(self):
+        Tasks.objects.bulk_create([
+            self.new_task(column=self.todo, assignee=self.user),
+            self.new_task(column=self.todo, assignee=self.user),
+            self.new_task(column=self.todo, assignee=self.user2),
+        ])
+
+        self.assertEqual(self.column_counts(), {self.todo.id: 3})
+
+        Tasks.objects.filter(assignee=self.user).update(column=self.done)
+
+        self.assertEqual(self.column_counts(), {
+                         self.todo.id: 1, self.done.id: 2})
+
+        Tasks.objects.filter(column=self.done).delete()
+
+        self.assertEqual(self.column_counts(), {
+                         self.todo.id: 1, self.done.id: 0})
+        self.assertEqual(self.assignee_counts(), {
+                         self.user.id: 0, self.user2.id: 1})
+
+    def test_counters_follow_the_queryset_database(self):
+        tasks = Tasks.objects.using('default')
+        tasks.bulk_create([
+            self.new_task(column=self.todo, assignee=self.user),
+            self.new_task(column=self.todo, assignee=self.user2),
+        ])
+
+        task = self.new_task(column=self.done, assignee=self.user)
+
+        # The counters must be written next to the tasks, not to the
+        # database the router picks.
+        with mock.patch.object(router, 'db_for_write', return_value='unrouted'):
+            tasks.filter(assignee=self.user).update(column=self.done)
+            tasks.bulk_create([task])
+            tasks.filter(assignee=self.user2).delete()
+
+        self.assertEqual(self.column_counts(), {
+                         self.todo.id: 0, self.done.id: 2})
+        self.assertEqual(self.assignee_counts(), {
+                         self.user.id: 2, self.user2.id: 0})
+
+    def test_deleted_column_leaves_assignee_counters(self):
+        Tasks.objects.bulk_create([
+            self.new_task(column=self.todo, assignee=self.user),
+            self.new_task(column=self.done, assignee=self.user),
+            self.new_task(column=self.done, assignee=self.user2),
+        ])
+
+        self.done.delete()
+
+        self.assertEqual(self.assignee_counts(), {self.user.id: 1, self.user2.id: 0})
+
+        res = self.client.get(TASK_COUNTS_URL, {'project_id': self.project.id})
+
+        self.assertEqual(
+            [(assignee['assignee'], assignee['count']) for assignee in res.data['assignees']],
+            [(self.user.id, 1)])
+
+        purge_deleted()
+
+        self.assertEqual(self.assignee_counts(), {self.user.id: 1, self.user2.id: 0})
+        self.assertEqual(self.column_counts(), {self.todo.id: 1})
+
+    def test_reconcile_leaves_out_deleted_columns(self):
+        Tasks.objects.bulk_create([
+            self.new_task(column=self.todo, assignee=self.user),
+            self.new_task(column=self.done, assignee=self.user2),
+        ])
+        self.done.delete()
+
+        call_command('reconcile_task_counters', stdout=StringIO())
+
+        self.assertEqual(self.assignee_counts(), {self.user.id: 1})
+
+    def test_reconcile_command_recomputes_counters(self):
+        Tasks.objects.bulk_create([
+            self.new_task(column=self.todo, assignee=self.user),
+            self.new_task(column=self.done, assignee=self.user),
+        ])
+        ColumnTaskCount.objects.update(count=42)
+        AssigneeTaskCount.objects.all().delete()
+
+        call_command('reconcile_task_counters', stdout=StringIO())
+
+        self.assertEqual(self.column_counts(), {
+                         self.todo.id: 1, self.done.id: 1})
+        self.assertEqual(self.assignee_counts(), {self.user.id: 2})
+
+    @override_settings(SHARD_DATABASES=['default', 'shard1'])
+    def test_reconcile_covers_every_shard(self):
+        rebuilt = []
+
+        def rebuild(model):
+            def rebuild(project_ids=None, using=None):
+                rebuilt.append((model, using, sharding.get_current_shard()))
+                return 1
+
+            return rebuild
+
+        with mock.patch.object(ColumnTaskCount, 'rebuild', rebuild('columns')), \
+                mock.patch.object(AssigneeTaskCount, 'rebuild', rebuild('assignees')):
+            out = StringIO()
+            call_command('reconcile_task_counters', stdout=out)
+
+        self.assertEqual(rebuilt, [
+            ('columns', 'default', 'default'), ('assignees', 'default', 'default'),
+            ('columns', 'shard1', 'shard1'), ('assignees', 'shard1', 'shard1'),
+        ])
+        self.assertIn('Reconciled 2 column counters and 2 assignee counters.', out.getvalue())
+
+    def test_task_counts_endpoint(self):
+        create_task(
+            title='Test Task',
+            description='Test Description',
+            due_date='2021-12-12 12:00:00',
+            column=self.todo,
+            project=self.project,
+            assignee=self.user
+        )
+
+        res = self.client.get(TASK_COUNTS_URL, {'project_id': self.project.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(column['column'], column['count']) for column in res.data['columns']],
+            [(self.todo.id, 1), (self.done.id, 0)]
+        )
+        self.assertEqual(res.data['assignees'][0]['assignee'], self.user.id)
+        self.assertEqual(res.data['assignees'][0]['count'], 1)
+
+    def test_task_counts_endpoint_requires_project_id(self):
+        res = self.client.get(TASK_COUNTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,3 +1,5 @@
+from unittest import mock
+
 from django.db import IntegrityError
 from django.test import TestCase
 
@@ -359,6 +361,71 @@ class PrivateTaskApiTest(TestCase):
 
         self.assertEqual(len(res.data), 0)
 
+    def test_list_tasks_cached_until_project_changes(self):
+        data = {
+            'title': 'Test Task',
+            'description': 'Test Description',
+            'due_date': '2021-12-12 12:00:00',
+            'column': self.column,
+            'project': self.project,
+            'assignee': self.user_member
+        }
+
+        create_task(**data)
+
+        res = self.manager.get(LIST_CREATE_TASKS_URL, {
+            'project_id': self.project.id})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+        res = self.member.get(LIST_CREATE_TASKS_URL, {
+            'project_id': self.project.id})
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(len(res.data), 1)
+
+        create_task(**data)
+
+        res = self.member.get(LIST_CREATE_TASKS_URL, {
+            'project_id': self.project.id})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data), 2)
+
+    def test_list_tasks_skips_cache_when_pinned_to_primary(self):
+        with mock.patch('projects.mixins.reads_use_primary', return_value=True):
+            res = self.member.get(LIST_CREATE_TASKS_URL, {
+                'project_id': self.project.id})
+
+        self.assertEqual(res['X-Cache'], 'BYPASS')
+
+    def test_list_tasks_reuses_unchanged_fragments(self):
+        data = {
+            'title': 'Test Task',
+            'description': 'Test Description',
+            'due_date': '2021-12-12 12:00:00',
+            'column': self.column,
+            'project': self.project,
+            'assignee': self.user_member
+        }
+
+        create_task(**data)
+
+        res = self.manager.get(LIST_CREATE_TASKS_URL, {
+            'project_id': self.project.id})
+
+        self.assertEqual(
+            res['X-Fragment-Cache'], 'hits=0; misses=1; ratio=0.00')
+
+        create_task(**data)
+
+        res = self.manager.get(LIST_CREATE_TASKS_URL, {
+            'project_id': self.project.id})
+
+        self.assertEqual(
+            res['X-Fragment-Cache'], 'hits=1; misses=1; ratio=0.50')
+        self.assertEqual(len(res.data), 2)
+
     def test_list_tasks_unauthorized(self):
         """ Only project members can list tasks """
         res = self.external.get(LIST_CREATE_TASKS_URL, {
@@ -13,6 +13,9 @@ urlpatterns = [
     path('columns/<int:pk>/', ColumnRetrieveUpdateDestroyView.as_view(),
          name='column_detail'),
     path('tasks/', TaskListCreateView.as_view(), name='tasks_list_create'),
+    path('tasks/counts/', TaskCountsView.as_view(), name='task_counts'),
     path('tasks/<int:pk>/', TaskRetrieveUpdateDestroyView.as_view(),
          name='task_detail'),
+    path('tasks/archived/<int:pk>/restore/', ArchivedTaskRestoreView.as_view(),
+         name='archived_task_restore'),
 ]
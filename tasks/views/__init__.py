@@ -1,2 +1,3 @@
 from .columns import *
+from .counts import *
 from .tasks import *
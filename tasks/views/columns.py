@@ -7,18 +7,22 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
-from projects.mixins import ProjectPermissionMixin
+from core.fragments import fragment_cache_header
+from core.profiling import serializer_data
+from jobs.queue import enqueue
+from projects.mixins import ProjectPermissionMixin, ProjectResponseCacheMixin
 
 from tasks.models import Columns
 from tasks.serializer import ColumnSerializer
 
 
-class ColumnListCreateView(generics.ListCreateAPIView, ProjectPermissionMixin):
+class ColumnListCreateView(generics.ListCreateAPIView, ProjectPermissionMixin, ProjectResponseCacheMixin):
     """
     List all columns in a project or create a new column.
     """
 
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 4, 'POST': 5}
     serializer_class = ColumnSerializer
 
     def get(self, request, *args, **kwargs):
@@ -40,16 +44,23 @@ class ColumnListCreateView(generics.ListCreateAPIView, ProjectPermissionMixin):
 
     def list(self, request, *args, **kwargs):
         project_id = request.GET.get('project_id')
-        queryset = Columns.objects.filter(project=project_id)
+
+        return self.cached_response(project_id, lambda: self.list_columns(project_id))
+
+    def list_columns(self, project_id):
+        queryset = Columns.objects.filter(project=project_id).cached()
 
         page = self.paginate_queryset(queryset)
 
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            response = self.get_paginated_response(serializer_data(serializer))
+        else:
+            serializer = self.get_serializer(queryset, many=True)
+            response = Response(serializer_data(serializer))
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        response['X-Fragment-Cache'] = fragment_cache_header(serializer)
+        return response
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -63,7 +74,7 @@ class ColumnListCreateView(generics.ListCreateAPIView, ProjectPermissionMixin):
             return permission_error
 
         self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
+        headers = self.get_success_headers(serializer_data(serializer))
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
@@ -73,7 +84,9 @@ class ColumnRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView, Pro
     """
 
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 3, 'PATCH': 6, 'PUT': 6, 'DELETE': 10}
     serializer_class = ColumnSerializer
+    shard_model = Columns
 
     def get_object(self):
         column_id = self.kwargs.get('pk')
@@ -113,7 +126,7 @@ class ColumnRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView, Pro
         if getattr(column, '_prefetched_objects_cache', None):
             column._prefetched_objects_cache = {}
 
-        return Response(serializer.data)
+        return Response(serializer_data(serializer))
 
     def destroy(self, request, *args, **kwargs):
         column = self.get_object()
@@ -125,4 +138,7 @@ class ColumnRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView, Pro
             return permission_error
 
         self.perform_destroy(column)
+        # The column and its tasks are only flagged as deleted, purge them
+        # in the background.
+        enqueue('core.purge_deleted', priority=-10, dedupe_key='core.purge_deleted')
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,48 @@
+"""
+This file contains the views for the task counters of a project.
+"""
+
+from rest_framework import generics, status
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+
+from organizations.sharding import select_global_related
+from projects.mixins import ProjectPermissionMixin
+
+from tasks.models import AssigneeTaskCount, Columns
+from tasks.serializer import AssigneeTaskCountSerializer, ColumnTaskCountSerializer
+
+
+class TaskCountsView(generics.GenericAPIView, ProjectPermissionMixin):
+    """
+    Number of tasks per column and per assignee in a project, served from
+    the denormalized counter tables.
+    """
+
+    permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 5}
+
+    def get(self, request, *args, **kwargs):
+        project_id = request.GET.get('project_id', None)
+
+        if not project_id:
+            return Response(
+                {"message": "query params project_id is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        permission_error = self.check_permissions_member(
+            project_id, request.user)
+
+        if permission_error:
+            return permission_error
+
+        columns = Columns.objects.filter(
+            project=project_id).select_related('task_count')
+        assignees = select_global_related(AssigneeTaskCount.objects.filter(
+            project=project_id, count__gt=0), 'assignee')
+
+        return Response({
+            'columns': ColumnTaskCountSerializer(columns, many=True).data,
+            'assignees': AssigneeTaskCountSerializer(assignees, many=True).data,
+        })
@@ -2,23 +2,39 @@
 This file contains the views for the tasks of a project.
 """
 
+from django.db import router, transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
-from projects.mixins import ProjectPermissionMixin
+from core.fragments import fragment_cache_header
+from core.profiling import serializer_data
+from organizations.sharding import select_global_related
+from projects.mixins import ProjectPermissionMixin, ProjectResponseCacheMixin
 
-from tasks.models import Tasks
+from tasks.models import ArchivedTask, Tasks
+from tasks.pagination import ArchiveMergePagination
 from tasks.serializer import TaskSerializer, TaskListSerializer
+from webhooks.models import OutboxEvent
+from webhooks.outbox import record_event
 
 
-class TaskListCreateView(generics.ListCreateAPIView, ProjectPermissionMixin):
+def record_task_event(event_type, task, payload):
+    record_event(task.project.organization_id, event_type, payload)
+
+
+class TaskListCreateView(generics.ListCreateAPIView, ProjectPermissionMixin, ProjectResponseCacheMixin):
     """
     List all tasks in a project or create a new task.
+
+    With ``include_archived`` the list also reads the archived tasks, a
+    page at a time: both tables are keyset-paginated on pk in the database
+    (see ``tasks.pagination``) rather than loaded and merged in memory.
     """
 
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 4, 'POST': 18}
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -45,8 +61,12 @@ class TaskListCreateView(generics.ListCreateAPIView, ProjectPermissionMixin):
         return self.list(request, project_id, column_id)
 
     def list(self, request, project_id, column_id):
+        return self.cached_response(
+            project_id, lambda: self.list_tasks(request, project_id, column_id))
 
-        filters = {}
+    def list_tasks(self, request, project_id, column_id):
+        # Tasks of deleted columns stay until purged.
+        filters = {'column__deleted_at__isnull': True}
 
         if project_id:
             filters['project_id'] = project_id
@@ -57,16 +77,29 @@ class TaskListCreateView(generics.ListCreateAPIView, ProjectPermissionMixin):
         if request.GET.get('assignee_id'):
             filters['assignee_id'] = request.GET.get('assignee_id')
 
-        queryset = Tasks.objects.filter(**filters)
+        queryset = select_global_related(Tasks.objects.filter(**filters), 'assignee')
+
+        if request.GET.get('include_archived') in ('1', 'true'):
+            archived = select_global_related(
+                ArchivedTask.objects.filter(**filters), 'assignee')
+            paginator = ArchiveMergePagination()
+            page = paginator.paginate([queryset, archived], request)
+            serializer = self.get_serializer(page, many=True)
+            response = paginator.get_paginated_response(serializer_data(serializer))
+            response['X-Fragment-Cache'] = fragment_cache_header(serializer)
+            return response
 
         page = self.paginate_queryset(queryset)
 
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            response = self.get_paginated_response(serializer_data(serializer))
+        else:
+            serializer = self.get_serializer(queryset, many=True)
+            response = Response(serializer_data(serializer))
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        response['X-Fragment-Cache'] = fragment_cache_header(serializer)
+        return response
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -89,9 +122,14 @@ class TaskListCreateView(generics.ListCreateAPIView, ProjectPermissionMixin):
             )
 
         self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
+        headers = self.get_success_headers(serializer_data(serializer))
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
+    def perform_create(self, serializer):
+        with transaction.atomic(using=router.db_for_write(Tasks)):
+            task = serializer.save()
+            record_task_event(OutboxEvent.TASK_CREATED, task, serializer_data(serializer))
+
 
 class TaskRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView, ProjectPermissionMixin):
     """
@@ -99,11 +137,13 @@ class TaskRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView, Proje
     """
 
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 4, 'PATCH': 14, 'PUT': 14, 'DELETE': 10}
     serializer_class = TaskSerializer
+    shard_model = Tasks
 
     def get_object(self):
         task_id = self.kwargs.get('pk')
-        return get_object_or_404(Tasks, pk=task_id)
+        return get_object_or_404(Tasks, pk=task_id, column__deleted_at__isnull=True)
 
     def get(self, request, *args, **kwargs):
         project_id = request.GET.get('project_id', None)
@@ -140,7 +180,7 @@ class TaskRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView, Proje
         if getattr(task, '_prefetched_objects_cache', None):
             task._prefetched_objects_cache = {}
 
-        return Response(serializer.data)
+        return Response(serializer_data(serializer))
 
     def destroy(self, request, *args, **kwargs):
         task = self.get_object()
@@ -153,3 +193,39 @@ class TaskRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView, Proje
 
         self.perform_destroy(task)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def perform_update(self, serializer):
+        with transaction.atomic(using=router.db_for_write(Tasks)):
+            task = serializer.save()
+            record_task_event(OutboxEvent.TASK_UPDATED, task, serializer_data(serializer))
+
+    def perform_destroy(self, task):
+        payload = {'id': task.id, 'project': task.project_id, 'column': task.column_id}
+
+        with transaction.atomic(using=router.db_for_write(Tasks)):
+            task.delete()
+            record_task_event(OutboxEvent.TASK_DELETED, task, payload)
+
+
+class ArchivedTaskRestoreView(generics.GenericAPIView, ProjectPermissionMixin):
+    """
+    Move an archived task back to the task list.
+    """
+
+    permission_classes = [IsAuthenticated]
+    query_budget = {'POST': 15}
+    serializer_class = TaskSerializer
+    shard_model = ArchivedTask
+
+    def post(self, request, *args, **kwargs):
+        archived_task = get_object_or_404(ArchivedTask, pk=kwargs['pk'])
+
+        permission_error = self.check_permissions_member(
+            archived_task.project_id, request.user)
+
+        if permission_error:
+            return permission_error
+
+        task, = ArchivedTask.objects.filter(pk=archived_task.pk).restore()
+
+        return Response(serializer_data(self.get_serializer(task)))
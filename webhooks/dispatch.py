@@ -0,0 +1,292 @@
+"""
+Asynchronous delivery of the outbox to the webhook endpoints.
+
+Each round, every active endpoint with undelivered events gets the next
+batch of them in one POST, the endpoints being served concurrently (at
+most ``settings.WEBHOOK_CONCURRENCY`` requests in flight) over pooled
+keep-alive connections, at most ``settings.WEBHOOK_CONNECTIONS_PER_HOST``
+per host. An endpoint only gets its next batch once the
+previous one was acknowledged with a 2xx, so it receives its events in
+order. Failed batches are retried with exponential backoff, and endpoints
+failing ``settings.WEBHOOK_MAX_FAILURES`` times in a row are disabled.
+Events past ``settings.WEBHOOK_EVENT_RETENTION_DAYS`` are pruned every
+``settings.WEBHOOK_PRUNE_INTERVAL`` seconds while the dispatcher runs.
+Hosts resolving to a private or local address fail without a request
+being sent (see ``webhooks.validators``), and redirects aren't followed.
+
+Deliveries are at least once: receivers should ignore events whose id they
+already processed. Batches are signed with the secret of the endpoint::
+
+    X-Webhook-Signature: t=<unix time>,v1=<hex HMAC-SHA256 of "<t>.<body>">
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from organizations.sharding import shard_context
+from webhooks.models import OutboxEvent, WebhookEndpoint
+from webhooks.validators import PublicAddressTransport, UnsafeDestination
+
+
+@dataclass
+class Batch:
+    alias: str
+    endpoint: WebhookEndpoint
+    events: list
+    body: bytes
+    # Id of the last event scanned, delivered or not subscribed to.
+    cursor: int
+
+
+def sign(secret, timestamp, body):
+    message = f'{timestamp}.'.encode() + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def signature_header(secret, body, timestamp=None):
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    return f't={timestamp},v1={sign(secret, timestamp, body)}'
+
+
+def verify_signature(secret, body, header, tolerance=300):
+    """
+    Whether ``header`` is a valid signature of ``body``, made less than
+    ``tolerance`` seconds ago. For receivers written in Python.
+    """
+    fields = dict(part.split('=', 1) for part in header.split(',') if '=' in part)
+
+    try:
+        timestamp = int(fields['t'])
+    except (KeyError, ValueError):
+        return False
+
+    if abs(time.time() - timestamp) > tolerance:
+        return False
+
+    return hmac.compare_digest(sign(secret, timestamp, body), fields.get('v1', ''))
+
+
+def retry_delay(failures):
+    ceiling = min(settings.WEBHOOK_RETRY_BACKOFF * 2 ** (failures - 1),
+                  settings.WEBHOOK_RETRY_BACKOFF_MAX)
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def serialize_event(event):
+    return {
+        'id': event.id,
+        'type': event.event_type,
+        'organization': event.organization_id,
+        'created_at': event.created_at.isoformat(),
+        'data': event.payload,
+    }
+
+
+def collect_batches(batch_size):
+    """
+    Next batch of events of every endpoint due for a delivery.
+    """
+    now = timezone.now()
+    batches = []
+
+    for alias in settings.SHARD_DATABASES:
+        with shard_context(alias):
+            pending = OutboxEvent.objects.using(alias).filter(
+                organization=OuterRef('organization'), id__gt=OuterRef('cursor'))
+            endpoints = WebhookEndpoint.objects.using(alias).filter(
+                Q(retry_at__isnull=True) | Q(retry_at__lte=now),
+                Exists(pending),
+                is_active=True,
+            )
+
+            for endpoint in endpoints:
+                scanned = list(OutboxEvent.objects.using(alias).filter(
+                    organization=endpoint.organization_id, id__gt=endpoint.cursor,
+                ).order_by('id')[:batch_size])
+                events = [
+                    serialize_event(event) for event in scanned
+                    if not endpoint.event_types or event.event_type in endpoint.event_types
+                ]
+
+                if not events:
+                    WebhookEndpoint.objects.using(alias).filter(
+                        pk=endpoint.pk).update(cursor=scanned[-1].id)
+                    continue
+
+                body = json.dumps({'events': events}, separators=(',', ':')).encode()
+                batches.append(Batch(alias, endpoint, events, body, scanned[-1].id))
+
+    return batches
+
+
+def record_results(results):
+    """
+    Move the cursors of the endpoints that received their batch, and
+    schedule a retry for the others.
+    """
+    now = timezone.now()
+
+    for batch, error in results:
+        endpoint = batch.endpoint
+
+        if error is None:
+            update = {
+                'cursor': batch.cursor,
+                'failures': 0,
+                'retry_at': None,
+                'last_error': '',
+                'last_delivered_at': now,
+            }
+        else:
+            failures = endpoint.failures + 1
+            update = {
+                'failures': failures,
+                'retry_at': now + timedelta(seconds=retry_delay(failures)),
+                'last_error': error,
+                'is_active': failures < settings.WEBHOOK_MAX_FAILURES,
+            }
+
+        with shard_context(batch.alias):
+            WebhookEndpoint.objects.using(batch.alias).filter(
+                pk=endpoint.pk).update(updated_at=now, **update)
+
+
+def prune_events(retention):
+    """
+    Delete the events older than ``retention``, delivered or not.
+    """
+    cutoff = timezone.now() - retention
+    deleted = 0
+
+    for alias in settings.SHARD_DATABASES:
+        with shard_context(alias):
+            deleted += OutboxEvent.objects.using(alias).filter(
+                created_at__lt=cutoff).delete()[0]
+
+    return deleted
+
+
+class Dispatcher:
+    def __init__(self, batch_size=None, concurrency=None, timeout=None, log=None,
+                 prune_interval=None):
+        self.batch_size = batch_size or settings.WEBHOOK_BATCH_SIZE
+        self.concurrency = concurrency or settings.WEBHOOK_CONCURRENCY
+        self.timeout = timeout or settings.WEBHOOK_TIMEOUT
+        self.prune_interval = (settings.WEBHOOK_PRUNE_INTERVAL if prune_interval is None
+                               else prune_interval)
+        self.log = log or (lambda message: None)
+        self.delivered = 0
+        self.pruned = 0
+        self.pruned_at = None
+        self.stopping = threading.Event()
+        # Requests in flight per origin, see ``host_slots()``.
+        self.hosts = {}
+
+    async def run(self, once=False, poll_interval=1):
+        """
+        Deliver events until ``stop()`` is called or, with ``once``, until
+        no endpoint is due. Returns the number of events delivered.
+        """
+        async with httpx.AsyncClient(
+                transport=PublicAddressTransport(),
+                timeout=httpx.Timeout(self.timeout, pool=None),
+                headers={'User-Agent': 'orchestrate-webhooks'}) as client:
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            while not self.stopping.is_set():
+                await self.prune_if_due()
+
+                if await self.dispatch_round(client, semaphore):
+                    continue
+
+                if once:
+                    break
+
+                await asyncio.sleep(poll_interval)
+
+        return self.delivered
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    async def prune_if_due(self):
+        """
+        Prune the outbox if it wasn't in the last ``prune_interval`` seconds.
+        """
+        now = time.monotonic()
+
+        if self.pruned_at is not None and now - self.pruned_at < self.prune_interval:
+            return
+
+        self.pruned_at = now
+        self.pruned += await sync_to_async(prune_events)(
+            timedelta(days=settings.WEBHOOK_EVENT_RETENTION_DAYS))
+
+    def host_slots(self, url):
+        """
+        Semaphore bounding the requests in flight to the origin of ``url``,
+        and so the connections the client opens to it.
+        """
+        parts = urlsplit(url)
+        origin = (parts.scheme, parts.hostname, parts.port)
+
+        if origin not in self.hosts:
+            self.hosts[origin] = asyncio.Semaphore(settings.WEBHOOK_CONNECTIONS_PER_HOST)
+
+        return self.hosts[origin]
+
+    async def dispatch_round(self, client, semaphore):
+        """
+        Deliver one batch to every due endpoint. Returns how many were
+        delivered.
+        """
+        batches = await sync_to_async(collect_batches)(self.batch_size)
+
+        if not batches:
+            return 0
+
+        results = await asyncio.gather(*(
+            self.deliver(client, semaphore, batch) for batch in batches))
+        await sync_to_async(record_results)(results)
+
+        delivered = [batch for batch, error in results if error is None]
+        self.delivered += sum(len(batch.events) for batch in delivered)
+        return len(delivered)
+
+    async def deliver(self, client, semaphore, batch):
+        headers = {
+            'Content-Type': 'application/json',
+            'X-Webhook-Signature': signature_header(batch.endpoint.secret, batch.body),
+            'X-Webhook-Id': f'{batch.endpoint.pk}:{batch.events[0]["id"]}-{batch.events[-1]["id"]}',
+        }
+
+        async with semaphore, self.host_slots(batch.endpoint.url):
+            try:
+                response = await client.post(
+                    batch.endpoint.url, headers=headers, content=batch.body)
+            except (httpx.HTTPError, UnsafeDestination) as exception:
+                error = str(exception) or repr(exception)
+            else:
+                error = (None if response.is_success
+                         else f'{response.status_code} {response.reason_phrase}')
+
+        if error is None:
+            self.log(f'Delivered {len(batch.events)} events to {batch.endpoint.url}.')
+        else:
+            self.log(f'Delivery to {batch.endpoint.url} failed: {error}')
+
+        return batch, error
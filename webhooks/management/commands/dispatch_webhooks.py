@@ -0,0 +1,45 @@
+"""
+Deliver the outbox events to the webhook endpoints.
+"""
+
+import signal
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+
+from webhooks.dispatch import Dispatcher
+
+
+class Command(BaseCommand):
+    help = 'Deliver webhook events in batches, concurrently, until stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            help='Events per request. Defaults to WEBHOOK_BATCH_SIZE.')
+        parser.add_argument(
+            '--concurrency', type=int,
+            help='Requests in flight at once. Defaults to WEBHOOK_CONCURRENCY.')
+        parser.add_argument(
+            '--poll-interval', type=float, default=1,
+            help='Seconds between polls of the outbox when nothing is due.')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once no endpoint is due instead of waiting for events.')
+
+    def handle(self, *args, **options):
+        dispatcher = Dispatcher(
+            batch_size=options['batch_size'],
+            concurrency=options['concurrency'],
+            log=self.stdout.write,
+        )
+
+        # Finish the deliveries in flight on Ctrl-C or SIGTERM.
+        signal.signal(signal.SIGINT, dispatcher.stop)
+        signal.signal(signal.SIGTERM, dispatcher.stop)
+
+        delivered = async_to_sync(dispatcher.run)(
+            once=options['once'], poll_interval=options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Delivered {delivered} events, pruned {dispatcher.pruned} old events.'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-19 10:19
+
+import webhooks.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0001_add_outbox_and_webhook_endpoints'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='webhookendpoint',
+            name='url',
+            field=models.URLField(max_length=2000, validators=[webhooks.validators.validate_webhook_url]),
+        ),
+    ]
@@ -0,0 +1,54 @@
+import secrets
+
+from django.db import models
+
+from core.models import BaseModel
+from organizations.models import Organization
+from webhooks.validators import validate_webhook_url
+
+
+def generate_secret():
+    return secrets.token_hex(32)
+
+
+class OutboxEvent(models.Model):
+    """
+    Change to deliver to the webhook endpoints of an organization. Written
+    in the transaction of the change itself, see ``webhooks.outbox``.
+    """
+    TASK_CREATED = 'task.created'
+    TASK_UPDATED = 'task.updated'
+    TASK_DELETED = 'task.deleted'
+
+    EVENT_TYPES = [TASK_CREATED, TASK_UPDATED, TASK_DELETED]
+
+    organization = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, related_name='outbox_events')
+    event_type = models.CharField(max_length=255)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.event_type} #{self.id}"
+
+
+class WebhookEndpoint(BaseModel):
+    """
+    URL receiving the events of an organization, in batches. ``cursor`` is
+    the id of the last event it received.
+    """
+    organization = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, related_name='webhook_endpoints')
+    url = models.URLField(max_length=2000, validators=[validate_webhook_url])
+    secret = models.CharField(max_length=64, default=generate_secret)
+    # Empty for every event type.
+    event_types = models.JSONField(default=list, blank=True)
+    is_active = models.BooleanField(default=True)
+    cursor = models.BigIntegerField(default=0)
+    failures = models.IntegerField(default=0)
+    retry_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    last_delivered_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.url
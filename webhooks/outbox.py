@@ -0,0 +1,33 @@
+"""
+Transactional outbox of the webhook events.
+
+Changes record their events with ``record_event()`` inside the transaction
+making the change, so an event exists if and only if its change was
+committed. ``manage.py dispatch_webhooks`` delivers them afterwards, off
+the request path.
+"""
+
+from django.db import router
+
+from webhooks.models import OutboxEvent
+
+
+def record_event(organization_id, event_type, payload):
+    """
+    Add an event to the outbox. Must be called in the transaction of the
+    change it describes.
+    """
+    return OutboxEvent.objects.using(router.db_for_write(OutboxEvent)).create(
+        organization_id=organization_id,
+        event_type=event_type,
+        payload=payload,
+    )
+
+
+def latest_event_id(organization_id):
+    """
+    Id of the last event of an organization, where new endpoints start.
+    """
+    return OutboxEvent.objects.filter(
+        organization_id=organization_id).order_by('-id').values_list(
+        'id', flat=True).first() or 0
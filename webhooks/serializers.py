@@ -0,0 +1,41 @@
+"""
+Serializers for the webhooks app.
+"""
+
+from rest_framework import serializers
+
+from webhooks.models import OutboxEvent, WebhookEndpoint
+
+
+class WebhookEndpointSerializer(serializers.ModelSerializer):
+    """Serializer for the webhook endpoints of an organization"""
+
+    class Meta:
+        model = WebhookEndpoint
+        fields = (
+            'id', 'url', 'event_types', 'is_active', 'secret', 'failures',
+            'last_error', 'last_delivered_at', 'created_at', 'updated_at',
+        )
+        read_only_fields = (
+            'secret', 'failures', 'last_error', 'last_delivered_at',
+            'created_at', 'updated_at',
+        )
+
+    def validate_event_types(self, event_types):
+        if not isinstance(event_types, list):
+            raise serializers.ValidationError('Must be a list of event types.')
+
+        unknown = set(event_types) - set(OutboxEvent.EVENT_TYPES)
+
+        if unknown:
+            raise serializers.ValidationError(
+                f'Unknown event types: {", ".join(sorted(unknown))}.')
+
+        return event_types
+
+    def update(self, instance, validated_data):
+        # Re-enabling an endpoint retries it right away.
+        if validated_data.get('is_active') and not instance.is_active:
+            validated_data.update(failures=0, retry_at=None)
+
+        return super().update(instance, validated_data)
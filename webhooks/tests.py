@@ -0,0 +1,386 @@
+"""
+Tests for the webhooks app.
+"""
+
+import json
+import socket
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from organizations.models import Membership
+from organizations.tests import create_organization, create_membership
+
+from projects.models import ProjectMembership
+from projects.tests import create_projects, create_project_membership
+
+from tasks.tests.test_columns import create_column
+from tasks.tests.test_tasks import create_task
+
+from users.tests import create_user
+
+from webhooks.dispatch import Dispatcher, prune_events, verify_signature
+from webhooks.models import OutboxEvent, WebhookEndpoint
+from webhooks.outbox import record_event
+
+LIST_CREATE_TASKS_URL = reverse('tasks:tasks_list_create')
+
+
+class Receiver:
+    """
+    Local HTTP server standing in for a webhook receiver. Answers with the
+    statuses in ``statuses``, then 200.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.statuses = []
+        # Client ports, one per connection.
+        self.ports = set()
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                receiver.requests.append((dict(self.headers), body))
+                receiver.ports.add(self.client_address[1])
+                status_code = receiver.statuses.pop(0) if receiver.statuses else 200
+
+                self.send_response(status_code)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/hook'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def events(self):
+        return [event for headers, body in self.requests
+                for event in json.loads(body)['events']]
+
+
+def dispatch(**kwargs):
+    return async_to_sync(Dispatcher(**kwargs).run)(once=True)
+
+
+@override_settings(WEBHOOK_ALLOW_PRIVATE_ADDRESSES=True)
+class WebhookTests(TestCase):
+    def setUp(self):
+        self.receiver = Receiver()
+        self.addCleanup(self.receiver.close)
+
+        self.user = create_user(email='owner@example.com', password='testpass123')
+        self.organization = create_organization(name='Acme', domain='acme.com')
+        create_membership(
+            organization=self.organization, user=self.user, role=Membership.ROLE_OWNER)
+
+        self.project = create_projects(
+            name='Project', description='Description', organization=self.organization)
+        create_project_membership(
+            project=self.project, user=self.user, role=ProjectMembership.PROJECT_MANAGER)
+        self.column = create_column(project=self.project, name='To Do', position=1)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.endpoint = WebhookEndpoint.objects.create(
+            organization=self.organization, url=self.receiver.url)
+
+    def record(self, count, event_type=OutboxEvent.TASK_CREATED):
+        for number in range(count):
+            record_event(self.organization.id, event_type, {'number': number})
+
+    def test_task_changes_are_written_to_the_outbox(self):
+        res = self.client.post(LIST_CREATE_TASKS_URL, {
+            'title': 'Task',
+            'description': 'Description',
+            'due_date': '2021-12-12 12:00:00',
+            'column': self.column.id,
+            'project': self.project.id,
+            'assignee': self.user.id,
+        })
+        task_url = reverse('tasks:task_detail', kwargs={'pk': res.data['id']})
+        self.client.patch(task_url, {'title': 'Renamed'})
+        self.client.delete(task_url)
+
+        events = list(OutboxEvent.objects.order_by('id'))
+
+        self.assertEqual(
+            [event.event_type for event in events],
+            [OutboxEvent.TASK_CREATED, OutboxEvent.TASK_UPDATED, OutboxEvent.TASK_DELETED])
+        self.assertEqual(events[1].payload['title'], 'Renamed')
+        self.assertEqual(events[2].payload['id'], res.data['id'])
+        self.assertTrue(all(event.organization_id == self.organization.id for event in events))
+
+    def test_failed_change_writes_no_event(self):
+        task = create_task(
+            title='Task', description='Description', due_date='2021-12-12 12:00:00',
+            column=self.column, project=self.project, assignee=self.user)
+
+        with mock.patch('tasks.views.tasks.record_event', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.patch(
+                    reverse('tasks:task_detail', kwargs={'pk': task.id}),
+                    {'title': 'Renamed'})
+
+        task.refresh_from_db()
+
+        self.assertEqual(task.title, 'Task')
+
+    def test_events_are_delivered_in_signed_batches(self):
+        self.record(5)
+
+        delivered = dispatch(batch_size=2)
+        self.endpoint.refresh_from_db()
+
+        self.assertEqual(delivered, 5)
+        self.assertEqual(len(self.receiver.requests), 3)
+        self.assertEqual(
+            [event['data']['number'] for event in self.receiver.events()], [0, 1, 2, 3, 4])
+        self.assertEqual(self.endpoint.cursor, OutboxEvent.objects.latest('id').id)
+
+        for headers, body in self.receiver.requests:
+            self.assertTrue(verify_signature(
+                self.endpoint.secret, body, headers['X-Webhook-Signature']))
+            self.assertFalse(verify_signature(
+                'wrong', body, headers['X-Webhook-Signature']))
+
+        self.assertEqual(dispatch(), 0)
+
+    def test_failed_delivery_is_retried_later(self):
+        self.record(2)
+        self.receiver.statuses = [500]
+
+        self.assertEqual(dispatch(), 0)
+        self.endpoint.refresh_from_db()
+
+        self.assertEqual(self.endpoint.cursor, 0)
+        self.assertEqual(self.endpoint.failures, 1)
+        self.assertEqual(self.endpoint.last_error, '500 Internal Server Error')
+        self.assertIsNotNone(self.endpoint.retry_at)
+
+        # Not due before its retry time.
+        self.assertEqual(dispatch(), 0)
+        self.assertEqual(len(self.receiver.requests), 1)
+
+        WebhookEndpoint.objects.update(retry_at=None)
+
+        self.assertEqual(dispatch(), 2)
+        self.endpoint.refresh_from_db()
+        self.assertEqual(self.endpoint.failures, 0)
+
+    def test_unreachable_endpoint_is_disabled_after_max_failures(self):
+        self.record(1)
+        self.receiver.close()
+
+        with self.settings(WEBHOOK_MAX_FAILURES=2):
+            dispatch()
+            WebhookEndpoint.objects.update(retry_at=None)
+            dispatch()
+
+        self.endpoint.refresh_from_db()
+
+        self.assertEqual(self.endpoint.failures, 2)
+        self.assertFalse(self.endpoint.is_active)
+
+    def test_endpoint_only_receives_its_event_types(self):
+        self.endpoint.event_types = [OutboxEvent.TASK_DELETED]
+        self.endpoint.save()
+        self.record(2)
+        self.record(1, OutboxEvent.TASK_DELETED)
+
+        self.assertEqual(dispatch(), 1)
+        self.assertEqual(
+            [event['type'] for event in self.receiver.events()], [OutboxEvent.TASK_DELETED])
+
+    def test_connections_per_host_are_bounded_and_reused(self):
+        for _ in range(3):
+            WebhookEndpoint.objects.create(organization=self.organization, url=self.receiver.url)
+
+        self.record(1)
+
+        with self.settings(WEBHOOK_CONNECTIONS_PER_HOST=1):
+            self.assertEqual(dispatch(), 4)
+
+        self.assertEqual(len(self.receiver.requests), 4)
+        self.assertEqual(len(self.receiver.ports), 1)
+
+    def test_private_address_is_refused_when_delivering(self):
+        self.record(1)
+
+        with self.settings(WEBHOOK_ALLOW_PRIVATE_ADDRESSES=False):
+            self.assertEqual(dispatch(), 0)
+
+        self.endpoint.refresh_from_db()
+
+        self.assertEqual(self.receiver.requests, [])
+        self.assertEqual(self.endpoint.failures, 1)
+        self.assertIn('non-public address 127.0.0.1', self.endpoint.last_error)
+
+    def test_outbox_is_pruned_on_an_interval(self):
+        self.record(1)
+        OutboxEvent.objects.update(created_at=timezone.now() - timedelta(days=30))
+        dispatcher = Dispatcher(prune_interval=60)
+
+        with mock.patch('webhooks.dispatch.prune_events', wraps=prune_events) as prune:
+            async_to_sync(dispatcher.prune_if_due)()
+            async_to_sync(dispatcher.prune_if_due)()
+
+            self.assertEqual(prune.call_count, 1)
+            self.assertEqual(dispatcher.pruned, 1)
+            self.assertFalse(OutboxEvent.objects.exists())
+
+            dispatcher.pruned_at -= 60
+            async_to_sync(dispatcher.prune_if_due)()
+
+            self.assertEqual(prune.call_count, 2)
+
+    def resolve(self, *answers):
+        """
+        Resolve rebind.example to each of ``answers`` in turn, then to the
+        last one.
+        """
+        answers = list(answers)
+        getaddrinfo = socket.getaddrinfo
+
+        def resolve(host, port, *args, **kwargs):
+            if host != 'rebind.example':
+                return getaddrinfo(host, port, *args, **kwargs)
+
+            address = answers.pop(0) if len(answers) > 1 else answers[0]
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (address, port))]
+
+        return mock.patch('socket.getaddrinfo', side_effect=resolve)
+
+    def test_host_resolving_to_a_private_address_is_refused_when_sending(self):
+        self.endpoint.url = self.receiver.url.replace('127.0.0.1', 'rebind.example')
+        self.endpoint.save()
+        self.record(1)
+
+        with self.settings(WEBHOOK_ALLOW_PRIVATE_ADDRESSES=False), self.resolve('127.0.0.1'):
+            self.assertEqual(dispatch(), 0)
+
+        self.endpoint.refresh_from_db()
+
+        self.assertEqual(self.receiver.requests, [])
+        self.assertIn('rebind.example resolves to the non-public address 127.0.0.1',
+                      self.endpoint.last_error)
+
+    def test_connection_goes_to_the_checked_address(self):
+        self.endpoint.url = self.receiver.url.replace('127.0.0.1', 'rebind.example')
+        self.endpoint.save()
+        self.record(1)
+
+        # The receiver stands in for a public host, which rebinds to a
+        # private address once checked.
+        with self.settings(WEBHOOK_ALLOW_PRIVATE_ADDRESSES=False), \
+                self.resolve('127.0.0.1', '10.0.0.1') as getaddrinfo, \
+                mock.patch('webhooks.validators.is_public_address',
+                           side_effect=lambda address: address == '127.0.0.1'):
+            self.assertEqual(dispatch(), 1)
+
+        headers, body = self.receiver.requests[0]
+
+        self.assertEqual(headers['Host'], f'rebind.example:{self.receiver.server.server_port}')
+        self.assertEqual(
+            [call.args[0] for call in getaddrinfo.call_args_list].count('rebind.example'), 1)
+
+    def test_endpoints_are_served_concurrently(self):
+        other = Receiver()
+        self.addCleanup(other.close)
+        WebhookEndpoint.objects.create(organization=self.organization, url=other.url)
+        self.record(3)
+
+        self.assertEqual(dispatch(concurrency=2), 6)
+        self.assertEqual(len(self.receiver.events()), 3)
+        self.assertEqual(len(other.events()), 3)
+
+
+class WebhookEndpointApiTests(TestCase):
+    def setUp(self):
+        self.owner = create_user(email='owner@example.com', password='testpass123')
+        self.member = create_user(email='member@example.com', password='testpass123')
+        self.organization = create_organization(name='Acme', domain='acme.com')
+        create_membership(
+            organization=self.organization, user=self.owner, role=Membership.ROLE_OWNER)
+        create_membership(
+            organization=self.organization, user=self.member, role=Membership.ROLE_MEMBER)
+
+        self.url = reverse(
+            'webhooks:list_create', kwargs={'organization_pk': self.organization.id})
+        self.client = APIClient()
+
+    def test_owner_adds_endpoint_starting_after_existing_events(self):
+        event = record_event(self.organization.id, OutboxEvent.TASK_CREATED, {})
+        self.client.force_authenticate(self.owner)
+
+        res = self.client.post(self.url, {
+            'url': 'https://example.com/hook',
+            'event_types': [OutboxEvent.TASK_CREATED],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['secret']), 64)
+        self.assertEqual(WebhookEndpoint.objects.get().cursor, event.id)
+
+    def test_private_and_local_urls_are_refused(self):
+        self.client.force_authenticate(self.owner)
+
+        for url in ('ftp://example.com/hook', 'http://127.0.0.1:8000/hook',
+                    'http://localhost/hook', 'http://10.0.0.5/hook',
+                    'http://169.254.169.254/latest/meta-data', 'http://[::1]/hook',
+                    'http://[::ffff:192.168.0.1]/hook'):
+            with self.subTest(url=url):
+                res = self.client.post(self.url, {'url': url}, format='json')
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn('url', res.data)
+
+        self.assertFalse(WebhookEndpoint.objects.exists())
+
+    def test_unknown_event_type(self):
+        self.client.force_authenticate(self.owner)
+
+        res = self.client.post(self.url, {
+            'url': 'https://example.com/hook', 'event_types': ['task.exploded'],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reenabling_endpoint_resets_failures(self):
+        endpoint = WebhookEndpoint.objects.create(
+            organization=self.organization, url='https://example.com/hook',
+            is_active=False, failures=20)
+        self.client.force_authenticate(self.owner)
+
+        res = self.client.patch(reverse('webhooks:detail', kwargs={
+            'organization_pk': self.organization.id, 'pk': endpoint.id,
+        }), {'is_active': True}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['failures'], 0)
+
+    def test_members_cannot_manage_endpoints(self):
+        self.client.force_authenticate(self.member)
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,15 @@
+"""
+URLs for the webhooks app.
+"""
+
+from django.urls import path
+
+from .views import *
+
+app_name = 'webhooks'
+
+urlpatterns = [
+    path('', WebhookEndpointListCreateView.as_view(), name='list_create'),
+    path('<int:pk>/', WebhookEndpointRetrieveUpdateDestroyView.as_view(),
+         name='detail'),
+]
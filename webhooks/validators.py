@@ -0,0 +1,121 @@
+"""
+Checks keeping the webhook deliveries away from internal addresses.
+
+Endpoints are chosen by organization owners, but the dispatcher sends its
+requests from inside the network: unchecked, an endpoint could point it at
+the loopback interface, a private network or a cloud metadata service.
+Endpoints are checked when they are saved, for the hosts given as an IP
+address, and again by the dispatcher whenever it connects to them, for
+every address their host resolves to at that time. The dispatcher then
+connects to one of the addresses it checked rather than resolving the host
+again, which could give another address (DNS rebinding).
+``settings.WEBHOOK_ALLOW_PRIVATE_ADDRESSES`` turns the address checks off,
+for development.
+"""
+
+import asyncio
+import ipaddress
+import socket
+from urllib.parse import urlsplit
+
+import httpcore
+import httpx
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+class UnsafeDestination(Exception):
+    pass
+
+
+def is_public_address(address):
+    address = ipaddress.ip_address(address)
+
+    if address.version == 6 and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped
+
+    return address.is_global and not address.is_multicast
+
+
+def validate_webhook_url(url):
+    parts = urlsplit(url)
+
+    if parts.scheme not in DEFAULT_PORTS:
+        raise ValidationError('Only http and https URLs are supported.')
+
+    if settings.WEBHOOK_ALLOW_PRIVATE_ADDRESSES:
+        return
+
+    host = (parts.hostname or '').rstrip('.')
+
+    if host == 'localhost' or host.endswith('.localhost'):
+        raise ValidationError('Webhooks cannot be sent to local addresses.')
+
+    try:
+        public = is_public_address(host)
+    except ValueError:
+        # A name, resolved when delivering.
+        return
+
+    if not public:
+        raise ValidationError('Webhooks cannot be sent to private or local addresses.')
+
+
+async def resolve_destination(host, port):
+    """
+    The addresses ``host`` resolves to. Raise ``UnsafeDestination`` when
+    one of them isn't public.
+    """
+    try:
+        resolved = await asyncio.get_running_loop().getaddrinfo(
+            host, port, type=socket.SOCK_STREAM)
+    except OSError as error:
+        raise UnsafeDestination(f'Could not resolve {host}: {error}') from error
+
+    addresses = list(dict.fromkeys(sockaddr[0] for *_, sockaddr in resolved))
+
+    for address in addresses:
+        if not is_public_address(address):
+            raise UnsafeDestination(f'{host} resolves to the non-public address {address}.')
+
+    return addresses
+
+
+class PublicAddressBackend(httpcore.AsyncNetworkBackend):
+    """
+    Network backend of the dispatcher: resolves the host of each new
+    connection with ``resolve_destination()`` and connects to the checked
+    addresses. TLS still verifies, and sends as SNI, the host of the URL.
+    """
+
+    def __init__(self):
+        self.backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None,
+                          socket_options=None):
+        if settings.WEBHOOK_ALLOW_PRIVATE_ADDRESSES:
+            addresses = [host]
+        else:
+            addresses = await resolve_destination(host, port)
+
+        for address in addresses:
+            try:
+                return await self.backend.connect_tcp(
+                    address, port, timeout=timeout, local_address=local_address,
+                    socket_options=socket_options)
+            except httpcore.ConnectError as exception:
+                error = exception
+
+        raise error
+
+    async def sleep(self, seconds):
+        await self.backend.sleep(seconds)
+
+
+class PublicAddressTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # httpx has no option for the network backend of its pool.
+        self._pool._network_backend = PublicAddressBackend()
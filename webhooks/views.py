@@ -0,0 +1,96 @@
+"""
+This file contains the views for the webhook endpoints of organizations.
+"""
+
+from django.shortcuts import get_object_or_404
+
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+
+from organizations.mixins import OrganizationPermissionMixin
+
+from webhooks.models import WebhookEndpoint
+from webhooks.outbox import latest_event_id
+from webhooks.serializers import WebhookEndpointSerializer
+
+
+class WebhookEndpointListCreateView(generics.ListCreateAPIView, OrganizationPermissionMixin):
+    """
+    List the webhook endpoints of an organization or add one. Only owners
+    manage webhooks.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = WebhookEndpointSerializer
+
+    def get_queryset(self):
+        return WebhookEndpoint.objects.filter(
+            organization=self.kwargs['organization_pk']).order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        permission_error = self.check_permissions_owner(
+            kwargs['organization_pk'], request.user)
+
+        if permission_error:
+            return permission_error
+
+        return super().list(request, *args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        permission_error = self.check_permissions_owner(
+            kwargs['organization_pk'], request.user)
+
+        if permission_error:
+            return permission_error
+
+        return super().create(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        organization_id = self.kwargs['organization_pk']
+
+        # New endpoints only receive the events that follow.
+        serializer.save(
+            organization_id=organization_id, cursor=latest_event_id(organization_id))
+
+
+class WebhookEndpointRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView, OrganizationPermissionMixin):
+    """
+    Retrieve, update or delete a webhook endpoint.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = WebhookEndpointSerializer
+
+    def get_object(self):
+        return get_object_or_404(
+            WebhookEndpoint, pk=self.kwargs['pk'],
+            organization=self.kwargs['organization_pk'])
+
+    def owner_permission_error(self, request):
+        return self.check_permissions_owner(
+            self.kwargs['organization_pk'], request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        permission_error = self.owner_permission_error(request)
+
+        if permission_error:
+            return permission_error
+
+        return super().retrieve(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        permission_error = self.owner_permission_error(request)
+
+        if permission_error:
+            return permission_error
+
+        kwargs['partial'] = True
+        return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        permission_error = self.owner_permission_error(request)
+
+        if permission_error:
+            return permission_error
+
+        return super().destroy(request, *args, **kwargs)